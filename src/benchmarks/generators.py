@@ -0,0 +1,120 @@
+import os
+from typing import Tuple, Union
+import numpy as np
+
+
+def typed_erdos_renyi(n: int, m: int, n_types: int, seed: Union[int, None] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """ Generate a typed Erdős–Rényi graph G(n, m) with uniformly distributed node types.
+
+    :param n: int
+        number of nodes
+    :param m: int
+        number of edges
+    :param n_types: int
+        number of node types
+    :param seed: Union[int, None]
+        seed of the random number generator
+    :return: (np.ndarray, np.ndarray)
+        node type per node and edges of shape (m, 2)
+    """
+    rng = np.random.default_rng(seed)
+    node_type = rng.integers(n_types, size=n, dtype=np.int32)
+    weights = np.ones(n)
+    return node_type, _sample_edges(rng, weights, weights, m)
+
+
+def typed_power_law(n: int, m: int, n_types: int, exponent: float = 2.1, n_hubs: int = 3,
+                    hub_degree: Union[int, None] = None,
+                    seed: Union[int, None] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """ Generate a typed graph with a power-law degree distribution (Chung-Lu model) and a few dominant hubs.
+
+    Like in BigExchange, the hubs are adjacent to each other, have a type of their own and are connected to
+    'hub_degree' random nodes each, such that the edges between hubs have huge neighborhoods. The node types are
+    skewed as well, i.e. type t is drawn with a probability proportional to 1 / (t + 1).
+
+    :param n: int
+        number of nodes
+    :param m: int
+        number of edges (including the edges of the hubs)
+    :param n_types: int
+        number of node types (at least 2, one of which is reserved for the hubs)
+    :param exponent: float
+        exponent of the power-law degree distribution (Default: 2.1)
+    :param n_hubs: int
+        number of hubs (Default: 3)
+    :param hub_degree: Union[int, None]
+        number of edges of each hub (Default: n // 3)
+    :param seed: Union[int, None]
+        seed of the random number generator
+    :return: (np.ndarray, np.ndarray)
+        node type per node and edges of shape (m, 2)
+    """
+    rng = np.random.default_rng(seed)
+    if hub_degree is None:
+        hub_degree = n // 3
+    hub_degree = min(hub_degree, n - 1)
+
+    type_probs = 1 / np.arange(1, n_types)
+    node_type = rng.choice(n_types - 1, size=n, p=type_probs / type_probs.sum()).astype(np.int32) + 1
+    node_type[:n_hubs] = 0
+
+    hub_edges = [np.array([(a, b) for a in range(n_hubs) for b in range(a + 1, n_hubs)], dtype=np.int64)]
+    for hub in range(n_hubs):
+        leaves = rng.choice(np.arange(n_hubs, n), size=hub_degree - n_hubs + 1, replace=False)
+        hub_edges.append(np.column_stack([np.full(len(leaves), hub), leaves]))
+    hub_edges = np.concatenate([e.reshape(-1, 2) for e in hub_edges])
+
+    # Chung-Lu weights of the remaining nodes, i.e. their expected degrees
+    weights = np.zeros(n)
+    weights[n_hubs:] = np.arange(1, n - n_hubs + 1) ** (-1 / (exponent - 1))
+    edges = _sample_edges(rng, weights, weights, max(0, m - len(hub_edges)), exclude=hub_edges)
+    edges = np.concatenate([hub_edges, edges])
+    return node_type, edges[rng.permutation(len(edges))]
+
+
+def _sample_edges(rng: np.random.Generator, src_weights: np.ndarray, dst_weights: np.ndarray, m: int,
+                  exclude: Union[np.ndarray, None] = None) -> np.ndarray:
+    """ Sample m distinct undirected edges (without self-loops) whose endpoints are drawn proportional to the
+    given weights. """
+    n = len(src_weights)
+    src_p, dst_p = src_weights / src_weights.sum(), dst_weights / dst_weights.sum()
+    n_possible = np.count_nonzero(src_weights) * (np.count_nonzero(dst_weights) - 1) // 2
+    if m > n_possible:
+        raise ValueError(f"Cannot sample {m} distinct edges among {n} nodes")
+    keys = np.zeros(0, dtype=np.int64)
+    if exclude is not None and len(exclude) > 0:
+        exclude = np.sort(exclude, axis=1)
+        keys = exclude[:, 0] * n + exclude[:, 1]
+    n_excluded = len(keys)
+    while len(keys) < m + n_excluded:
+        size = int(1.2 * (m + n_excluded - len(keys))) + 16
+        src = rng.choice(n, size=size, p=src_p)
+        dst = rng.choice(n, size=size, p=dst_p)
+        valid = src != dst
+        new_keys = np.minimum(src, dst)[valid] * n + np.maximum(src, dst)[valid]
+        keys = np.concatenate([keys, new_keys[~np.isin(new_keys, keys)]])
+        _, first = np.unique(keys, return_index=True)
+        keys = keys[np.sort(first)]     # drop duplicates, but keep the excluded (leading) keys in front
+    keys = keys[n_excluded:m + n_excluded]
+    return np.column_stack([keys // n, keys % n])
+
+
+def write_dataset(path: str, node_type: np.ndarray, edges: np.ndarray):
+    """ Write a graph to a dataset folder in the format read by hin.dataset_loader.load_dataset, i.e. a 'nodes.csv'
+    file with one node type per line and an 'edges.csv' file with one 'source,edge type,target' triple per line.
+    The edge type is derived from the types of the end nodes.
+
+    :param path: str
+        path to the dataset folder (created if it does not exist)
+    :param node_type: np.ndarray
+        node type per node
+    :param edges: np.ndarray
+        edges of shape (m, 2)
+    """
+    os.makedirs(path, exist_ok=True)
+    np.savetxt(os.path.join(path, 'nodes.csv'), node_type, fmt='%d')
+    n_types = int(node_type.max()) + 1 if len(node_type) > 0 else 1
+    t_src, t_dst = node_type[edges[:, 0]], node_type[edges[:, 1]]
+    edge_type = np.minimum(t_src, t_dst) * n_types + np.maximum(t_src, t_dst)
+    np.savetxt(os.path.join(path, 'edges.csv'), np.column_stack([edges[:, 0], edge_type, edges[:, 1]]),
+               fmt='%d', delimiter=',')
@@ -0,0 +1,296 @@
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple, Union
+import numpy as np
+from hin.dataset_loader import load_dataset
+from hin.metrics import Metrics
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.engine import ENGINES
+from benchmarks.generators import typed_erdos_renyi, typed_power_law, write_dataset
+
+
+# benchmark cases per scale: name -> (generator, keyword arguments of the generator)
+CASES: Dict[str, Dict[str, tuple]] = {
+    'small': {
+        'er': (typed_erdos_renyi, dict(n=2000, m=8000, n_types=4)),
+        'er_many_types': (typed_erdos_renyi, dict(n=2000, m=8000, n_types=30)),
+        'power_law': (typed_power_law, dict(n=2000, m=4000, n_types=8, exponent=2.5, n_hubs=3,
+                                            hub_degree=150)),
+    },
+    'medium': {
+        'er': (typed_erdos_renyi, dict(n=10000, m=40000, n_types=4)),
+        'er_many_types': (typed_erdos_renyi, dict(n=10000, m=40000, n_types=30)),
+        'power_law': (typed_power_law, dict(n=10000, m=40000, n_types=8, exponent=2.5, n_hubs=3,
+                                            hub_degree=600)),
+    },
+    'large': {
+        'er': (typed_erdos_renyi, dict(n=30000, m=160000, n_types=4)),
+        'er_many_types': (typed_erdos_renyi, dict(n=30000, m=160000, n_types=30)),
+        'power_law': (typed_power_law, dict(n=30000, m=160000, n_types=30, n_hubs=3, hub_degree=8000)),
+    },
+}
+# phases that are timed separately
+PHASES: List[str] = ['load', 'load_cached', 'count', 'correct', 'dump']
+# phases shorter than this (in seconds) are too noisy to be compared with a baseline
+MIN_COMPARE_SECONDS: float = 0.05
+
+
+def _peak_rss_mb() -> float:
+    """ Return the peak resident set size of the current process in MiB (ru_maxrss is given in KiB on Linux). """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(path: str, comb: bool, csr: bool, int_codes: bool, engine: str = 'python', workers: int = 1,
+             sparse: bool = False) -> Dict[str, Dict[str, float]]:
+    """ Run and time all phases of the motif counting on a dataset folder in the current process. The motifs are
+    counted with count_motifs, i.e. exactly as by run.py with the same options.
+
+    The peak memory of a phase is the peak resident set size of the process up to the end of that phase, hence
+    this function should run in a fresh process (cf. benchmark).
+
+    :param path: str
+        path to the dataset folder (whose cache has already been written)
+    :param comb: bool
+        flag to signal whether to utilize combinatorial relationships
+    :param csr: bool
+        flag to signal whether to load the graph as CSRHIN
+    :param int_codes: bool
+        flag to signal whether motifs and orbits are encoded by integer codes
+    :param engine: str
+        per-edge counting engine (cf. make_engine) (Default: 'python')
+    :param workers: int
+        number of worker processes (Default: 1)
+    :param sparse: bool
+        flag to signal whether all edges are counted at once with the sparse engine (Default: False)
+    :return: Dict[str, Dict[str, float]]
+        seconds, edges per second and peak memory (in MiB) for each phase
+    """
+    phases = {}
+
+    def finish(phase: str, start: float, n_edges: int, seconds: float = None):
+        seconds = time.perf_counter() - start if seconds is None else seconds
+        phases[phase] = {'seconds': seconds,
+                         'edges_per_sec': n_edges / seconds if seconds > 0 else float('inf'),
+                         'peak_rss_mb': _peak_rss_mb()}
+
+    start = time.perf_counter()
+    hin = load_dataset(path, csr=csr, cache=False)
+    m = len(hin.edges)
+    finish('load', start, m)
+    del hin
+
+    start = time.perf_counter()
+    hin = load_dataset(path, csr=csr, cache=True)
+    finish('load_cached', start, m)
+
+    # count_motifs also corrects the global counts, whose time is taken from the metrics
+    metrics = Metrics(stream=None)
+    start = time.perf_counter()
+    counts = count_motifs(hin, comb=comb, int_codes=int_codes, workers=workers, sparse=sparse, engine=engine,
+                          metrics=metrics)
+    seconds = time.perf_counter() - start
+    finish('count', start, m, seconds - metrics.phase_seconds['correct'])
+    finish('correct', start, m, metrics.phase_seconds['correct'])
+
+    out_dir = tempfile.mkdtemp(prefix='hin_bench_out_')
+    try:
+        start = time.perf_counter()
+        counts.dump_to_json(out_dir)
+        finish('dump', start, m)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return phases
+
+
+def benchmark(scale: str = 'small', cases: Union[List[str], None] = None, csr: bool = False,
+              int_codes: bool = False, combs: Tuple[bool, ...] = (True, False), repeat: int = 1,
+              seed: int = 0, engine: str = 'python', workers: int = 1, sparse: bool = False) -> Dict[str, object]:
+    """ Generate the synthetic graphs of a scale and benchmark the motif counting with and without combinatorial
+    relationships on each of them.
+
+    Every run happens in a fresh (spawned) process, such that the reported peak memory belongs to that run only.
+    With repeat > 1, the fastest time and the highest peak memory of each phase are reported.
+
+    :param scale: str
+        one of the keys of CASES (Default: 'small')
+    :param cases: Union[List[str], None]
+        names of the cases to run (Default: all cases of the scale)
+    :param csr: bool
+        flag to signal whether to load the graphs as CSRHIN (Default: False)
+    :param int_codes: bool
+        flag to signal whether motifs and orbits are encoded by integer codes (Default: False)
+    :param combs: Tuple[bool, ...]
+        whether to run with (True) and/or without (False) combinatorial relationships (Default: both)
+    :param repeat: int
+        number of runs per case (Default: 1)
+    :param seed: int
+        seed of the graph generators (Default: 0)
+    :param engine: str
+        per-edge counting engine (cf. make_engine) (Default: 'python')
+    :param workers: int
+        number of worker processes of each run (Default: 1)
+    :param sparse: bool
+        flag to signal whether all edges are counted at once with the sparse engine (Default: False)
+    :return: Dict[str, object]
+        environment information ('meta') and the results of all runs ('results')
+    """
+    ctx = mp.get_context('spawn')
+    results = []
+    data_dir = tempfile.mkdtemp(prefix='hin_bench_data_')
+    try:
+        for name, (generator, kwargs) in CASES[scale].items():
+            if cases is not None and name not in cases:
+                continue
+            node_type, edges = generator(seed=seed, **kwargs)
+            path = os.path.join(data_dir, name)
+            write_dataset(path, node_type, edges)
+            load_dataset(path, csr=True)    # write the cache for the 'load_cached' phase
+            for comb in combs:
+                runs = []
+                for _ in range(repeat):
+                    # not a multiprocessing.Pool, whose daemonic processes cannot start the workers of a run
+                    with ProcessPoolExecutor(1, mp_context=ctx) as executor:
+                        runs.append(executor.submit(run_case, path, comb, csr, int_codes, engine, workers,
+                                                    sparse).result())
+                phases = {phase: {'seconds': min(run[phase]['seconds'] for run in runs),
+                                  'edges_per_sec': max(run[phase]['edges_per_sec'] for run in runs),
+                                  'peak_rss_mb': max(run[phase]['peak_rss_mb'] for run in runs)}
+                          for phase in PHASES}
+                results.append({'case': name, 'generator': generator.__name__, **kwargs,
+                                'n_edges': len(edges), 'comb': comb, 'csr': csr, 'int_codes': int_codes,
+                                'engine': engine, 'workers': workers, 'sparse': sparse, 'phases': phases,
+                                'total_seconds': sum(p['seconds'] for p in phases.values())})
+                print(f"{name:>16} comb={comb!s:<5} " +
+                      " ".join(f"{phase}={p['seconds']:.3f}s" for phase, p in phases.items()) +
+                      f" peak={phases['dump']['peak_rss_mb']:.0f}MiB", file=sys.stderr)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return {'meta': _environment(scale, repeat, seed), 'results': results}
+
+
+def _environment(scale: str, repeat: int, seed: int) -> Dict[str, object]:
+    """ Describe the environment of a benchmark, such that results of different commits and machines can be told
+    apart. """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+            'numpy': np.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'scale': scale, 'repeat': repeat, 'seed': seed}
+
+
+def compare(results: Dict[str, object], baseline: Dict[str, object], tolerance: float = 0.1) -> List[str]:
+    """ Compare benchmark results with those of a baseline (e.g. of a previous commit).
+
+    :param results: Dict[str, object]
+        results of benchmark
+    :param baseline: Dict[str, object]
+        results of benchmark for the baseline
+    :param tolerance: float
+        relative slowdown (resp. memory increase) of a phase that is still tolerated (Default: 0.1)
+    :return: List[str]
+        descriptions of all regressions
+    """
+    def key(run):
+        # results of earlier versions were counted sequentially with the reference engine
+        return (run['case'], run['comb'], run['csr'], run['int_codes'], run.get('engine', 'python'),
+                run.get('workers', 1), run.get('sparse', False))
+
+    base_runs = {key(run): run for run in baseline['results']}
+    regressions = []
+    for run in results['results']:
+        base = base_runs.get(key(run))
+        if base is None:
+            continue
+        for phase, p in run['phases'].items():
+            b = base['phases'].get(phase)
+            if b is None:
+                continue
+            label = f"{run['case']} (comb={run['comb']}) {phase}"
+            if b['seconds'] >= MIN_COMPARE_SECONDS and p['seconds'] > (1 + tolerance) * b['seconds']:
+                regressions.append(f"{label}: {b['seconds']:.3f}s -> {p['seconds']:.3f}s")
+            if p['peak_rss_mb'] > (1 + tolerance) * b['peak_rss_mb']:
+                regressions.append(f"{label}: {b['peak_rss_mb']:.1f}MiB -> {p['peak_rss_mb']:.1f}MiB")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the motif counting on synthetic HINs. "
+                                                 "Usage example: python -m benchmarks.run_benchmarks -o bench.json")
+    parser.add_argument("-o", "--output",
+                        help="Path to the JSON file the results are written to (Default: standard output)",
+                        default=None)
+    parser.add_argument("--scale",
+                        help="Size of the synthetic graphs (Default: small)",
+                        choices=list(CASES),
+                        default="small")
+    parser.add_argument("--cases",
+                        help="Comma separated names of the cases to run (Default: all)",
+                        default=None)
+    parser.add_argument("--csr",
+                        help="Load the graphs as the compact array-backed CSRHIN",
+                        action="store_true")
+    parser.add_argument("--int_codes",
+                        help="Encode motifs and orbits by integer codes instead of hash strings",
+                        action="store_true")
+    parser.add_argument("--comb",
+                        help="Run with ('on') or without ('off') combinatorial relationships, or both (Default: both)",
+                        choices=["both", "on", "off"],
+                        default="both")
+    parser.add_argument("--engine",
+                        help="Per-edge counting engine (Default: python)",
+                        choices=list(ENGINES),
+                        default="python")
+    parser.add_argument("--workers",
+                        help="Number of worker processes of each run (Default: 1)",
+                        type=int,
+                        default=1)
+    parser.add_argument("--sparse",
+                        help="Count all edges at once with sparse matrix algebra (requires SciPy)",
+                        action="store_true")
+    parser.add_argument("--repeat",
+                        help="Number of runs per case, the fastest is reported (Default: 1)",
+                        type=int,
+                        default=1)
+    parser.add_argument("--seed",
+                        help="Seed of the graph generators (Default: 0)",
+                        type=int,
+                        default=0)
+    parser.add_argument("--baseline",
+                        help="Path to the JSON results of a previous run to check for regressions",
+                        default=None)
+    parser.add_argument("--tolerance",
+                        help="Tolerated relative slowdown or memory increase per phase (Default: 0.1)",
+                        type=float,
+                        default=0.1)
+    args = parser.parse_args()
+
+    bench = benchmark(args.scale, cases=args.cases.split(',') if args.cases else None, csr=args.csr,
+                      int_codes=args.int_codes,
+                      combs={'both': (True, False), 'on': (True,), 'off': (False,)}[args.comb],
+                      repeat=args.repeat, seed=args.seed, engine=args.engine, workers=args.workers,
+                      sparse=args.sparse)
+    if args.output is None:
+        print(json.dumps(bench, indent=2))
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(bench, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(bench, json.load(f), tolerance=args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,73 @@
+import argparse
+import json
+import sys
+from typing import Dict, List
+import numpy as np
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.sampling import estimate_motifs, compare_to_exact
+
+
+# sampling methods that are evaluated
+METHODS: List[str] = ['uniform', 'degree']
+
+
+def sampling_accuracy(path: str, fraction: float = 0.1, seeds: int = 3, comb: bool = True) -> Dict[str, object]:
+    """ Compare the sampled estimates of the global motif counts of a dataset with the exact counts (which are
+    counted with the sparse engine) for each sampling method and seed.
+
+    :param path: str
+        path to the dataset folder
+    :param fraction: float
+        number of sampled edges as fraction of all edges (Default: 0.1)
+    :param seeds: int
+        number of runs (with the seeds 0, ..., seeds - 1) per sampling method (Default: 3)
+    :param comb: bool
+        flag to signal whether to utilize combinatorial relationships (Default: True)
+    :return: Dict[str, object]
+        the settings and, for each sampling method, the comparison of every run (cf. compare_to_exact) and their mean
+    """
+    hin = load_dataset(path, csr=True)
+    exact = count_motifs(hin, comb=comb, sparse=True).global_count
+    report = {'dataset': path, 'fraction': fraction, 'seeds': seeds, 'n_motifs': len(exact), 'methods': {}}
+    for method in METHODS:
+        runs = []
+        for seed in range(seeds):
+            runs.append(compare_to_exact(estimate_motifs(hin, fraction=fraction, method=method, comb=comb,
+                                                         seed=seed), exact))
+            print(f"{method:>8} seed={seed} " + " ".join(f"{k}={v:.3f}" for k, v in runs[-1].items()),
+                  file=sys.stderr)
+        report['methods'][method] = {'runs': runs, 'mean': {k: float(np.mean([run[k] for run in runs]))
+                                                            for k in runs[0]}}
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report the errors and the confidence interval coverage of the "
+                                                 "sampled motif counts. Usage example: "
+                                                 "python -m benchmarks.sampling_accuracy -d ../data/BigExchange")
+    parser.add_argument("-d", "--dataset",
+                        help="Path to the dataset folder",
+                        required=True)
+    parser.add_argument("-o", "--output",
+                        help="Path to the JSON file the report is written to (Default: standard output)",
+                        default=None)
+    parser.add_argument("--sample",
+                        help="Number of sampled edges as fraction of all edges (Default: 0.1)",
+                        type=float,
+                        default=0.1)
+    parser.add_argument("--seeds",
+                        help="Number of runs per sampling method (Default: 3)",
+                        type=int,
+                        default=3)
+    parser.add_argument("--no_comb",
+                        help="Do not utilize combinatorial relationships",
+                        action="store_true")
+    args = parser.parse_args()
+
+    accuracy = sampling_accuracy(args.dataset, fraction=args.sample, seeds=args.seeds, comb=not args.no_comb)
+    if args.output is None:
+        print(json.dumps(accuracy, indent=2))
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(accuracy, f, indent=2)
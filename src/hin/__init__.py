@@ -1,2 +1,2 @@
 
-__all__ = ["hin", "dataset_loader", "motif"]
+__all__ = ["hin", "dataset_loader", "motif", "metrics", "reorder"]
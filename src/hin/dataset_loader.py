@@ -1,24 +1,363 @@
 import os
-from .hin import HIN, HINNode
+import json
+from itertools import islice
+from typing import Dict, Iterator, List, Tuple, Union
+import numpy as np
+from numpy.lib.format import open_memmap
+from .hin import HIN, HINNode, CSRHIN, build_csr, type_runs, type_dtype
+from .reorder import reorder_arrays
 
 
-def load_dataset(path: str) -> HIN:
-    curr_dir = os.getcwd()
+# name of the cache directory that is placed in the dataset folder
+CACHE_DIR: str = '.hin_cache'
+# version of the cache layout, caches with another version are rebuilt
+CACHE_VERSION: int = 3
+# names of the cached arrays of the CSR adjacency (cf. CSRHIN)
+CSR_ARRAYS: Tuple[str, ...] = ('indptr', 'indices', 'type_indptr', 'type_ids', 'type_ends')
+# number of lines (resp. adjacency entries) that are parsed (resp. sorted) at once by stream_csr_arrays
+STREAM_CHUNK: int = 1 << 22
 
-    with open(os.path.join(curr_dir, path, 'nodes.csv'), 'r') as node_file:
-        nodes = []
-        lines = node_file.readlines()
-        for node_id, line in enumerate(lines):
-            node_type = line.strip()
-            node = HINNode(node_id, node_type)
-            nodes.append(node)
-        del lines
 
-    with open(os.path.join(curr_dir, path, 'edges.csv'), 'r') as edge_file:
-        edges = []
-        for line in edge_file.readlines():
-            chunks = line.strip().split(',')
-            edge = int(chunks[0]), int(chunks[2])
-            edges.append(edge)
+def load_dataset(path: str, csr: bool = False, cache: bool = True, order: str = None) -> Union[HIN, CSRHIN]:
+    """ Load an HIN from the 'nodes.csv' and 'edges.csv' files in the dataset folder.
 
-    return HIN(nodes, edges)
+    The files are parsed in bulk into NumPy arrays, which are cached as '.npy' files in a cache directory inside the
+    dataset folder. On later runs, the cached arrays are memory-mapped as long as the size and modification time of
+    the source files are unchanged.
+
+    With an order, the nodes are relabeled and the edges are reordered to improve the locality of the counting (cf.
+    hin.reorder.reorder_arrays). The original node and edge IDs are kept in the graph (node_ids and edge_ids), and
+    the counts of count_motifs refer to them again (cf. hin.motif.count_3_4_node_motifs.restore_ids).
+
+    :param path: str
+        path to the dataset folder
+    :param csr: bool
+        flag to signal whether to return the compact CSRHIN instead of the set-based HIN (Default: False)
+    :param cache: bool
+        flag to signal whether the parsed arrays are cached (resp. read from the cache) (Default: True)
+    :param order: str
+        node order, 'degree', 'bfs' or 'rcm' (cf. hin.reorder.node_order) (Default: None, i.e. the order of the
+        dataset files)
+    :return: Union[HIN, CSRHIN]
+        the loaded graph
+    """
+    path = os.path.join(os.getcwd(), path)
+
+    if csr and order is None:
+        type_names, arrays = load_csr_arrays(path, cache=cache)
+        return CSRHIN(arrays['node_type'], arrays['edges'], type_names, edge_type=arrays['edge_type'],
+                      csr=tuple(arrays[name] for name in CSR_ARRAYS))
+
+    type_names, arrays = _load_arrays(path, cache)
+    node_type, edges, edge_type = arrays['node_type'], arrays['edges'], arrays['edge_type']
+    node_ids = edge_ids = None
+    if order is not None:
+        node_type, edges, edge_type, node_ids, edge_ids = reorder_arrays(node_type, edges, edge_type, order)
+
+    if csr:     # the CSR adjacency of the cache refers to the original node IDs
+        hin = CSRHIN(node_type, edges, type_names, edge_type=edge_type)
+    else:
+        nodes = [HINNode(v, type_names[t]) for v, t in enumerate(node_type.tolist())]
+        hin = HIN(nodes, list(zip(edges[:, 0].tolist(), edges[:, 1].tolist())), edge_type=np.array(edge_type))
+    hin.node_ids, hin.edge_ids = node_ids, edge_ids
+    return hin
+
+
+def load_csr_arrays(path: str, cache: bool = True) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """ Load the arrays of a dataset folder including its CSR adjacency (cf. CSRHIN) without building a graph, e.g. to
+    access the adjacency of a graph that does not fit into memory. The arrays are memory-mapped from the cache.
+
+    :param path: str
+        path to the dataset folder
+    :param cache: bool
+        flag to signal whether the parsed arrays are cached (resp. read from the cache) (Default: True)
+    :return: (List[str], Dict[str, np.ndarray])
+        node type names, and the arrays 'node_type', 'edges', 'edge_type' and those in CSR_ARRAYS by name
+    """
+    path = os.path.join(os.getcwd(), path)
+    type_names, arrays = _load_arrays(path, cache)
+    if not all(name in arrays for name in CSR_ARRAYS):
+        csr_arrays = build_csr(arrays['node_type'], arrays['edges'], len(type_names))
+        arrays.update(zip(CSR_ARRAYS, csr_arrays))
+        if cache:   # add the CSR adjacency to the cache
+            _write_cache(path, type_names, arrays, list(CSR_ARRAYS))
+    return type_names, arrays
+
+
+def stream_csr_arrays(path: str, cache: bool = True, directory: str = None,
+                      chunk_size: int = STREAM_CHUNK) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """ Load the same arrays as load_csr_arrays, but parse the dataset files and build the CSR adjacency in chunks
+    directly into '.npy' files, which are then memory-mapped, e.g. for a graph whose edges do not fit into memory.
+    Only arrays over the nodes (node types and degrees) and a chunk of at most chunk_size lines resp. adjacency
+    entries are held in memory at a time:
+    - the node types are parsed in two passes (distinct types, then the integer type of each node),
+    - the edges are parsed in two passes (number of edges, then the edges and the degree of each node),
+    - both directions of each edge are scattered to the adjacency ranges of their nodes (cf. build_csr),
+    - the adjacency is sorted and its parallel edges are dropped in blocks of nodes, and compacted in place.
+
+    :param path: str
+        path to the dataset folder
+    :param cache: bool
+        flag to signal whether the arrays are written to (resp. read from) the cache of the dataset (Default: True)
+    :param directory: str
+        path to the directory where the arrays are written if they are not cached (must be given if cache is False)
+    :param chunk_size: int
+        maximum number of lines resp. adjacency entries per chunk (Default: STREAM_CHUNK)
+    :return: (List[str], Dict[str, np.ndarray])
+        node type names, and the (memory-mapped) arrays 'node_type', 'edges', 'edge_type' and those in CSR_ARRAYS
+    """
+    path = os.path.join(os.getcwd(), path)
+    if cache:
+        arrays = _read_cache(path)
+        if arrays is not None and all(name in arrays for name in CSR_ARRAYS):
+            return arrays.pop('type_names'), arrays
+        directory = os.path.join(path, CACHE_DIR)
+    elif directory is None:
+        raise ValueError("A directory for the arrays is required if they are not cached")
+    os.makedirs(directory, exist_ok=True)
+
+    def array(name: str, dtype: type, shape: Tuple[int, ...]) -> np.ndarray:
+        return open_memmap(os.path.join(directory, f'{name}.npy'), mode='w+', dtype=dtype, shape=shape)
+
+    # node types: the distinct values of nodes.csv, then the integer type of each node
+    node_file = os.path.join(path, 'nodes.csv')
+    try:
+        type_values = np.unique(np.concatenate([np.unique(_node_values(lines, True)) for lines in
+                                                _line_chunks(node_file, chunk_size)] + [np.zeros(0, np.int64)]))
+        numeric = True
+    except ValueError:
+        type_values = np.unique(np.concatenate([np.unique(_node_values(lines, False)) for lines in
+                                                _line_chunks(node_file, chunk_size)] + [np.zeros(0, str)]))
+        numeric = False
+    type_names = [str(t) for t in type_values.tolist()]
+    n, n_t = sum(len(lines) for lines in _line_chunks(node_file, chunk_size)), len(type_names)
+    node_type = np.zeros(n, dtype=np.int32)
+    start = 0
+    for lines in _line_chunks(node_file, chunk_size):
+        node_type[start:start + len(lines)] = np.searchsorted(type_values, _node_values(lines, numeric))
+        start += len(lines)
+    array('node_type', np.int32, (n,))[:] = node_type
+
+    # edges and the degree of each node (including parallel edges)
+    edge_file = os.path.join(path, 'edges.csv')
+    m = sum(len(lines) for lines in _line_chunks(edge_file, chunk_size))
+    edges, edge_type = array('edges', np.int64, (m, 2)), array('edge_type', np.int32, (m,))
+    degree = np.zeros(n, dtype=np.int64)
+    start = 0
+    for lines in _line_chunks(edge_file, chunk_size):
+        table = np.loadtxt(lines, dtype=np.int64, delimiter=',', comments=None, ndmin=2)
+        edges[start:start + len(table)] = table[:, [0, 2]]
+        edge_type[start:start + len(table)] = table[:, 1]
+        _add_counts(degree, table[:, [0, 2]].ravel())
+        start += len(table)
+
+    # both directions of each edge in the adjacency range of its source (in any order)
+    index_dtype = np.int32 if n < np.iinfo(np.int32).max else np.int64
+    indices = array('indices', index_dtype, (2 * m,))
+    cursor = np.zeros(n, dtype=np.int64)
+    np.cumsum(degree[:-1], out=cursor[1:])
+    for start in range(0, m, max(1, chunk_size // 2)):
+        chunk = np.asarray(edges[start:start + max(1, chunk_size // 2)])
+        src, dst = np.concatenate([chunk[:, 0], chunk[:, 1]]), np.concatenate([chunk[:, 1], chunk[:, 0]])
+        order = np.argsort(src, kind='stable')
+        src, dst = src[order], dst[order]
+        nodes, first, counts = np.unique(src, return_index=True, return_counts=True)
+        indices[cursor[src] + np.arange(len(src)) - np.repeat(first, counts)] = dst
+        cursor[nodes] += counts
+
+    # sort the adjacency of blocks of nodes by neighbor type and ID, drop parallel edges and compact it in place, the
+    # runs of neighbors of the same type are written to files of the maximum number of runs
+    max_runs = min(2 * m, n * n_t)
+    type_ids, type_ends = array('type_ids', type_dtype(n_t), (max_runs,)), array('type_ends', index_dtype, (max_runs,))
+    type_indptr = np.zeros(n + 1, dtype=np.int64)
+    raw_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(degree, out=raw_indptr[1:])
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    for lo, hi in _node_blocks(degree, chunk_size):
+        dst = np.asarray(indices[raw_indptr[lo]:raw_indptr[hi]], dtype=np.int64)
+        src = np.repeat(np.arange(hi - lo), degree[lo:hi])
+        order = np.lexsort((dst, node_type[dst], src))
+        src, dst = src[order], dst[order]
+        keep = np.ones(len(src), dtype=bool)
+        keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        src, dst = src[keep], dst[keep]
+        indices[indptr[lo]:indptr[lo] + len(dst)] = dst
+        np.cumsum(np.bincount(src, minlength=hi - lo), out=indptr[lo + 1:hi + 1])
+        indptr[lo + 1:hi + 1] += indptr[lo]
+        n_runs, ids, ends = type_runs(src, node_type[dst], indptr[lo:hi] - indptr[lo], n_t)
+        type_ids[type_indptr[lo]:type_indptr[lo] + len(ids)] = ids
+        type_ends[type_indptr[lo]:type_indptr[lo] + len(ends)] = ends
+        np.cumsum(n_runs, out=type_indptr[lo + 1:hi + 1])
+        type_indptr[lo + 1:hi + 1] += type_indptr[lo]
+    array('indptr', np.int64, (n + 1,))[:] = indptr
+    array('type_indptr', np.int64, (n + 1,))[:] = type_indptr
+
+    # parallel edges were dropped (resp. nodes have several neighbors of the same type), hence the compacted indices
+    # (resp. runs) are copied to a smaller file
+    columns = {'indices': (indices, int(indptr[-1])), 'type_ids': (type_ids, int(type_indptr[-1])),
+               'type_ends': (type_ends, int(type_indptr[-1]))}
+    del indices, type_ids, type_ends
+    for name in list(columns):
+        column, size = columns.pop(name)
+        if size < len(column):
+            compacted = array(f'{name}_compacted', column.dtype, (size,))
+            for start in range(0, size, chunk_size):
+                compacted[start:start + chunk_size] = column[start:min(size, start + chunk_size)]
+            compacted.flush()
+            del compacted, column
+            os.replace(os.path.join(directory, f'{name}_compacted.npy'), os.path.join(directory, f'{name}.npy'))
+        else:
+            column.flush()
+            del column
+    for column in (edges, edge_type):
+        column.flush()
+    del edges, edge_type, column
+
+    arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+              for name in ('node_type', 'edges', 'edge_type') + CSR_ARRAYS}
+    if cache:   # the arrays are already written, only the meta file is missing
+        _write_cache(path, type_names, arrays, [])
+    return type_names, arrays
+
+
+def _line_chunks(file_name: str, chunk_size: int) -> Iterator[List[str]]:
+    """ Yield the non-empty lines of a file in chunks of at most chunk_size lines. """
+    with open(file_name, 'r') as f:
+        while True:
+            lines = list(islice(f, chunk_size))
+            if len(lines) == 0:
+                return
+            lines = [line for line in lines if line.strip()]
+            if len(lines) > 0:
+                yield lines
+
+
+def _node_values(lines: List[str], numeric: bool) -> np.ndarray:
+    """ Parse the node type values of lines of 'nodes.csv', as integers or names (cf. _parse_dataset). """
+    if numeric:
+        return np.loadtxt(lines, dtype=np.int64, comments=None, ndmin=1)
+    return np.array([line.strip() for line in lines])
+
+
+def _add_counts(counts: np.ndarray, keys: np.ndarray):
+    """ Add the number of occurrences of each key to counts (without a pass over all of counts). """
+    keys, occurrences = np.unique(keys, return_counts=True)
+    counts[keys] += occurrences
+
+
+def _node_blocks(degree: np.ndarray, chunk_size: int) -> List[Tuple[int, int]]:
+    """ Split the nodes into contiguous ranges whose total degree is at most chunk_size (or a single node). """
+    cum = np.cumsum(degree)
+    bounds = [0]
+    while bounds[-1] < len(degree):
+        offset = cum[bounds[-1] - 1] if bounds[-1] > 0 else 0
+        stop = int(np.searchsorted(cum, offset + chunk_size, side='right'))
+        bounds.append(max(stop, bounds[-1] + 1))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def read_type_labels(path: str) -> Union[List[str], None]:
+    """ Return the label of each integer node type value of a dataset (one per line of 'node_types.csv' in the dataset
+    folder, e.g. 'Material' for the node type 3), or None if the dataset has no such file.
+
+    :param path: str
+        path to the dataset folder
+    :return: List[str]
+        label of each node type value
+    """
+    labels_file = os.path.join(path, 'node_types.csv')
+    if not os.path.exists(labels_file):
+        return None
+    with open(labels_file, 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def _load_arrays(path: str, cache: bool) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """ Return the node type names and the (cached or parsed) arrays of a dataset folder. """
+    arrays = _read_cache(path) if cache else None
+    if arrays is None:
+        type_names, node_type, edges, edge_type = _parse_dataset(path)
+        arrays = {'node_type': node_type, 'edges': edges, 'edge_type': edge_type}
+        if cache:
+            _write_cache(path, type_names, arrays, list(arrays))
+    else:
+        type_names = arrays.pop('type_names')
+    return type_names, arrays
+
+
+def _parse_dataset(path: str) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """ Parse the node types and the edges (with edge types) of a dataset folder in bulk.
+
+    :param path: str
+        path to the dataset folder
+    :return: (List[str], np.ndarray, np.ndarray, np.ndarray)
+        node type names, integer node type per node, edges of shape (m, 2) and edge type per edge
+    """
+    node_file = os.path.join(path, 'nodes.csv')
+    try:    # node types are integers in our datasets ...
+        values = np.loadtxt(node_file, dtype=np.int64, comments=None, ndmin=1)
+        type_values, node_type = np.unique(values, return_inverse=True)
+        type_names = [str(t) for t in type_values.tolist()]
+    except ValueError:  # ... but may be arbitrary names in general
+        with open(node_file, 'r') as f:
+            values = np.array([line.strip() for line in f])
+        type_values, node_type = np.unique(values, return_inverse=True)
+        type_names = type_values.tolist()
+
+    table = np.loadtxt(os.path.join(path, 'edges.csv'), dtype=np.int64, delimiter=',', comments=None, ndmin=2)
+    if len(table) == 0:
+        table = np.zeros((0, 3), dtype=np.int64)
+    edges = np.ascontiguousarray(table[:, [0, 2]])
+    edge_type = np.ascontiguousarray(table[:, 1].astype(np.int32))
+
+    return type_names, node_type.astype(np.int32), edges, edge_type
+
+
+def _source_stamp(path: str) -> Dict[str, List[int]]:
+    """ Return the size and modification time of the source files of a dataset folder. """
+    stamp = {}
+    for name in ('nodes.csv', 'edges.csv'):
+        stat = os.stat(os.path.join(path, name))
+        stamp[name] = [stat.st_size, stat.st_mtime_ns]
+    return stamp
+
+
+def _read_cache(path: str) -> Union[Dict[str, object], None]:
+    """ Memory-map the cached arrays of a dataset folder, or return None if there is no valid cache. """
+    cache_dir = os.path.join(path, CACHE_DIR)
+    try:
+        with open(os.path.join(cache_dir, 'meta.json'), 'r') as meta_file:
+            meta = json.load(meta_file)
+        if meta['version'] != CACHE_VERSION or meta['source'] != _source_stamp(path):
+            return None
+        arrays: Dict[str, object] = {name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='r')
+                                     for name in meta['arrays']}
+    except (OSError, ValueError, KeyError):
+        return None
+    arrays['type_names'] = meta['type_names']
+    return arrays
+
+
+def _write_cache(path: str, type_names: List[str], arrays: Dict[str, np.ndarray], new: List[str]):
+    """ Write the arrays of a dataset folder to its cache directory (if the folder is writable).
+
+    :param path: str
+        path to the dataset folder
+    :param type_names: List[str]
+        node type names
+    :param arrays: Dict[str, np.ndarray]
+        all cached arrays by name
+    :param new: List[str]
+        names of the arrays that are not yet stored in the cache (the others may be memory-mapped from it)
+    """
+    cache_dir = os.path.join(path, CACHE_DIR)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in new:
+            np.save(os.path.join(cache_dir, f'{name}.npy'), arrays[name])
+        meta = {'version': CACHE_VERSION, 'source': _source_stamp(path), 'type_names': type_names,
+                'arrays': list(arrays)}
+        with open(os.path.join(cache_dir, 'meta.json'), 'w') as meta_file:
+            json.dump(meta, meta_file)
+    except OSError:
+        pass    # e.g. a read-only dataset folder, the dataset is then parsed again on the next run
@@ -1,9 +1,14 @@
 from __future__ import annotations
-from typing import List, Set
+from typing import Dict, List, Sequence, Set, Tuple, Union
+from bisect import bisect_left
+import numpy as np
 
 
 HINEdge = (int, int)
 
+# the neighbors of a node of one type are searched linearly up to this many neighbors, and by bisection otherwise
+LINEAR_SCAN_SIZE: int = 16
+
 
 class HINNode:
     """
@@ -24,7 +29,7 @@ class HINNode:
 
 class HIN:
 
-    def __init__(self, nodes: List[HINNode], edges: List[HINEdge]):
+    def __init__(self, nodes: List[HINNode], edges: List[HINEdge], edge_type: np.ndarray = None):
         """
         Initializes an HIN from a List of HINNodes and a list of HINEdges.
 
@@ -32,24 +37,46 @@ class HIN:
             list of nodes
         :param edges : List[HINEdge]
             list of links
+        :param edge_type : np.ndarray (optional)
+            integer edge type for each edge ID
 
         Attributes
         ----------
         nodes : List[HINNode]
             store HINNode object, where list index corresponds to node ID
+        types : List[str]
+            stores the node type name for each node, where list index corresponds to node ID
         edges : List[(int, int)]
             stores the node IDs of the connected nodes for an edge ID, which corresponds to list index
         neighbors: List[Set[int]]
             stores the neighboring node IDs, where the list index corresponds to node ID
+        type_names : List[str]
+            sorted node type names, where list index corresponds to the integer node type
+        node_type : np.ndarray
+            integer node type for each node ID
+        typed_degree : np.ndarray
+            array of shape (n, |types|) with the number of neighbors of each integer node type for each node ID
+        edge_type : np.ndarray
+            integer edge type for each edge ID (None if unknown)
+        triangle_cache : Dict[int, Tuple[np.ndarray, np.ndarray]]
+            typed triangle counts of the nodes for which they have been computed
+            (cf. hin.motif.comb_relationships.typed_triangles)
+        node_ids : np.ndarray
+            original node ID of each node ID, if the nodes were relabeled when loading the graph (cf. hin.reorder),
+            otherwise None
+        edge_ids : np.ndarray
+            original edge ID of each edge ID, if the edges were reordered when loading the graph, otherwise None
         """
 
         self.nodes: List[HINNode] = []
+        self.types: List[str] = []
         self.neighbors: List[Set[int]] = []
         self.edges: List[(int, int)] = []
         self.node_types: Set[str] = set()
 
         for v in nodes:
             self.nodes.append(v)
+            self.types.append(v.type)
             self.neighbors.append(set())
             self.node_types.add(v.type)
 
@@ -57,6 +84,43 @@ class HIN:
             self.edges.append((i, j))
             self.neighbors[i].add(j)
             self.neighbors[j].add(i)
+        self.edge_type: np.ndarray = edge_type
+        # the edges (and edge types) are kept in arrays with spare capacity, which grow geometrically when edges are
+        # added, so that edge_array is never rebuilt from the edge list (cf. add_edge, remove_edge)
+        self._edge_buffer: np.ndarray = np.array(self.edges, dtype=np.int64).reshape(-1, 2)
+        self._edge_type_buffer: Union[np.ndarray, None] = None if edge_type is None else np.array(edge_type)
+        if self._edge_type_buffer is not None:
+            self.edge_type = self._edge_type_buffer[:len(self.edges)]
+
+        self.type_names: List[str] = sorted(self.node_types)
+        type_ids: Dict[str, int] = {t: k for k, t in enumerate(self.type_names)}
+        self.node_type: np.ndarray = np.fromiter((type_ids[t] for t in self.types), dtype=np.int32,
+                                                 count=len(self.types))
+
+        n, n_t = len(self.nodes), len(self.type_names)
+        degree = np.fromiter((len(nb) for nb in self.neighbors), dtype=np.int64, count=n)
+        src = np.repeat(np.arange(n, dtype=np.int64), degree)
+        dst = np.fromiter((k for nb in self.neighbors for k in nb), dtype=np.int64, count=int(degree.sum()))
+        self.typed_degree: np.ndarray = np.bincount(src * n_t + self.node_type[dst],
+                                                    minlength=n * n_t).reshape(n, n_t)
+        self.triangle_cache: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self.node_ids: Union[np.ndarray, None] = None
+        self.edge_ids: Union[np.ndarray, None] = None
+
+    @property
+    def edge_array(self) -> np.ndarray:
+        """ Return an array of shape (m, 2) with the node IDs of the connected nodes, where row index is the edge ID
+        (a view, which must not be modified). """
+        return self._edge_buffer[:len(self.edges)]
+
+    def degrees(self, nodes: Sequence[int]) -> np.ndarray:
+        """ Return the number of neighbors of each of the nodes. """
+        return self.typed_degree[nodes].sum(axis=-1)
+
+    def typed_degrees(self, nodes: Union[int, Sequence[int]]) -> np.ndarray:
+        """ Return the number of neighbors of each integer node type of a node (array of shape (|types|,)), resp. of
+        each of the nodes (array of shape (len(nodes), |types|)). """
+        return self.typed_degree[nodes]
 
     def connected(self, i: int, j: int) -> bool:
         """ Return true if node i and node j are connected by an edge in the network. """
@@ -64,3 +128,329 @@ class HIN:
             return True
         else:
             return False
+
+    def add_edge(self, i: int, j: int, edge_type: int = -1) -> int:
+        """ Add an edge between node i and node j (which must not be connected yet).
+
+        :param i: int
+            node ID
+        :param j: int
+            node ID
+        :param edge_type: int
+            integer edge type of the new edge, if edge types are known (Default: -1)
+        :return: int
+            edge ID of the new edge
+        """
+        if i == j or self.connected(i, j):
+            raise ValueError(f"Cannot add edge ({i}, {j}), since it is a self-loop or the nodes are connected.")
+
+        self._invalidate_triangles(i, j)
+        m = len(self.edges)
+        self._edge_buffer = grow(self._edge_buffer, m + 1)
+        self._edge_buffer[m] = i, j
+        if self.edge_type is not None:
+            self._edge_type_buffer = grow(self._edge_type_buffer, m + 1)
+            self._edge_type_buffer[m] = edge_type
+            self.edge_type = self._edge_type_buffer[:m + 1]
+        self.edges.append((i, j))
+        self.neighbors[i].add(j)
+        self.neighbors[j].add(i)
+        self.typed_degree[i, self.node_type[j]] += 1
+        self.typed_degree[j, self.node_type[i]] += 1
+        return m
+
+    def remove_edge(self, edge_id: int) -> int:
+        """ Remove an edge. To keep the edge IDs contiguous, the last edge takes over the ID of the removed edge.
+
+        :param edge_id: int
+            edge ID of the edge to remove
+        :return: int
+            previous edge ID of the edge that now has the given edge ID (equal to edge_id for the last edge)
+        """
+        i, j = self.edges[edge_id]
+        self._invalidate_triangles(i, j)
+        self.neighbors[i].discard(j)
+        self.neighbors[j].discard(i)
+        self.typed_degree[i, self.node_type[j]] -= 1
+        self.typed_degree[j, self.node_type[i]] -= 1
+
+        last = len(self.edges) - 1
+        self.edges[edge_id] = self.edges[last]
+        self.edges.pop()
+        self._edge_buffer[edge_id] = self._edge_buffer[last]
+        if self.edge_type is not None:
+            self._edge_type_buffer[edge_id] = self._edge_type_buffer[last]
+            self.edge_type = self._edge_type_buffer[:last]
+        return last
+
+    def _invalidate_triangles(self, i: int, j: int):
+        """ Drop the cached triangle counts of all nodes whose triangles change with the edge between i and j. """
+        for v in (i, j, *(self.neighbors[i] & self.neighbors[j])):
+            self.triangle_cache.pop(v, None)
+
+
+def grow(buffer: np.ndarray, size: int) -> np.ndarray:
+    """ Return the buffer, or a copy of it with (at least) twice its capacity if it holds less than size rows. """
+    if len(buffer) >= size:
+        return buffer
+    grown = np.empty((max(size, 2 * len(buffer)),) + buffer.shape[1:], dtype=buffer.dtype)
+    grown[:len(buffer)] = buffer
+    return grown
+
+
+def type_dtype(n_t: int) -> type:
+    """ Return the smallest integer type that holds the integer node types. """
+    return np.int8 if n_t <= np.iinfo(np.int8).max else np.int16 if n_t <= np.iinfo(np.int16).max else np.int32
+
+
+def type_runs(src: np.ndarray, neighbor_type: np.ndarray, row_start: np.ndarray,
+              n_t: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Return the runs of neighbors of the same node type of an adjacency that is sorted by source node and neighbor type,
+    i.e. one run per node and node type of its neighbors (cf. CSRHIN).
+
+    :param src: np.ndarray
+        (local) source node of each adjacency entry, in ascending order
+    :param neighbor_type: np.ndarray
+        integer node type of each adjacency entry, in ascending order per source node
+    :param row_start: np.ndarray
+        position of the first adjacency entry of each (local) source node
+    :param n_t: int
+        number of node types
+    :return: (np.ndarray, np.ndarray, np.ndarray)
+        the number of runs of each (local) source node, and the node type and the end (relative to the first entry of
+        its node) of each run
+    """
+    first = np.ones(len(src), dtype=bool)
+    first[1:] = (src[1:] != src[:-1]) | (neighbor_type[1:] != neighbor_type[:-1])
+    starts = np.flatnonzero(first)
+    ends = np.append(starts[1:], len(src))
+    run_src = src[starts]
+    return (np.bincount(run_src, minlength=len(row_start)), neighbor_type[starts].astype(type_dtype(n_t)),
+            ends - row_start[run_src])
+
+
+def build_csr(node_type: np.ndarray, edges: np.ndarray, n_t: int) -> Tuple[np.ndarray, ...]:
+    """
+    Build the CSR adjacency of a graph (cf. CSRHIN), where the neighbors of each node are sorted by node type and then
+    by node ID, and parallel edges are dropped.
+
+    :param node_type: np.ndarray
+        integer type of each node
+    :param edges: np.ndarray
+        array of shape (m, 2) with the node IDs of the connected nodes
+    :param n_t: int
+        number of node types
+    :return: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray)
+        the arrays indptr, indices, type_indptr, type_ids and type_ends of the CSR adjacency
+    """
+    n = len(node_type)
+    index_dtype = np.int32 if n < np.iinfo(np.int32).max else np.int64
+
+    # both directions of each edge, sorted by source, neighbor type and neighbor ID
+    src = np.concatenate([edges[:, 0], edges[:, 1]])
+    dst = np.concatenate([edges[:, 1], edges[:, 0]])
+    order = np.lexsort((dst, node_type[dst], src))
+    src, dst = src[order], dst[order]
+    # drop parallel edges, so that the adjacency matches the set-based HIN
+    keep = np.ones(len(src), dtype=bool)
+    keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    src, dst = src[keep], dst[keep]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    indices = dst.astype(index_dtype)
+
+    # the runs of neighbors of the same type, whose ends (at most the degree) fit into the index type
+    n_runs, type_ids, type_ends = type_runs(src, node_type[dst], indptr[:-1], n_t)
+    type_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(n_runs, out=type_indptr[1:])
+    return indptr, indices, type_indptr, type_ids, type_ends.astype(index_dtype)
+
+
+class _EdgeView:
+    """ Read-only sequence view on the edge arrays of a CSRHIN that yields (int, int) tuples. """
+
+    def __init__(self, edges: np.ndarray):
+        self._src: np.ndarray = edges[:, 0]
+        self._dst: np.ndarray = edges[:, 1]
+
+    def __len__(self) -> int:
+        return len(self._src)
+
+    def __getitem__(self, edge_id: int) -> HINEdge:
+        return int(self._src[edge_id]), int(self._dst[edge_id])
+
+    def __iter__(self):
+        for i, j in zip(self._src.tolist(), self._dst.tolist()):
+            yield i, j
+
+
+class _NeighborView:
+    """ Read-only sequence view on the CSR adjacency of a CSRHIN that yields the neighbor IDs of a node as list. """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray):
+        self._indptr: np.ndarray = indptr
+        self._indices: np.ndarray = indices
+
+    def __len__(self) -> int:
+        return len(self._indptr) - 1
+
+    def __getitem__(self, v: int) -> List[int]:
+        return self._indices[self._indptr[v]:self._indptr[v + 1]].tolist()
+
+
+class CSRHIN:
+
+    def __init__(self, node_type: np.ndarray, edges: np.ndarray, type_names: List[str], edge_type: np.ndarray = None,
+                 csr: Tuple[np.ndarray, ...] = None):
+        """
+        Initializes a compact, array-backed HIN. The adjacency is stored in CSR layout, where the neighbors of each
+        node are sorted by node type and then by node ID. Hence, all neighbors of one type form a contiguous range (a
+        run), and only the node type and the end of each run are stored instead of a typed-degree table. It offers the
+        same interface as HIN that is used by the counting functions (except for the node objects).
+
+        :param node_type: np.ndarray
+            integer type of each node (index into type_names), where array index corresponds to node ID
+        :param edges: np.ndarray
+            array of shape (m, 2) with the node IDs of the connected nodes, where row index corresponds to edge ID
+        :param type_names: List[str]
+            node type names
+        :param edge_type: np.ndarray (optional)
+            integer edge type for each edge ID
+        :param csr: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray) (optional)
+            precomputed (indptr, indices, type_indptr, type_ids, type_ends) arrays (cf. build_csr), e.g. memory-mapped
+            from a cache
+
+        Attributes
+        ----------
+        node_type : np.ndarray
+            integer node type for each node ID
+        type_names : List[str]
+            node type name for each integer node type
+        types : List[str]
+            stores the node type name for each node, where list index corresponds to node ID
+        indptr : np.ndarray
+            CSR row pointers, the neighbors of node v are stored at indices[indptr[v]:indptr[v + 1]]
+        indices : np.ndarray
+            CSR column indices, sorted by node type and node ID per node
+        type_indptr : np.ndarray
+            pointers to the runs of neighbors of the same type, the runs of node v are type_indptr[v]:type_indptr[v + 1]
+        type_ids : np.ndarray
+            integer node type of the neighbors of each run (in ascending order per node)
+        type_ends : np.ndarray
+            end of each run relative to indptr[v] (in the index type of indices), i.e. the neighbors of node v with
+            the integer type type_ids[r] are stored at indices[indptr[v] + type_ends[r - 1]:indptr[v] + type_ends[r]]
+            (starting at indptr[v] for the first run of v)
+        edges : _EdgeView
+            stores the node IDs of the connected nodes for an edge ID
+        edge_array : np.ndarray
+            array of shape (m, 2) with the node IDs of the connected nodes, where row index corresponds to edge ID
+        edge_type : np.ndarray
+            integer edge type for each edge ID (None if unknown)
+        neighbors : _NeighborView
+            returns a list of neighboring node IDs for a node ID
+        triangle_cache : Dict[int, Tuple[np.ndarray, np.ndarray]]
+            typed triangle counts of the nodes for which they have been computed
+            (cf. hin.motif.comb_relationships.typed_triangles)
+        node_ids : np.ndarray
+            original node ID of each node ID, if the nodes were relabeled when loading the graph (cf. hin.reorder),
+            otherwise None
+        edge_ids : np.ndarray
+            original edge ID of each edge ID, if the edges were reordered when loading the graph, otherwise None
+        """
+
+        n_t = len(type_names)
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+
+        self.node_type: np.ndarray = np.asarray(node_type, dtype=np.int32)
+        self.type_names: List[str] = list(type_names)
+        self.types: List[str] = [self.type_names[t] for t in self.node_type.tolist()]
+        self.node_types: Set[str] = set(self.types)
+        self.edge_array: np.ndarray = edges
+        self.edge_type: np.ndarray = edge_type
+
+        if csr is not None:
+            self.indptr, self.indices, self.type_indptr, self.type_ids, self.type_ends = csr
+        else:
+            self._build_csr(n_t)
+
+        self.edges: _EdgeView = _EdgeView(edges)
+        self.neighbors: _NeighborView = _NeighborView(self.indptr, self.indices)
+        self.triangle_cache: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self.node_ids: Union[np.ndarray, None] = None
+        self.edge_ids: Union[np.ndarray, None] = None
+
+    def _build_csr(self, n_t: int):
+        """ Build the CSR adjacency (and the runs of neighbors of the same type) from the edge array. """
+        self.indptr, self.indices, self.type_indptr, self.type_ids, self.type_ends = \
+            build_csr(self.node_type, self.edge_array, n_t)
+
+    @classmethod
+    def from_hin(cls, hin: HIN) -> CSRHIN:
+        """ Convert a set-based HIN into its compact CSR representation. """
+        csr = cls(hin.node_type, hin.edge_array, hin.type_names, edge_type=hin.edge_type)
+        csr.node_ids, csr.edge_ids = hin.node_ids, hin.edge_ids
+        return csr
+
+    def degree(self, v: int) -> int:
+        """ Return the number of neighbors of node v. """
+        return int(self.indptr[v + 1] - self.indptr[v])
+
+    def degrees(self, nodes: Sequence[int]) -> np.ndarray:
+        """ Return the number of neighbors of each of the nodes. """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        return self.indptr[nodes + 1] - self.indptr[nodes]
+
+    def typed_degrees(self, nodes: Union[int, Sequence[int]]) -> np.ndarray:
+        """ Return the number of neighbors of each integer node type of a node (array of shape (|types|,)), resp. of
+        each of the nodes (array of shape (len(nodes), |types|)). """
+        if np.ndim(nodes) == 0:     # a single node, whose few runs are faster to copy in Python
+            first, stop = int(self.type_indptr[nodes]), int(self.type_indptr[nodes + 1])
+            row = np.zeros(len(self.type_names), dtype=np.int64)
+            start = 0
+            for t, end in zip(self.type_ids[first:stop].tolist(), self.type_ends[first:stop].tolist()):
+                row[t] = end - start
+                start = end
+            return row
+        nodes = np.asarray(nodes, dtype=np.int64)
+        flat = nodes.reshape(-1)
+        first, lengths = self.type_indptr[flat], self.type_indptr[flat + 1] - self.type_indptr[flat]
+        offsets = np.cumsum(lengths) - lengths
+        # the runs of all nodes, their ends and the number of neighbors in each run
+        runs = np.arange(int(lengths.sum())) + np.repeat(first - offsets, lengths)
+        ends = self.type_ends[runs].astype(np.int64)
+        counts = ends.copy()
+        counts[1:] -= ends[:-1]
+        firsts = offsets[lengths > 0]     # the first run of a node starts at its row start
+        counts[firsts] = ends[firsts]
+        rows = np.zeros((len(flat), len(self.type_names)), dtype=np.int64)
+        rows[np.repeat(np.arange(len(flat)), lengths), self.type_ids[runs]] = counts
+        return rows.reshape(nodes.shape + (len(self.type_names),))
+
+    def type_range(self, v: int, t: int) -> Tuple[int, int]:
+        """ Return the range of the neighbors of node v that have the integer node type t in indices. """
+        first, stop = int(self.type_indptr[v]), int(self.type_indptr[v + 1])
+        base = int(self.indptr[v])
+        r = first + bisect_left(self.type_ids[first:stop].tolist(), t)
+        if r == stop or self.type_ids[r] != t:
+            return base, base
+        return base + (int(self.type_ends[r - 1]) if r > first else 0), base + int(self.type_ends[r])
+
+    def neighbors_of_type(self, v: int, t: int) -> np.ndarray:
+        """ Return the (sorted) neighbor IDs of node v that have the integer node type t. """
+        lo, hi = self.type_range(v, t)
+        return self.indices[lo:hi]
+
+    def connected(self, i: int, j: int) -> bool:
+        """ Return true if node i and node j are connected by an edge in the network. """
+        lo, hi = self.type_range(i, int(self.node_type[j]))
+        if hi - lo <= LINEAR_SCAN_SIZE:
+            return j in self.indices[lo:hi].tolist()
+        pos = lo + int(np.searchsorted(self.indices[lo:hi], j))
+        return pos < hi and int(self.indices[pos]) == j
+
+    def nbytes(self) -> int:
+        """ Return the number of bytes consumed by the graph arrays. """
+        return (self.node_type.nbytes + self.edge_array.nbytes + self.indptr.nbytes + self.indices.nbytes
+                + self.type_indptr.nbytes + self.type_ids.nbytes + self.type_ends.nbytes)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import os
+import sys
+import json
+import heapq
+import time
+from contextlib import contextmanager
+from typing import Dict, List, TextIO, Tuple, Union
+import numpy as np
+
+
+# phases of a run, the counting phases are timed per edge
+PHASES: Tuple[str, ...] = ('load',              # loading the dataset
+                           'count',             # all motifs of an edge, unless its phases are timed (cf. detailed)
+                           'count_3_node',      # 3-node motifs (and the sets Si, Sj, Tij)
+                           'path_based',        # path-based 4-node motifs (resp. 4-cycles of derived edges)
+                           'triangle_based',    # triangle-based 4-node motifs
+                           'comb',              # combinatorial relationships
+                           'global',            # all motifs of an edge in global-only mode
+                           'kernel',            # all motifs of the edges with the kernel engine (cf. kernel_engine)
+                           'correct',           # correction of the global counts
+                           'dump')              # serialization of the results
+# number of edges in the list of the most expensive edges
+TOP_N: int = 20
+# number of seconds between two progress lines
+PROGRESS_INTERVAL: float = 30.0
+
+
+class Metrics:
+
+    def __init__(self, top_n: int = TOP_N, progress_interval: float = PROGRESS_INTERVAL,
+                 stream: Union[TextIO, None] = sys.stderr, detailed: bool = False):
+        """
+        Collect low-overhead metrics of a counting run: the time spent in each coarse phase, the most expensive
+        edges, and a periodic progress line with an estimate of the remaining time. Detailed metrics additionally
+        attribute the time of each edge to its counting phases, and count the orbit instances that were enumerated
+        resp. derived with combinatorial relationships and the hin.connected calls, which slows the counting down.
+
+        :param top_n: int
+            number of most expensive edges that are kept (Default: TOP_N)
+        :param progress_interval: float
+            number of seconds between two progress lines (Default: PROGRESS_INTERVAL)
+        :param stream: TextIO
+            stream for the progress lines, None turns them off (Default: sys.stderr)
+        :param detailed: bool
+            flag to signal whether the per-edge phases, orbit instances and hin.connected calls are measured,
+            otherwise lap and instrumented do nothing (Default: False)
+        """
+        self.phase_seconds: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.counters: Dict[str, int] = {'edges': 0, 'enumerated_instances': 0, 'derived_instances': 0,
+                                         'connected_calls': 0}
+        self.top_n: int = top_n
+        self.progress_interval: float = progress_interval
+        self.stream: Union[TextIO, None] = stream
+        self.detailed: bool = detailed
+
+        # min-heap of the (seconds, edge ID) of the most expensive edges
+        self._top: List[Tuple[float, int]] = []
+        # start of the current edge, of the current phase of the edge, and sum of its orbit counts
+        self._edge_start: float = 0.0
+        self._lap: float = 0.0
+        self._instances: int = 0
+        # estimated costs of the edges (if given), by which the progress of the counting is weighted
+        self.costs: Union[np.ndarray, None] = None
+        self._total_cost: float = 0.0
+        self._done_cost: float = 0.0
+        self._n_edges: int = 0
+        self._start: float = 0.0
+        self._last_progress: float = 0.0
+
+    @contextmanager
+    def phase(self, name: str):
+        """ Time a (coarse) phase of the run, e.g. with metrics.phase('load'): ... """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] += time.perf_counter() - start
+
+    @contextmanager
+    def instrumented(self, hin):
+        """ Count the calls of hin.connected while in this context (only for detailed metrics). """
+        if not self.detailed:
+            yield hin
+            return
+        connected = hin.connected
+        counters = self.counters
+
+        def counting_connected(i: int, j: int) -> bool:
+            counters['connected_calls'] += 1
+            return connected(i, j)
+
+        hin.connected = counting_connected
+        try:
+            yield hin
+        finally:
+            del hin.connected   # restore the method of the class
+
+    def start(self, n_edges: int, costs: np.ndarray = None):
+        """ Start the progress of the counting of n_edges edges (with their estimated costs, for a better ETA). """
+        self._n_edges = n_edges
+        self.costs = costs
+        self._total_cost = float(costs.sum()) if costs is not None else float(n_edges)
+        self._done_cost = 0.0
+        self._start = self._last_progress = time.perf_counter()
+
+    def start_edge(self):
+        """ Start the timers of an edge (the phase laps of the edge are only measured by detailed metrics). """
+        self._edge_start = self._lap = time.perf_counter()
+        self._instances = 0
+
+    def lap(self, phase: str, orbit_counts: Dict[Union[str, int], int] = None):
+        """ Attribute the time since the last lap of the current edge to a phase, as well as the orbit instances that
+        were added to its orbit counts (only for detailed metrics). """
+        if not self.detailed:
+            return
+        now = time.perf_counter()
+        self.phase_seconds[phase] += now - self._lap
+        self._lap = now
+        if orbit_counts is not None:
+            instances = sum(orbit_counts.values())
+            key = 'derived_instances' if phase == 'comb' else 'enumerated_instances'
+            self.counters[key] += instances - self._instances
+            self._instances = instances
+
+    def end_edge(self, edge_id: int):
+        """ Stop the timers of an edge and print the progress, if due. """
+        now = time.perf_counter()
+        self.add_edges(1, self.costs[edge_id] if self.costs is not None else 1.0, now)
+        seconds = now - self._edge_start
+        if not self.detailed:
+            self.phase_seconds['count'] += seconds
+        if len(self._top) < self.top_n:
+            heapq.heappush(self._top, (seconds, edge_id))
+        elif seconds > self._top[0][0]:
+            heapq.heapreplace(self._top, (seconds, edge_id))
+
+    def add_edges(self, n: int, cost: float, now: float = None):
+        """ Add finished edges (with their total estimated cost) to the progress and print it, if due. """
+        self.counters['edges'] += n
+        self._done_cost += cost
+        now = time.perf_counter() if now is None else now
+        if self.stream is not None and now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            self.stream.write(self.progress_line(now) + '\n')
+            self.stream.flush()
+
+    def progress_line(self, now: float = None) -> str:
+        """ Return a line with the number of finished edges, the throughput and the estimated remaining time. """
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self._start
+        done, total = self.counters['edges'], self._n_edges
+        fraction = self._done_cost / self._total_cost if self._total_cost > 0 else 1.0
+        eta = elapsed * (1 - fraction) / fraction if fraction > 0 else float('nan')
+        return (f"{done}/{total} edges ({100 * fraction:.1f}% of the estimated cost), "
+                f"{done / elapsed if elapsed > 0 else 0:.0f} edges/s, elapsed {_duration(elapsed)}, "
+                f"ETA {_duration(eta)}")
+
+    def merge(self, other: Union[Metrics, Dict[str, object]]):
+        """ Add the phase times, counters and expensive edges of other metrics (e.g. of a worker process). """
+        if isinstance(other, Metrics):
+            other = other.to_dict()
+        for phase, seconds in other['phase_seconds'].items():
+            self.phase_seconds[phase] += seconds
+        for key, value in other['counters'].items():
+            if key != 'edges':  # finished edges are added with add_edges
+                self.counters[key] += value
+        for edge in other['top_edges']:
+            heapq.heappush(self._top, (edge['seconds'], edge['edge_id']))
+            if len(self._top) > self.top_n:
+                heapq.heappop(self._top)
+
+    def to_dict(self) -> Dict[str, object]:
+        """ Return all metrics as a (json serializable) dictionary. """
+        return {'phase_seconds': dict(self.phase_seconds),
+                'counters': dict(self.counters),
+                'top_edges': [{'edge_id': int(e), 'seconds': s} for s, e in sorted(self._top, reverse=True)]}
+
+    def dump_to_json(self, directory: str):
+        """ Dump the metrics into the json file 'metrics.json' at the specified directory.
+
+        :param directory: str
+            path to the directory where the file will be stored
+        """
+        json.dump(self.to_dict(), open(os.path.join(directory, 'metrics.json'), 'w'), indent=2)
+
+
+def _duration(seconds: float) -> str:
+    """ Format a number of seconds as h:mm:ss. """
+    if not np.isfinite(seconds):
+        return '?'
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02}:{seconds % 60:02}"
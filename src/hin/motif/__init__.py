@@ -1,2 +1,4 @@
 
-__all__ = ["count_3_4_node_motifs", "hash", "count_dict"]
+__all__ = ["count_3_4_node_motifs", "hash", "count_dict", "count_store", "incremental", "parallel", "sampling",
+           "checkpoint", "query", "sparse_engine", "out_of_core", "distributed", "type_filter", "stream",
+           "engine", "kernel_engine", "node_orbits"]
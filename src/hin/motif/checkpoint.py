@@ -0,0 +1,137 @@
+import os
+import json
+import pickle
+import hashlib
+from typing import Dict, List, Tuple
+import numpy as np
+from ..hin import HIN
+from .count_dict import CountDict, GlobalCountDict
+
+
+# version of the checkpoint layout, checkpoints with another version cannot be resumed
+CHECKPOINT_VERSION: int = 1
+# default number of seconds between two checkpoints of a sequential run
+CHECKPOINT_INTERVAL: float = 600.0
+
+
+class Checkpoint:
+
+    def __init__(self, directory: str, hin: HIN, comb: bool = True, int_codes: bool = False,
+                 global_only: bool = False, resume: bool = False):
+        """
+        Checkpoints of a (long) counting run. A checkpoint is a range of finished edge IDs together with the
+        uncorrected partial counts of exactly these edges, which are pickled to a segment file of their own. Hence,
+        each checkpoint only writes the counts of the edges finished since the previous one, and the segments of all
+        checkpoints merged in the order of the edge IDs yield the same counts as an uninterrupted run.
+        The finished ranges are listed in the file 'checkpoint.json', which is replaced atomically.
+
+        :param directory: str
+            path to the checkpoint directory (created if it does not exist)
+        :param hin: HIN
+            the graph that is counted
+        :param comb: bool
+            flag to signal whether combinatorial relationships are used (Default: True)
+        :param int_codes: bool
+            flag to signal whether motifs and orbits are encoded by integer codes (Default: False)
+        :param global_only: bool
+            flag to signal whether only global motif counts are computed (Default: False)
+        :param resume: bool
+            flag to signal whether to continue from an existing checkpoint in the directory, otherwise existing
+            checkpoints are discarded (Default: False)
+        """
+        self.directory: str = directory
+        self.global_only: bool = global_only
+        self.config: Dict[str, object] = {'version': CHECKPOINT_VERSION, 'graph': fingerprint(hin),
+                                          'comb': comb, 'int_codes': int_codes, 'global_only': global_only}
+        # finished (start, stop) edge ID ranges and the names of their segment files
+        self.ranges: List[Tuple[int, int, str]] = []
+
+        manifest_file = os.path.join(directory, 'checkpoint.json')
+        if resume and os.path.exists(manifest_file):
+            with open(manifest_file, 'r') as f:
+                manifest = json.load(f)
+            if {key: manifest.get(key) for key in self.config} != self.config:
+                raise ValueError(f"Checkpoint in {directory} belongs to another graph or other counting options")
+            self.ranges = [(start, stop, name) for start, stop, name in manifest['ranges']]
+        else:
+            self.clear()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def next_edge(self) -> int:
+        """ The first edge ID that is not finished, i.e. the highest finished edge ID (of a sequential run) + 1. """
+        next_edge = 0
+        for start, stop, _ in sorted(self.ranges):
+            if start != next_edge:
+                break
+            next_edge = stop
+        return next_edge
+
+    def remaining(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        """ Return the ranges of the edge IDs in [start, stop) that are not finished yet. """
+        ranges = []
+        for s, e, _ in sorted(self.ranges):
+            if e <= start or s >= stop:
+                continue
+            if s > start:
+                ranges.append((start, s))
+            start = max(start, e)
+        if start < stop:
+            ranges.append((start, stop))
+        return ranges
+
+    def save(self, start: int, stop: int, partial: CountDict):
+        """ Save the (uncorrected) partial counts of the edges in [start, stop) as a checkpoint.
+
+        :param start: int
+            first edge ID of the range
+        :param stop: int
+            edge ID after the last edge ID of the range
+        :param partial: CountDict
+            counts of exactly the edges in the range
+        """
+        name = f'segment_{start}_{stop}.pkl'
+        _atomic_write(os.path.join(self.directory, name), pickle.dumps(
+            (partial.orbit_count, partial.local_count, partial.global_count), protocol=pickle.HIGHEST_PROTOCOL))
+        self.ranges.append((start, stop, name))
+        manifest = dict(self.config, ranges=self.ranges, next_edge=self.next_edge)
+        _atomic_write(os.path.join(self.directory, 'checkpoint.json'), json.dumps(manifest).encode())
+
+    def load(self) -> List[Tuple[int, int, CountDict]]:
+        """ Load the partial counts of all finished ranges (ordered by edge ID). """
+        partials = []
+        for start, stop, name in sorted(self.ranges):
+            partial = GlobalCountDict() if self.global_only else CountDict()
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                partial.orbit_count, partial.local_count, partial.global_count = pickle.load(f)
+            partials.append((start, stop, partial))
+        return partials
+
+    def clear(self):
+        """ Remove all checkpoints (e.g. once the results are written). """
+        self.ranges = []
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.startswith('checkpoint.json') or name.startswith('segment_'):
+                os.remove(os.path.join(self.directory, name))
+        if len(os.listdir(self.directory)) == 0:
+            os.rmdir(self.directory)
+
+
+def fingerprint(hin: HIN) -> str:
+    """ Return a digest of the node types and edges of a graph, to recognize checkpoints or workers of other graphs. """
+    digest = hashlib.sha1()
+    digest.update(json.dumps(list(hin.type_names)).encode())
+    digest.update(np.asarray(hin.node_type, dtype=np.int32).tobytes())
+    digest.update(np.asarray(hin.edge_array, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def _atomic_write(path: str, data: bytes):
+    """ Write data to a file, such that an interrupted write never leaves a corrupted file behind. """
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
@@ -1,8 +1,130 @@
 from typing import Set
+import numpy as np
 from ..hin import HIN
 from .hash import HashMotif
 from .count_dict import CountDict
-from math import comb
+
+
+# the path-based orbits of an edge are derived instead of enumerated, once the neighbors of its end nodes (except for
+# the end nodes themselves) have more neighbors than this in total, i.e. for edges at or next to hubs
+PATH_DERIVATION_COST: int = 300
+
+
+def path_cost(hin: HIN, Si: Set[int], Sj: Set[int]) -> int:
+    """ Return the number of nodes visited by the explicit enumeration of the path-based motifs of an edge, i.e. the
+    total degree of the nodes in Si and Sj. """
+    if len(Si) + len(Sj) == 0:
+        return 0
+    return int(hin.degrees(list(Si) + list(Sj)).sum())
+
+
+def typed_triangles(hin: HIN, v: int) -> np.ndarray:
+    """
+    Return the typed triangle counts of a node, i.e. the number of connected pairs of neighbors of v for each pair of
+    node types. The counts are computed once per node and cached in the HIN (which drops them when v's triangles
+    change).
+
+    :param hin: HIN
+        the underlying graph
+    :param v: int
+        node ID
+    :return: np.ndarray
+        symmetric array of shape (|types|, |types|), where entry (t1, t2) is the number of triangles of v whose other
+        nodes have the integer types t1 and t2, counted twice if t1 == t2
+    """
+    n_t = len(hin.type_names)
+    cached = hin.triangle_cache.get(v)
+    if cached is None:
+        nbrs = set(hin.neighbors[v])
+        owners, others = [], []
+        for x in nbrs:  # each triangle (v, x, y) is found for x and for y
+            common = nbrs.intersection(hin.neighbors[x])
+            owners.extend([x] * len(common))
+            others.extend(common)
+        keys = hin.node_type[owners].astype(np.int64) * n_t + hin.node_type[others]
+        cached = np.unique(keys, return_counts=True)
+        hin.triangle_cache[v] = cached
+    tri = np.zeros(n_t * n_t, dtype=np.int64)
+    tri[cached[0]] = cached[1]
+    return tri.reshape(n_t, n_t)
+
+
+def derive_path_counts(hin: HIN,
+                       edge_id: int,
+                       Si: Set[int],
+                       Sj: Set[int],
+                       Tij: Set[int],
+                       counts: CountDict,
+                       hf: HashMotif):
+    """
+    Derive the 4-path edge orbit (g3) and the tailed triangle tail orbit (g7) from combinatorial relationships, which
+    replaces their explicit enumeration over all neighbors of the nodes in Si and Sj (cf. count_path_based_motifs).
+    The 4-cycle (g6), chordal cycle edge (g10) and 4-clique (g12) orbits must have been counted for the edge already.
+
+    Every connected pair of nodes in Si (resp. Sj) forms a triangle with i (resp. j), so that g7 follows from the typed
+    triangle counts of i and j minus their triangles with nodes in Tij (g10, g12) and the triangles with the edge
+    itself. Every neighbor r of a node k in Si or Sj forms a 4-path (edge orbit) with the edge, except for i and j and
+    the nodes in Si, Sj and Tij, which are the remaining orbits g6, g7 and g10. Hence, g3 follows from the typed
+    degrees of the nodes in Si and Sj.
+
+    :param hin: HIN
+        the underlying graph
+    :param edge_id: int
+        edge ID of the current edge between nodes i and j
+    :param Si: Set[int]
+        set of node IDs that are connected to i (and not j)
+    :param Sj: Set[int]
+        set of node IDs that are connected to j (and not i)
+    :param Tij: Set[int]
+        set of node IDs that are connected to i and j
+    :param counts : CountDict
+        maintain local and global motif counts, as well as local orbit counts
+    :param hf: HashMotif
+        class that can en- and decode motifs to hash strings
+    """
+
+    i, j = hin.edges[edge_id]
+    t_i, t_j = hin.types[i], hin.types[j]
+    n_t = len(hin.type_names)
+    e_i, e_j = np.eye(n_t, dtype=np.int64)[[hin.node_type[i], hin.node_type[j]]]
+
+    # all pairwise counts are symmetric arrays over the pairs of node types, where pairs of the same type count twice
+    S = np.array(list(Si) + list(Sj), dtype=np.int64)
+    s_type = np.eye(n_t, dtype=np.int64)[hin.node_type[S]]
+    si = s_type[:len(Si)].sum(axis=0)
+    sj = s_type[len(Si):].sum(axis=0)
+    tij = np.bincount(hin.node_type[list(Tij)], minlength=n_t)
+
+    # (k, r) for each neighbor r of each node k in Si or Sj, except for r = i, j
+    paths = s_type.T @ hin.typed_degrees(S) - np.outer(si, e_i) - np.outer(sj, e_j)
+    paths += paths.T
+    # connected pairs in the neighborhoods of i and j, except for those with j resp. i
+    pairs = typed_triangles(hin, i) + typed_triangles(hin, j) - np.outer(e_j + e_i, tij)
+    pairs -= np.outer(tij, e_j + e_i)
+
+    candidates = np.triu((paths > 0) | (pairs > 0))
+    orbit_count = counts.orbit_count[edge_id]
+    type_names = hin.type_names
+
+    for a, b in zip(*(idx.tolist() for idx in np.nonzero(candidates))):
+        t1, t2 = type_names[a], type_names[b]
+        scale = 2 if a == b else 1
+        _, h_6 = hf.hash_motif(6, t_i, t_j, t1, t2)
+        _, h_10 = hf.hash_motif(10, t_i, t_j, t1, t2)
+        _, h_12 = hf.hash_motif(12, t_i, t_j, t1, t2)
+        n_6, n_10, n_12 = orbit_count.get(h_6, 0), orbit_count.get(h_10, 0), orbit_count.get(h_12, 0)
+
+        # g_7 (tailed triangle tail orbit): connected pairs in Si or Sj
+        count_7 = int(pairs[a, b]) // scale - n_10 - 2 * n_12
+        if count_7 > 0:
+            mh, oh = hf.hash_motif(7, t_i, t_j, t1, t2)
+            counts.update(edge_id, mh, oh, count=count_7)
+
+        # g_3 (4-path edge orbit): each connected pair in Si and Sj was counted from both of its nodes
+        count_3 = int(paths[a, b]) // scale - 2 * (count_7 + n_6) - n_10
+        if count_3 > 0:
+            mh, oh = hf.hash_motif(3, t_i, t_j, t1, t2)
+            counts.update(edge_id, mh, oh, count=count_3)
 
 
 def derive_comb_counts(hin: HIN,
@@ -15,6 +137,10 @@ def derive_comb_counts(hin: HIN,
     """
     Derive remaining motif counts from combinatorial relationships (for g4, g5, g9, g11).
 
+    The sizes |Si ∩ t|, |Sj ∩ t| and |Tij ∩ t| for each node type t are derived from the typed-degree table of the
+    HIN and the typed triangle counts of the edge, such that the counts for all pairs of node types (t1, t2) can be
+    computed at once as outer products over the type axis.
+
     :param hin: HIN
         the underlying graph
     :param edge_id: int
@@ -32,96 +158,57 @@ def derive_comb_counts(hin: HIN,
     """
 
     i, j = hin.edges[edge_id]
-    t_i, t_j = hin.nodes[i].type, hin.nodes[j].type
-
-    L: Set[str] = hin.node_types
-
-    for t1 in L:
-        for t2 in L:
-
-            if t1 > t2:
-                continue    # to avoid duplicate enumerations
-
-            Si1: Set[int] = set()
-            Si2: Set[int] = set()
-            for v in Si:
-                if v == j:
-                    continue
-                if hin.nodes[v].type == t1:
-                    Si1.add(v)
-                elif hin.nodes[v].type == t2:
-                    Si2.add(v)
-
-            Sj1: Set[int] = set()
-            Sj2: Set[int] = set()
-            for v in Sj:
-                if v == i:
-                    continue
-                if hin.nodes[v].type == t1:
-                    Sj1.add(v)
-                elif hin.nodes[v].type == t2:
-                    Sj2.add(v)
-
-            Tij1: Set[int] = set()
-            Tij2: Set[int] = set()
-            for v in Tij:
-                if hin.nodes[v].type == t1:
-                    Tij1.add(v)
-                elif hin.nodes[v].type == t2:
-                    Tij2.add(v)
-
-            # derive g_4 (4-path center orbit)
-            _, h6 = hf.hash_motif(6, t_i, t_j, t1, t2)
-            if h6 in counts.orbit_count[edge_id]:
-                g_6 = counts.orbit_count[edge_id][h6]
-            else:
-                g_6 = 0
-            if t1 == t2:  # cf. eq. 19 of "Heterogeneous Graphlets", Rossi et al. (TKDD'2020)
-                count_4 = len(Si1) * len(Sj1) - g_6
-            else:
-                count_4 = len(Si1) * len(Sj2) + len(Si2) * len(Sj1) - g_6
-            if count_4 > 0:
-                mh, oh = hf.hash_motif(4, t_i, t_j, t1, t2)
-                counts.update(edge_id, mh, oh, count=count_4)
-            
-            # derive g_5 (4-star)
-            _, h7 = hf.hash_motif(7, t_i, t_j, t1, t2)
-            if h7 in counts.orbit_count[edge_id]:
-                g_7 = counts.orbit_count[edge_id][h7]
-            else:
-                g_7 = 0
-            if t1 == t2:    # cf. eq. 23 of "Heterogeneous Graphlets", Rossi et al. (TKDD'2020)
-                count_5 = int(comb(len(Si1), 2)) + int(comb(len(Sj1), 2)) - g_7
-            else:
-                count_5 = len(Si1) * len(Si2) + len(Sj1) * len(Sj2) - g_7
-            if count_5 > 0:
-                mh, oh = hf.hash_motif(5, t_i, t_j, t1, t2)
-                counts.update(edge_id, mh, oh, count=count_5)
-
-            # derive g_9 (tailed triangle tri-edge orbit)
-            _, h10 = hf.hash_motif(10, t_i, t_j, t1, t2)
-            if h10 in counts.orbit_count[edge_id]:
-                g_10 = counts.orbit_count[edge_id][h10]
-            else:
-                g_10 = 0
-            if t1 == t2:    # cf. eq. 26 of "Heterogeneous Graphlets", Rossi et al. (TKDD'2020)
-                count_9 = len(Tij1) * (len(Si1) + len(Sj1)) - g_10
-            else:
-                count_9 = len(Tij1) * (len(Si2) + len(Sj2)) + len(Tij2) * (len(Si1) + len(Sj1)) - g_10
-            if count_9 > 0:
-                mh, oh = hf.hash_motif(9, t_i, t_j, t1, t2)
-                counts.update(edge_id, mh, oh, count=count_9)
-
-            # derive g_11 (chordal cycle center orbit)
-            _, h12 = hf.hash_motif(12, t_i, t_j, t1, t2)
-            if h12 in counts.orbit_count[edge_id]:
-                g_12 = counts.orbit_count[edge_id][h12]
-            else:
-                g_12 = 0
-            if t1 == t2:    # # cf. eq. 30 of "Heterogeneous Graphlets", Rossi et al. (TKDD'2020)
-                count_11 = int(comb(len(Tij1), 2)) - g_12
-            else:
-                count_11 = len(Tij1) * len(Tij2) - g_12
-            if count_11 > 0:
-                mh, oh = hf.hash_motif(11, t_i, t_j, t1, t2)
-                counts.update(edge_id, mh, oh, count=count_11)
+    t_i, t_j = hin.types[i], hin.types[j]
+
+    # typed triangle counts |Tij ∩ t| and typed 3-path counts |Si ∩ t|, |Sj ∩ t|
+    tij = np.bincount(hin.node_type[list(Tij)], minlength=len(hin.type_names))
+    si = hin.typed_degrees(i) - tij
+    si[hin.node_type[j]] -= 1
+    sj = hin.typed_degrees(j) - tij
+    sj[hin.node_type[i]] -= 1
+
+    # restrict the type axis to the node types that occur around the edge
+    active = np.flatnonzero(si + sj + tij)
+    if len(active) == 0:
+        return
+    si, sj, tij = si[active], sj[active], tij[active]
+    diag = np.arange(len(active))
+
+    # cf. eq. 19 of "Heterogeneous Graphlets", Rossi et al. (TKDD'2020)
+    count_4 = np.outer(si, sj)
+    count_4 += count_4.T.copy()
+    count_4[diag, diag] = si * sj
+
+    # cf. eq. 23 of "Heterogeneous Graphlets", Rossi et al. (TKDD'2020)
+    count_5 = np.outer(si, si) + np.outer(sj, sj)
+    count_5[diag, diag] = si * (si - 1) // 2 + sj * (sj - 1) // 2
+
+    # cf. eq. 26 of "Heterogeneous Graphlets", Rossi et al. (TKDD'2020)
+    count_9 = np.outer(tij, si + sj)
+    count_9 += count_9.T.copy()
+    count_9[diag, diag] = tij * (si + sj)
+
+    # cf. eq. 30 of "Heterogeneous Graphlets", Rossi et al. (TKDD'2020)
+    count_11 = np.outer(tij, tij)
+    count_11[diag, diag] = tij * (tij - 1) // 2
+
+    # each unordered type pair (t1, t2) once, and only those that can contribute
+    pairs = np.triu((count_4 > 0) | (count_5 > 0) | (count_9 > 0) | (count_11 > 0))
+    orbit_count = counts.orbit_count[edge_id]
+    type_names = hin.type_names
+
+    for a, b in zip(*(idx.tolist() for idx in np.nonzero(pairs))):
+        t1, t2 = type_names[active[a]], type_names[active[b]]
+
+        # (derived orbit, orbit that is subtracted, number of combinations)
+        for g, g_sub, n_comb in ((4, 6, count_4[a, b]),     # g_4 (4-path center orbit)
+                                 (5, 7, count_5[a, b]),     # g_5 (4-star)
+                                 (9, 10, count_9[a, b]),    # g_9 (tailed triangle tri-edge orbit)
+                                 (11, 12, count_11[a, b])):  # g_11 (chordal cycle center orbit)
+            if n_comb <= 0:
+                continue
+            _, h_sub = hf.hash_motif(g_sub, t_i, t_j, t1, t2)
+            count = int(n_comb) - orbit_count.get(h_sub, 0)
+            if count > 0:
+                mh, oh = hf.hash_motif(g, t_i, t_j, t1, t2)
+                counts.update(edge_id, mh, oh, count=count)
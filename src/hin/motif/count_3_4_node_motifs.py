@@ -1,17 +1,26 @@
-from typing import Set
+from typing import Iterable, Set
+import time
+import numpy as np
+from contextlib import nullcontext
 from ..hin import HIN
+from ..metrics import Metrics
 from .hash import HashMotif
-from .count_dict import CountDict
-from .count_path_based_motifs import count_path_based_4_node_motifs
+from .count_dict import CountDict, GlobalCountDict, NodeCountDict, ArrayCountDict
+from .count_path_based_motifs import count_path_based_4_node_motifs, count_4_cycles
 from .count_triangle_based_motifs import count_triangle_based_4_node_motifs
-from .comb_relationships import derive_comb_counts
+from .comb_relationships import derive_comb_counts, derive_path_counts, path_cost, PATH_DERIVATION_COST
+from .count_global_motifs import count_global_per_edge
+from .node_orbits import attribute_other_nodes
+from .neighbor_classes import NeighborClasses
+from .checkpoint import Checkpoint, CHECKPOINT_INTERVAL
 
 
 def count_per_edge(hin: HIN,
                    edge_id: int,
                    counts: CountDict,
                    hf: HashMotif,
-                   comb: bool = True):
+                   comb: bool = True,
+                   metrics: Metrics = None):
     """
     Count all 3- and 4-node motifs that a given edge in its respective HIN participates in
     (without combinatorial relationships).
@@ -30,8 +39,15 @@ def count_per_edge(hin: HIN,
         class that can en- and decode motifs to hash strings
     :param comb : bool
         Flag to signal the use of combinatorial relationships for efficiency (Default: True)
+    :param metrics : Metrics
+        metrics of the run, which time the phases of the edge (Default: None)
     """
 
+    if metrics is not None:
+        metrics.start_edge()
+    # the phases of the edge are only timed by detailed metrics
+    laps = metrics if metrics is not None and metrics.detailed else None
+
     # add an empty count entry for the new edge ID
     counts.orbit_count[edge_id] = {}
     counts.local_count[edge_id] = {}
@@ -39,7 +55,7 @@ def count_per_edge(hin: HIN,
     # ID of node i, ID of node j
     i, j = hin.edges[edge_id]
     # types of nodes i and j
-    t_i, t_j = hin.nodes[i].type, hin.nodes[j].type
+    t_i, t_j = hin.types[i], hin.types[j]
 
     # set of node IDs that...
     Si: Set[int] = set()      # ... form 3-paths centered at node i
@@ -51,7 +67,7 @@ def count_per_edge(hin: HIN,
             Si.add(k)   # k may later be moved to Tij
 
     for k in hin.neighbors[j]:
-        t_k = hin.nodes[k].type
+        t_k = hin.types[k]
         if k != i:
             if k in Si:  # if k is neighbour of i
                 Si.remove(k)
@@ -64,32 +80,233 @@ def count_per_edge(hin: HIN,
                 counts.update(edge_id, mh, oh)
 
     for k in Si:
-        t_k = hin.nodes[k].type
+        t_k = hin.types[k]
         mh, oh = hf.hash_motif(1, t_i, t_j, t_k, '--')
         counts.update(edge_id, mh, oh)
 
-    count_path_based_4_node_motifs(hin, edge_id, Si, Sj, counts, hf, comb)
+    orbit_counts = counts.orbit_count[edge_id]
+    if laps is not None:
+        laps.lap('count_3_node', orbit_counts)
+
+    # the classes of the neighbors are shared by the counting steps, and kept for the node-level counts
+    node_counts = isinstance(counts, NodeCountDict)
+    classes = NeighborClasses(hin, i, j, Si, Sj, Tij, keep=node_counts)
 
-    count_triangle_based_4_node_motifs(hin, edge_id, Si, Sj, Tij, counts, hf, comb)
+    if comb and path_cost(hin, Si, Sj) > PATH_DERIVATION_COST:
+        # edges around hubs: only 4-cycles are enumerated, g3 and g7 are derived (which requires g10 and g12)
+        count_4_cycles(hin, edge_id, Si, Sj, counts, hf)
+        if laps is not None:
+            laps.lap('path_based', orbit_counts)
+        count_triangle_based_4_node_motifs(hin, edge_id, Si, Sj, Tij, counts, hf, comb, classes)
+        if laps is not None:
+            laps.lap('triangle_based', orbit_counts)
+        derive_path_counts(hin, edge_id, Si, Sj, Tij, counts, hf)
+    else:
+        count_path_based_4_node_motifs(hin, edge_id, Si, Sj, Tij, counts, hf, comb, classes)
+        if laps is not None:
+            laps.lap('path_based', orbit_counts)
+        count_triangle_based_4_node_motifs(hin, edge_id, Si, Sj, Tij, counts, hf, comb, classes)
+        if laps is not None:
+            laps.lap('triangle_based', orbit_counts)
 
     if comb:    # derive remaining motif counts from combinatorial relationships (for g4, g5, g9, g11)
         derive_comb_counts(hin, edge_id, Si, Sj, Tij, counts, hf)
 
+    if node_counts:
+        attribute_other_nodes(hin, edge_id, counts, hf, classes)
+    counts.finish_edge(edge_id, i, j)
+
+    if laps is not None:
+        laps.lap('comb', orbit_counts)
+    if metrics is not None:
+        metrics.end_edge(edge_id)
+
 
-def count_motifs(hin, comb: bool = True) -> CountDict:
+def count_motifs(hin, comb: bool = True, int_codes: bool = False, workers: int = 1,
+                 global_only: bool = False, checkpoint: Checkpoint = None,
+                 checkpoint_interval: float = CHECKPOINT_INTERVAL, metrics: Metrics = None,
+                 node_counts: bool = False, sparse: bool = False, storage: str = 'dict',
+                 memory_limit: int = None, types: Iterable[str] = None, motifs: Iterable[str] = None,
+                 engine: str = 'python') -> CountDict:
     """ Count all 3- and 4-node motifs in an HIN.
 
     :param hin: HIN
         the graph for which all 3- and 4-node motifs are to be counted
     :param comb: bool
         flag to signal whether to utilize combinatorial relationships (default: True)
+    :param int_codes: bool
+        flag to signal whether motifs and orbits are encoded by integer codes instead of hash strings, which are
+        only decoded to hash strings when the counts are dumped (default: False)
+    :param workers: int
+        number of worker processes, the edges are distributed among them if larger than 1 (default: 1)
+    :param global_only: bool
+        flag to signal whether only global motif counts are computed, where each motif instance is counted once
+        and no per-edge counts are maintained (default: False)
+    :param checkpoint: Checkpoint
+        checkpoints of the run, finished edges are skipped and the counts of newly finished edges are saved
+        periodically (default: None, i.e. no checkpoints)
+    :param checkpoint_interval: float
+        number of seconds between two checkpoints of a sequential run, a parallel run saves each finished chunk
+        (default: CHECKPOINT_INTERVAL)
+    :param metrics: Metrics
+        metrics of the run, which time the counting phases and report the progress (default: None)
+    :param node_counts: bool
+        flag to signal whether node-level orbit counts are computed instead of per-edge counts, i.e. a NodeCountDict
+        is returned (default: False)
+    :param sparse: bool
+        flag to signal whether all edges are counted at once with sparse matrix algebra (requires SciPy), which
+        gives the same counts, but cannot be combined with workers, global-only counting, checkpoints or node-level
+        counts (default: False)
+    :param storage: str
+        storage backend of the per-edge counts, 'dict' for a CountDict of nested dictionaries or 'array' for an
+        ArrayCountDict of typed arrays, which cannot be combined with global-only counting, checkpoints, node-level
+        counts or the sparse engine (default: 'dict')
+    :param memory_limit: int
+        number of bytes of the per-edge counts that an ArrayCountDict keeps in memory before spilling them to disk
+        (default: None, i.e. no limit)
+    :param types: Iterable[str]
+        node type names, only the motifs whose nodes all have one of these types are counted and only the edges
+        between nodes of these types are visited, the other edges have no per-edge counts (default: None, i.e. all
+        node types)
+    :param motifs: Iterable[str]
+        motif hashes, only these motifs (and their orbits) are counted, which restricts the node types like types
+        (default: None, i.e. all motifs)
+    :param engine: str
+        per-edge counting engine, 'python' for the reference engine (count_per_edge) or 'kernel' for the flat-array
+        kernel (cf. kernel_engine), which gives the same counts, but cannot be combined with global-only counting or
+        the sparse engine (default: 'python')
     :return: CountDict
-        a CountDict object that contains orbit counts, as well as local and global motif counts
+        a CountDict object that contains orbit counts, as well as local and global motif counts, whose edge (and
+        node) IDs are the original ones if the graph was relabeled when it was loaded (cf. hin.reorder)
     """
 
-    counts = CountDict()
-    hf = HashMotif(hin.node_types)
-    for e_ij, _ in enumerate(hin.edges):
-        count_per_edge(hin, e_ij, counts, hf, comb=comb)
-    counts.correct_global_counts()
+    # imported here, as they depend on this module
+    from .parallel import count_motifs_parallel, estimate_edge_costs
+    from .engine import ENGINES, make_engine
+
+    if types is not None or motifs is not None:
+        if checkpoint is not None or storage == 'array':
+            raise ValueError("Type-filtered counting cannot be combined with checkpoints or the array storage backend")
+        from .type_filter import allowed_types, type_subgraph, restrict_counts
+        sub, edge_ids = type_subgraph(hin, allowed_types(hin, types, motifs))
+        counts = count_motifs(sub, comb=comb, int_codes=int_codes, workers=workers, global_only=global_only,
+                              metrics=metrics, node_counts=node_counts, sparse=sparse, engine=engine)
+        return restore_ids(restrict_counts(counts, edge_ids, motifs), hin)
+
+    if node_counts and (global_only or checkpoint is not None):
+        raise ValueError("Node-level orbit counts cannot be combined with global-only counting or checkpoints")
+    if storage not in ('dict', 'array'):
+        raise ValueError(f"Unknown storage backend '{storage}', expected 'dict' or 'array'")
+    if storage == 'array' and (global_only or checkpoint is not None or node_counts or sparse):
+        raise ValueError("The array storage backend cannot be combined with global-only counting, checkpoints, "
+                         "node-level counts or the sparse engine")
+
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown counting engine '{engine}', expected one of {', '.join(ENGINES)}")
+    if engine != 'python' and (global_only or sparse):
+        raise ValueError(f"The {engine} engine cannot be combined with global-only counting or the sparse engine")
+
+    if sparse:
+        if workers > 1 or global_only or checkpoint is not None or node_counts:
+            raise ValueError("The sparse engine cannot be combined with workers, global-only counting, checkpoints "
+                             "or node-level counts")
+        from .sparse_engine import count_motifs_sparse     # imported here, as it requires SciPy
+        counts = count_motifs_sparse(hin, HashMotif(hin.node_types, int_codes=int_codes), comb=comb, metrics=metrics)
+        with metrics.phase('correct') if metrics is not None else nullcontext():
+            counts.correct_global_counts()
+        return restore_ids(counts, hin)
+
+    if workers > 1:
+        counts = count_motifs_parallel(hin, workers, comb=comb, int_codes=int_codes, global_only=global_only,
+                                       checkpoint=checkpoint, metrics=metrics, node_counts=node_counts,
+                                       storage=storage, memory_limit=memory_limit, engine=engine)
+        return restore_ids(counts, hin)
+
+    hf = HashMotif(hin.node_types, int_codes=int_codes)
+    if metrics is not None:
+        metrics.start(len(hin.edges), estimate_edge_costs(hin, comb))
+
+    with metrics.instrumented(hin) if metrics is not None else nullcontext():
+        if checkpoint is not None:
+            counts = _count_with_checkpoints(hin, hf, comb, global_only, checkpoint, checkpoint_interval, metrics,
+                                             engine=engine)
+        elif global_only:
+            counts = GlobalCountDict(hf, comb=comb)
+            for e_ij in range(len(hin.edges)):
+                count_global_per_edge(hin, e_ij, counts, hf, comb=comb, metrics=metrics)
+        else:
+            if node_counts:
+                counts = NodeCountDict(len(hin.node_type), hf)
+            elif storage == 'array':
+                counts = ArrayCountDict(hf, memory_limit=memory_limit)
+            else:
+                counts = CountDict(hf)
+            make_engine(engine, hin, hf, comb=comb).count_edges(counts, 0, len(hin.edges), metrics=metrics)
+
+    with metrics.phase('correct') if metrics is not None else nullcontext():
+        counts.correct_global_counts()
+    return restore_ids(counts, hin)
+
+
+def restore_ids(counts: CountDict, hin: HIN) -> CountDict:
+    """
+    Map the edge IDs (and node IDs) of the counts of a relabeled graph (cf. hin.reorder.reorder_arrays) back to the
+    original IDs of the graph, such that the counts are the same as those of the graph in its original order. The
+    per-edge counts are kept in the order of the original edge IDs (except for those of an ArrayCountDict, which are
+    kept in the order in which the edges were counted).
+
+    :param counts: CountDict
+        counts of the relabeled graph
+    :param hin: HIN
+        the relabeled graph (resp. any graph, whose counts are returned unchanged if it was not relabeled)
+    :return: CountDict
+        the counts (modified in place)
+    """
+    if hin.edge_ids is None:
+        return counts
+    if isinstance(counts, ArrayCountDict):
+        counts.map_edge_ids(hin.edge_ids)
+    original = hin.edge_ids.tolist()
+    for name in ('orbit_count', 'local_count'):
+        per_edge = getattr(counts, name)
+        setattr(counts, name, {original[e]: per_edge[e] for e in sorted(per_edge, key=original.__getitem__)})
+    if isinstance(counts, NodeCountDict):
+        matrix = np.zeros_like(counts.node_count)
+        matrix[hin.node_ids] = counts.node_count
+        counts.node_count = matrix
+    return counts
+
+
+def _count_with_checkpoints(hin, hf: HashMotif, comb: bool, global_only: bool, checkpoint: Checkpoint,
+                            interval: float, metrics: Metrics = None, engine: str = 'python') -> CountDict:
+    """ Count the motifs of all edges that are not finished according to the checkpoint (with the given counting
+    engine, cf. make_engine), save a checkpoint every 'interval' seconds and merge all partial counts in the order of
+    the edge IDs (without correcting the global counts). """
+    from .engine import make_engine     # imported here, as it depends on this module
+
+    def new_counts() -> CountDict:
+        return GlobalCountDict(hf, comb=comb) if global_only else CountDict(hf)
+
+    edge_engine = None if global_only else make_engine(engine, hin, hf, comb=comb)
+    finished = checkpoint.load()
+    todo = [(start, stop, None) for start, stop in checkpoint.remaining(0, len(hin.edges))]
+
+    counts = new_counts()
+    last = time.monotonic()
+    for start, stop, partial in sorted(finished + todo, key=lambda r: r[0]):
+        if partial is not None:
+            counts.merge(partial)
+            if metrics is not None:
+                metrics.add_edges(stop - start, float(metrics.costs[start:stop].sum()))
+            continue
+        partial, first = new_counts(), start
+        for e_ij in range(start, stop):
+            if global_only:
+                count_global_per_edge(hin, e_ij, partial, hf, comb=comb, metrics=metrics)
+            else:
+                edge_engine.count_edges(partial, e_ij, e_ij + 1, metrics=metrics)
+            if e_ij == stop - 1 or time.monotonic() - last >= interval:
+                checkpoint.save(first, e_ij + 1, partial)
+                counts.merge(partial)
+                partial, first, last = new_counts(), e_ij + 1, time.monotonic()
     return counts
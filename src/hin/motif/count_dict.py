@@ -1,20 +1,33 @@
 from __future__ import annotations
-from typing import Dict
+from array import array
+from typing import Dict, Iterator, List, Set, Tuple, Union
 import os
 import json
+import tempfile
+import numpy as np
+from .hash import HashMotif, MOTIF_EDGES, motif_id, untyped_hash
+
+
+# initial number of rows of the growable count columns of an ArrayCountDict
+INITIAL_ROWS: int = 1024
+# number of bytes per row of the count columns (edge ID, code, count)
+ROW_BYTES: int = 8 + 4 + 8
 
 
 class CountDict:
 
-    def __init__(self):
+    def __init__(self, hf: HashMotif = None):
         """
         Initialize the count dictionary to maintain orbit counts (always local) and local and global motif counts.
         Note that the global motif counts need to be corrected once (!) after finishing the counting.
 
+        :param hf: HashMotif (optional)
+            hash function that produced integer motif/orbit codes, used to decode them to hash strings at output time
         """
-        self.orbit_count: Dict[int, Dict[str, int]] = {}
-        self.local_count: Dict[int, Dict[str, int]] = {}
-        self.global_count: Dict[str, int] = {}
+        self.orbit_count: Dict[int, Dict[Union[str, int], int]] = {}
+        self.local_count: Dict[int, Dict[Union[str, int], int]] = {}
+        self.global_count: Dict[Union[str, int], int] = {}
+        self.hf: HashMotif = hf
 
     def load_from_json(self, directory: str):
         """ Initialize self with counts stored at specified directory.
@@ -50,19 +63,39 @@ class CountDict:
         :param directory: str
             path to the directory where files will be stored
         """
-        json.dump(self.orbit_count, open(os.path.join(directory, 'orbit_counts.json'), 'w'))
-        json.dump(self.local_count, open(os.path.join(directory, 'local_counts.json'), 'w'))
-        json.dump(self.global_count, open(os.path.join(directory, 'global_counts.json'), 'w'))
+        if self.hf is None or not self.hf.int_codes:
+            json.dump(self.orbit_count, open(os.path.join(directory, 'orbit_counts.json'), 'w'))
+            json.dump(self.local_count, open(os.path.join(directory, 'local_counts.json'), 'w'))
+            json.dump(self.global_count, open(os.path.join(directory, 'global_counts.json'), 'w'))
+            return
+
+        # integer codes are decoded to hash strings only here
+        names: Dict[int, str] = {}
+
+        def decode(counts: Dict[int, int]) -> Dict[str, int]:
+            decoded = {}
+            for code, count in counts.items():
+                if code not in names:
+                    names[code] = self.hf.to_hash_str(code)
+                decoded[names[code]] = count
+            return decoded
+
+        json.dump({e: decode(self.orbit_count[e]) for e in self.orbit_count},
+                  open(os.path.join(directory, 'orbit_counts.json'), 'w'))
+        json.dump({e: decode(self.local_count[e]) for e in self.local_count},
+                  open(os.path.join(directory, 'local_counts.json'), 'w'))
+        json.dump(decode(self.global_count), open(os.path.join(directory, 'global_counts.json'), 'w'))
 
-    def update(self, edge_id: int, motif_hash: str = None, orbit_hash: str = None, count: int = 1):
+    def update(self, edge_id: int, motif_hash: Union[str, int] = None, orbit_hash: Union[str, int] = None,
+               count: int = 1):
         """ Update orbit count, and local/global motif counts.
 
         :param edge_id: int
             id of the edge for which orbit count and local motif count are updated
-        :param motif_hash: str (optional)
-            hash value that encodes the motif
-        :param orbit_hash: str (optional)
-            hash value that encodes the orbit
+        :param motif_hash: str or int (optional)
+            hash value (or integer code) that encodes the motif
+        :param orbit_hash: str or int (optional)
+            hash value (or integer code) that encodes the orbit
         :param count: int (Default: 1)
             value by which the respective counts are increased
         """
@@ -84,21 +117,36 @@ class CountDict:
             else:
                 self.global_count[motif_hash] += count
 
+    def merge(self, other: CountDict):
+        """ Add the (uncorrected) counts of another CountDict, e.g. the partial counts for a range of edges.
+
+        :param other: CountDict
+            counts to add to self
+        """
+        for own, new in ((self.orbit_count, other.orbit_count), (self.local_count, other.local_count)):
+            for edge in new:
+                if edge not in own:
+                    own[edge] = new[edge]
+                else:
+                    for h in new[edge]:
+                        own[edge][h] = own[edge].get(h, 0) + new[edge][h]
+
+        for h in other.global_count:
+            if h not in self.global_count:
+                self.global_count[h] = other.global_count[h]
+            else:
+                self.global_count[h] += other.global_count[h]
+
     def correct_global_counts(self):
         """ Correct the global motif count since each motif is counted once for each edge in the motif. """
 
         for motif_hash in self.global_count:
-            m_id = int(motif_hash[0:2])
-            if m_id == 1:   # 3-star has 2 edges
-                self.global_count[motif_hash] //= 2
-            elif m_id in [2, 3, 4]:   # 3-clique, 4-path, 4-star have 3 edges
-                self.global_count[motif_hash] //= 3
-            elif m_id in [5, 6]:    # 4-cycle, tailed triangle have 4 edges
-                self.global_count[motif_hash] //= 4
-            elif m_id == 7:     # chordal cycle has 5 edges
-                self.global_count[motif_hash] //= 5
-            elif m_id == 8:     # 4-clique has 6 edges
-                self.global_count[motif_hash] //= 6
+            # e.g. 3-star has 2 edges, 3-clique, 4-path, 4-star have 3 edges, ..., 4-clique has 6 edges
+            self.global_count[motif_hash] //= MOTIF_EDGES[motif_id(motif_hash)]
+
+    def finish_edge(self, edge_id: int, i: int, j: int):
+        """ Called once all counts of the edge (i, j) are complete, nothing to do as all per-edge counts are kept. """
+        pass
 
     def get_total_count(self, edge_id: int = None) -> int:
         """
@@ -121,12 +169,12 @@ class CountDict:
     def derive_untyped_dict(self) -> CountDict:
         """ Return an untyped version of the CountDict. """
 
-        newDict: CountDict = CountDict()
+        newDict: CountDict = CountDict(self.hf)
 
         for edge in self.orbit_count:
             newDict.orbit_count[edge] = {}
             for key in self.orbit_count[edge]:
-                new_key = key[0:2]  # we have 12 potential undirected orbits
+                new_key = untyped_hash(key)  # we have 12 potential undirected orbits
                 if new_key not in newDict.orbit_count[edge]:
                     newDict.orbit_count[edge][new_key] = 0
                 newDict.orbit_count[edge][new_key] += self.orbit_count[edge][key]
@@ -134,15 +182,485 @@ class CountDict:
         for edge in self.local_count:
             newDict.local_count[edge] = {}
             for key in self.local_count[edge]:
-                new_key = key[0:2]
+                new_key = untyped_hash(key)
                 if new_key not in newDict.local_count[edge]:
                     newDict.local_count[edge][new_key] = 0
                 newDict.local_count[edge][new_key] += self.local_count[edge][key]
 
         for key in self.global_count:
-            new_key = key[0:2]
+            new_key = untyped_hash(key)
             if new_key not in newDict.global_count:
                 newDict.global_count[new_key] = 0
             newDict.global_count[new_key] += self.global_count[key]
 
         return newDict
+
+
+class GlobalCountDict(CountDict):
+
+    # orbits that are read by the combinatorial relationships and hence kept in the per-edge scratch buffer
+    SCRATCH_ORBITS: Set[int] = {6, 7, 10, 12}
+    # orbits at which motif instances are counted towards the global counts
+    GLOBAL_ORBITS: Set[int] = {1, 2, 4, 5, 6, 7, 11, 12}
+
+    def __init__(self, hf: HashMotif = None, comb: bool = True):
+        """
+        Initialize the count dictionary to maintain only global motif counts, where each motif instance is counted
+        at one edge only (cf. count_global_per_edge). Orbit counts are only kept for the current edge (and only for
+        the orbits read by the combinatorial relationships), local motif counts are not maintained at all.
+        Note that the global motif counts need to be corrected once (!) after finishing the counting.
+
+        :param hf: HashMotif (optional)
+            hash function that produced integer motif/orbit codes, used to decode them to hash strings at output time
+        :param comb: bool
+            flag to signal whether combinatorial relationships are used, which derive 4-stars for each of their edges
+        """
+        super().__init__(hf)
+        self.comb: bool = comb
+
+    def dump_to_json(self, directory: str):
+        """ Dump the global counts into the json file 'global_counts.json' at the specified directory.
+
+        :param directory: str
+            path to the directory where the file will be stored
+        """
+        counts = self.global_count
+        if self.hf is not None and self.hf.int_codes:
+            counts = {self.hf.to_hash_str(h): counts[h] for h in counts}
+        json.dump(counts, open(os.path.join(directory, 'global_counts.json'), 'w'))
+
+    def update(self, edge_id: int, motif_hash: Union[str, int] = None, orbit_hash: Union[str, int] = None,
+               count: int = 1):
+        """ Update the scratch orbit counts of the current edge and the global motif counts.
+
+        :param edge_id: int
+            id of the current edge
+        :param motif_hash: str or int (optional)
+            hash value (or integer code) that encodes the motif
+        :param orbit_hash: str or int (optional)
+            hash value (or integer code) that encodes the orbit
+        :param count: int (Default: 1)
+            value by which the respective counts are increased
+        """
+
+        g = None
+        if orbit_hash is not None:
+            g = motif_id(orbit_hash)
+            if g in self.SCRATCH_ORBITS:
+                scratch = self.orbit_count[edge_id]
+                scratch[orbit_hash] = scratch.get(orbit_hash, 0) + count
+
+        if motif_hash is not None and (g is None or g in self.GLOBAL_ORBITS):
+            if motif_hash not in self.global_count:
+                self.global_count[motif_hash] = count
+            else:
+                self.global_count[motif_hash] += count
+
+    def correct_global_counts(self):
+        """ Correct the global 4-star counts, which are derived for each of their 3 edges with comb. relationships. """
+
+        if not self.comb:
+            return
+        for motif_hash in self.global_count:
+            if motif_id(motif_hash) == 4:
+                self.global_count[motif_hash] //= 3
+
+
+class NodeCountDict(CountDict):
+
+    def __init__(self, n_nodes: int, hf: HashMotif = None):
+        """
+        Initialize the count dictionary to maintain node-level orbit counts and global motif counts. The orbit
+        counts of an edge (i, j) are only kept until the edge is finished (cf. finish_edge), and then added to the
+        rows of both of its end nodes i and j in a dense matrix of shape (nodes, 2, orbit codes). Hence, the orbit
+        count of a node is the sum of the orbit counts of its incident edges, and no per-edge counts are materialized.
+        The orbit instances of an edge are attributed to its other nodes k and r as well (cf. add_other and
+        node_orbits.attribute_other_nodes), in the second plane of the same matrix.
+        Note that the global motif counts need to be corrected once (!) after finishing the counting.
+
+        :param n_nodes: int
+            number of nodes of the graph
+        :param hf: HashMotif (optional)
+            hash function that produced integer motif/orbit codes, used to decode them to hash strings at output time
+        """
+        super().__init__(hf)
+        # orbit counts of shape (nodes, 2, columns), the number of orbit instances of the incident edges (plane 0)
+        # and the number of instances in which a node is one of the other nodes k and r (plane 1), where the columns
+        # are allocated in the order of first occurrence
+        self.node_count: np.ndarray = np.zeros((n_nodes, 2, 16), dtype=np.int64)
+        self.columns: Dict[Union[str, int], int] = {}
+        self.orbits: List[Union[str, int]] = []
+
+    def _column(self, orbit_hash: Union[str, int]) -> int:
+        """ Return the column of an orbit, which is allocated (by doubling the capacity) if necessary. """
+        col = self.columns.get(orbit_hash)
+        if col is None:
+            col = self.columns[orbit_hash] = len(self.orbits)
+            self.orbits.append(orbit_hash)
+            if col == self.node_count.shape[2]:
+                self.node_count = np.concatenate([self.node_count, np.zeros_like(self.node_count)], axis=2)
+        return col
+
+    def add_other(self, attributed: Dict[Tuple[int, Union[str, int]], int]):
+        """ Add the number of orbit instances by (node, orbit hash) in which the nodes are one of the other nodes k
+        and r of an edge (cf. node_orbits.attribute_other_nodes). """
+        if len(attributed) == 0:
+            return
+        rows = np.fromiter((v for v, _ in attributed), dtype=np.int64, count=len(attributed))
+        cols = np.fromiter((self._column(h) for _, h in attributed), dtype=np.int64, count=len(attributed))
+        values = np.fromiter(attributed.values(), dtype=np.int64, count=len(attributed))
+        self.node_count[rows, 1, cols] += values
+
+    def finish_edge(self, edge_id: int, i: int, j: int):
+        """ Add the orbit counts of the edge (i, j) to the rows of i and j and discard its per-edge counts. """
+        orbit_count = self.orbit_count.pop(edge_id)
+        self.local_count.pop(edge_id, None)
+        if len(orbit_count) == 0:
+            return
+        cols = np.fromiter((self._column(h) for h in orbit_count), dtype=np.int64, count=len(orbit_count))
+        values = np.fromiter(orbit_count.values(), dtype=np.int64, count=len(orbit_count))
+        self.node_count[i, 0, cols] += values
+        self.node_count[j, 0, cols] += values
+
+    def merge(self, other: NodeCountDict):
+        """ Add the (uncorrected) counts of another NodeCountDict, e.g. the partial counts for a range of edges.
+
+        :param other: NodeCountDict
+            counts to add to self
+        """
+        super().merge(other)
+        if len(other.orbits) > 0:
+            cols = np.array([self._column(h) for h in other.orbits], dtype=np.int64)
+            self.node_count[:, :, cols] += other.node_count[:, :, :len(other.orbits)]
+
+    def node_orbit_counts(self, other: bool = False) -> (np.ndarray, List[Union[str, int]]):
+        """ Return the node-level orbit counts with the columns ordered by orbit hash (resp. integer code).
+
+        :param other: bool
+            flag to signal whether the counts of the nodes as k or r are returned instead of as i or j (Default: False)
+        :return: (np.ndarray, List[str or int])
+            matrix of shape (nodes, orbits) and the orbit hash (resp. integer code) of each column
+        """
+        order = sorted(range(len(self.orbits)), key=lambda c: self.orbits[c])
+        return self.node_count[:, int(other), order], [self.orbits[c] for c in order]
+
+    def dump_to_json(self, directory: str):
+        """ Dump the node-level orbit counts and the global counts at the specified directory.
+
+        Directory will then contain the files 'node_orbit_counts.npy' (the matrix of shape (nodes, orbits)),
+        'node_other_orbit_counts.npy' (the same for the nodes as k or r), 'node_orbits.json' (the orbit hash of each
+        column), and 'global_counts.json'.
+
+        :param directory: str
+            path to the directory where files will be stored
+        """
+        node_count, orbits = self.node_orbit_counts()
+        global_count = self.global_count
+        if self.hf is not None and self.hf.int_codes:
+            orbits = [self.hf.to_hash_str(h) for h in orbits]
+            global_count = {self.hf.to_hash_str(h): global_count[h] for h in global_count}
+        np.save(os.path.join(directory, 'node_orbit_counts.npy'), node_count)
+        np.save(os.path.join(directory, 'node_other_orbit_counts.npy'), self.node_orbit_counts(other=True)[0])
+        json.dump(orbits, open(os.path.join(directory, 'node_orbits.json'), 'w'))
+        json.dump(global_count, open(os.path.join(directory, 'global_counts.json'), 'w'))
+
+    def __getstate__(self) -> Dict[str, object]:
+        """ Only pickle the nonzero rows of the matrix, e.g. when the partial counts of a worker are transferred. """
+        state = dict(self.__dict__)
+        matrix = self.node_count[:, :, :len(self.orbits)]
+        rows = np.flatnonzero(matrix.any(axis=(1, 2)))
+        state['node_count'] = (len(matrix), rows, matrix[rows])
+        return state
+
+    def __setstate__(self, state: Dict[str, object]):
+        n_nodes, rows, values = state['node_count']
+        matrix = np.zeros((n_nodes, 2, max(16, values.shape[2])), dtype=np.int64)
+        matrix[rows, :, :values.shape[2]] = values
+        state['node_count'] = matrix
+        self.__dict__.update(state)
+
+
+class ArrayCountDict(CountDict):
+
+    def __init__(self, hf: HashMotif = None, memory_limit: int = None, spill_dir: str = None):
+        """
+        Initialize the count dictionary to maintain the per-edge orbit and local motif counts in typed arrays instead
+        of nested dictionaries. The counts of an edge are only collected in orbit_count and local_count (as in
+        CountDict) until the edge is finished (cf. finish_edge), and then appended in bulk to growable columns
+        (edge ID, code, count) per kind, where the code is the position of the hash (resp. integer code) in hashes.
+        Hence, each count takes ROW_BYTES bytes instead of a few hundred.
+
+        With a memory limit, the columns are spilled to '.npy' files in a temporary directory whenever they would
+        exceed it. The spilled columns are memory-mapped when the counts are read and removed with the object.
+        Note that the global motif counts need to be corrected once (!) after finishing the counting.
+
+        :param hf: HashMotif (optional)
+            hash function that produced integer motif/orbit codes, used to decode them to hash strings at output time
+        :param memory_limit: int (optional)
+            number of bytes of the columns that are kept in memory (Default: None, i.e. the columns are never spilled)
+        :param spill_dir: str (optional)
+            directory in which the temporary directory for the spilled columns is created (Default: None, i.e. the
+            default temporary directory of the system)
+        """
+        super().__init__(hf)
+        self.memory_limit: Union[int, None] = memory_limit
+        self.spill_dir: Union[str, None] = spill_dir
+        self.codes: Dict[Union[str, int], int] = {}
+        self.hashes: List[Union[str, int]] = []
+        # finished edge IDs in the order of their rows in the columns
+        self.edge_ids: array = array('q')
+        max_rows = None if memory_limit is None else max(INITIAL_ROWS, memory_limit // (2 * ROW_BYTES))
+        self.arrays: Dict[str, _CountColumns] = {kind: _CountColumns(max_rows) for kind in ('orbit', 'local')}
+        self._spill_dir: Union[tempfile.TemporaryDirectory, None] = None
+
+    def _code(self, h: Union[str, int]) -> int:
+        """ Return the code of a hash (resp. integer code), which is allocated if necessary. """
+        code = self.codes.get(h)
+        if code is None:
+            code = self.codes[h] = len(self.hashes)
+            self.hashes.append(h)
+        return code
+
+    def _append(self, kind: str, edge: Union[int, np.ndarray], codes: np.ndarray, values: np.ndarray):
+        """ Append rows to the columns of a kind, which are spilled to disk first if they would exceed the limit. """
+        columns = self.arrays[kind]
+        if columns.max_rows is not None and columns.size > 0 and columns.size + len(codes) > columns.max_rows:
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.TemporaryDirectory(prefix='counts_', dir=self.spill_dir)
+            columns.spill(os.path.join(self._spill_dir.name, f'{kind}_{len(columns.spilled)}'))
+        columns.append(edge, codes, values)
+
+    def _append_edge(self, edge_id: int, orbit_count: Dict[Union[str, int], int],
+                     local_count: Dict[Union[str, int], int]):
+        """ Append the orbit and local motif counts of an edge to the columns. """
+        for kind, per_edge in (('orbit', orbit_count), ('local', local_count)):
+            if len(per_edge) > 0:
+                codes = np.fromiter((self._code(h) for h in per_edge), dtype=np.int32, count=len(per_edge))
+                values = np.fromiter(per_edge.values(), dtype=np.int64, count=len(per_edge))
+                self._append(kind, edge_id, codes, values)
+        self.edge_ids.append(edge_id)
+
+    def finish_edge(self, edge_id: int, i: int, j: int):
+        """ Append the counts of the edge (i, j) to the columns and discard its dictionaries. """
+        self._append_edge(edge_id, self.orbit_count.pop(edge_id), self.local_count.pop(edge_id, {}))
+
+    def map_edge_ids(self, edge_ids: np.ndarray):
+        """ Replace the ID e of each finished edge by edge_ids[e], e.g. to restore the original edge IDs of a relabeled
+        graph (cf. count_3_4_node_motifs.restore_ids). The spilled columns are rewritten.
+
+        :param edge_ids: np.ndarray
+            new edge ID for each edge ID
+        """
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        self.edge_ids = array('q', edge_ids[np.array(self.edge_ids, dtype=np.int64)].tolist())
+        for columns in self.arrays.values():
+            columns.map_edges(edge_ids)
+
+    def edge_counts(self, kind: str = 'orbit') -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """ Yield the edge ID, the codes (positions in hashes) and the counts of each finished edge, in the order in
+        which the edges were finished.
+
+        :param kind: str
+            'orbit' or 'local' (Default: 'orbit')
+        :return: Iterator[(int, np.ndarray, np.ndarray)]
+            edge ID, codes and counts of each edge (empty arrays for edges without counts)
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        runs = self._runs(kind)
+        current = next(runs, None)
+        for e in self.edge_ids:
+            if current is not None and current[0] == e:
+                yield current
+                current = next(runs, None)
+            else:
+                yield e, empty, empty
+
+    def _runs(self, kind: str) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+        """ Yield the rows of the columns of a kind grouped by edge (the rows of an edge are always contiguous). """
+        for edge, code, count in self.arrays[kind].blocks():
+            if len(edge) == 0:
+                continue
+            bounds = np.concatenate([[0], np.flatnonzero(edge[1:] != edge[:-1]) + 1, [len(edge)]]).tolist()
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                yield int(edge[start]), code[start:stop], count[start:stop]
+
+    def load_from_json(self, directory: str):
+        """ Initialize self with counts stored at specified directory (cf. CountDict.load_from_json). """
+        super().load_from_json(directory)
+        for e in list(self.orbit_count):
+            self._append_edge(e, self.orbit_count.pop(e), self.local_count.pop(e, {}))
+
+    def dump_to_json(self, directory: str):
+        """ Dump the resp. counts into json files at the specified directory, which are identical to those of
+        CountDict.dump_to_json. The per-edge counts are written edge by edge, so they are never held in dictionaries.
+
+        :param directory: str
+            path to the directory where files will be stored
+        """
+        names, global_count = self.hashes, self.global_count
+        if self.hf is not None and self.hf.int_codes:
+            names = [self.hf.to_hash_str(h) for h in names]
+            global_count = {self.hf.to_hash_str(h): global_count[h] for h in global_count}
+        names = np.array(names + [None], dtype=object)[:-1]     # an object array, even if names is empty
+
+        for kind in ('orbit', 'local'):
+            with open(os.path.join(directory, f'{kind}_counts.json'), 'w') as f:
+                f.write('{')
+                separator = ''
+                for e, codes, values in self.edge_counts(kind):
+                    per_edge = dict(zip(names[codes].tolist(), values.tolist()))
+                    f.write(f'{separator}"{e}": {json.dumps(per_edge)}')
+                    separator = ', '
+                f.write('}')
+        json.dump(global_count, open(os.path.join(directory, 'global_counts.json'), 'w'))
+
+    def merge(self, other: ArrayCountDict):
+        """ Add the (uncorrected) counts of another ArrayCountDict, e.g. the partial counts for a range of edges.
+
+        :param other: ArrayCountDict
+            counts to add to self
+        """
+        super().merge(other)
+        remap = np.array([self._code(h) for h in other.hashes], dtype=np.int32)
+        for kind in ('orbit', 'local'):
+            for edge, code, count in other.arrays[kind].blocks():
+                self._append(kind, edge, remap[code], count)
+        self.edge_ids.extend(other.edge_ids)
+
+    def get_total_count(self, edge_id: int = None) -> int:
+        """
+        Return the total number of motifs (local or global).
+
+        :param edge_id: int (optional)
+            edge id for which to return the total count. If None, return global total
+        :return: int
+            total count of motifs (local or global)
+        """
+        if edge_id is None or edge_id in self.local_count:
+            return super().get_total_count(edge_id)
+        total = 0
+        for edge, _, count in self.arrays['local'].blocks():
+            total += int(count[edge == edge_id].sum())
+        return total
+
+    def derive_untyped_dict(self) -> ArrayCountDict:
+        """ Return an untyped version of the ArrayCountDict. """
+
+        untyped = ArrayCountDict(self.hf, memory_limit=self.memory_limit, spill_dir=self.spill_dir)
+        # the counts of unfinished edges and the global counts are kept in dictionaries
+        base = super().derive_untyped_dict()
+        untyped.orbit_count, untyped.local_count, untyped.global_count = \
+            base.orbit_count, base.local_count, base.global_count
+
+        remap = np.array([untyped._code(untyped_hash(h)) for h in self.hashes], dtype=np.int64)
+        n_codes = max(1, len(untyped.hashes))
+        for kind in ('orbit', 'local'):
+            for edge, code, count in self.arrays[kind].blocks():
+                # sum the counts per edge and untyped code, in the order of their first occurrence
+                keys = np.asarray(edge) * n_codes + remap[code]
+                _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+                sums = np.zeros(len(first), dtype=np.int64)
+                np.add.at(sums, inverse, count)
+                order = np.argsort(first)
+                untyped._append(kind, edge[first[order]], remap[code[first[order]]], sums[order])
+        untyped.edge_ids = array('q', self.edge_ids)
+        return untyped
+
+    def __getstate__(self) -> Dict[str, object]:
+        """ The spilled columns are pickled as arrays (cf. _CountColumns), hence the temporary directory is not. """
+        state = dict(self.__dict__)
+        state['_spill_dir'] = None
+        return state
+
+
+class StreamCountDict(CountDict):
+
+    def __init__(self, hf: HashMotif = None):
+        """
+        Initialize the count dictionary to hand out the per-edge counts as soon as an edge is finished (cf.
+        finish_edge): the orbit and local motif counts of the finished edges are moved to the list finished, from
+        which they are taken by the consumer (e.g. cf. hin.motif.stream.MotifStream). Only the global motif counts
+        are accumulated. Note that the global motif counts need to be corrected once (!) after finishing the counting.
+
+        :param hf: HashMotif (optional)
+            hash function that produced integer motif/orbit codes, used to decode them to hash strings at output time
+        """
+        super().__init__(hf)
+        # (edge ID, orbit counts, local motif counts) of the finished edges that were not taken yet
+        self.finished: List[Tuple[int, Dict[Union[str, int], int], Dict[Union[str, int], int]]] = []
+
+    def finish_edge(self, edge_id: int, i: int, j: int):
+        """ Move the counts of the edge (i, j) to the finished edges. """
+        self.finished.append((edge_id, self.orbit_count.pop(edge_id), self.local_count.pop(edge_id)))
+
+
+class _CountColumns:
+    """ Growable typed columns (edge ID, code, count) of per-edge counts, whose full blocks can be spilled to disk. """
+
+    def __init__(self, max_rows: int = None):
+        """
+        :param max_rows: int (optional)
+            number of rows beyond which the columns do not grow by doubling anymore (e.g. due to a memory limit)
+        """
+        self.max_rows: Union[int, None] = max_rows
+        self._allocate()
+        # path prefixes of the blocks that were spilled to disk, in the order of their rows, and their total rows
+        self.spilled: List[str] = []
+        self.spilled_rows: int = 0
+
+    def _allocate(self):
+        """ Allocate empty columns with the initial capacity. """
+        self.edge: np.ndarray = np.empty(INITIAL_ROWS, dtype=np.int64)
+        self.code: np.ndarray = np.empty(INITIAL_ROWS, dtype=np.int32)
+        self.count: np.ndarray = np.empty(INITIAL_ROWS, dtype=np.int64)
+        self.size: int = 0
+
+    def append(self, edge: Union[int, np.ndarray], code: np.ndarray, count: np.ndarray):
+        """ Append rows to the columns, which grow by doubling their capacity if necessary. """
+        stop = self.size + len(code)
+        if stop > len(self.edge):
+            capacity = max(stop, 2 * len(self.edge))
+            if self.max_rows is not None:
+                capacity = max(stop, min(capacity, self.max_rows))
+            for name in ('edge', 'code', 'count'):
+                column = getattr(self, name)
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+        self.edge[self.size:stop] = edge
+        self.code[self.size:stop] = code
+        self.count[self.size:stop] = count
+        self.size = stop
+
+    def spill(self, prefix: str):
+        """ Write the rows in memory to the files '<prefix>_<column>.npy' and release the memory. """
+        for name in ('edge', 'code', 'count'):
+            np.save(f'{prefix}_{name}.npy', getattr(self, name)[:self.size])
+        self.spilled.append(prefix)
+        self.spilled_rows += self.size
+        self._allocate()
+
+    def map_edges(self, edge_ids: np.ndarray):
+        """ Replace each edge ID e in the edge column by edge_ids[e], the spilled blocks are rewritten. """
+        for prefix in self.spilled:
+            np.save(f'{prefix}_edge.npy', edge_ids[np.load(f'{prefix}_edge.npy')])
+        self.edge[:self.size] = edge_ids[self.edge[:self.size]]
+
+    def blocks(self) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """ Yield the (edge ID, code, count) columns block by block, the spilled blocks are memory-mapped. """
+        for prefix in self.spilled:
+            yield tuple(np.load(f'{prefix}_{name}.npy', mmap_mode='r') for name in ('edge', 'code', 'count'))
+        if self.size > 0:
+            yield self.edge[:self.size], self.code[:self.size], self.count[:self.size]
+
+    def __len__(self) -> int:
+        return self.spilled_rows + self.size
+
+    def __getstate__(self) -> Dict[str, object]:
+        """ Pickle all rows (including the spilled ones) as arrays, e.g. when the partial counts of a worker are
+        transferred. """
+        blocks = list(self.blocks())
+        state = {'max_rows': self.max_rows, 'size': len(self), 'spilled': [], 'spilled_rows': 0}
+        for c, name in enumerate(('edge', 'code', 'count')):
+            state[name] = np.concatenate([block[c] for block in blocks]) if blocks else getattr(self, name)[:0]
+        return state
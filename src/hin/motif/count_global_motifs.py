@@ -0,0 +1,146 @@
+from typing import Set
+from ..hin import HIN
+from ..metrics import Metrics
+from .hash import HashMotif
+from .count_dict import GlobalCountDict
+from .comb_relationships import derive_comb_counts
+from .neighbor_classes import NeighborClasses
+
+
+def count_global_per_edge(hin: HIN,
+                          edge_id: int,
+                          counts: GlobalCountDict,
+                          hf: HashMotif,
+                          comb: bool = True,
+                          metrics: Metrics = None):
+    """
+    Count the 3- and 4-node motif instances that a given edge in its respective HIN is responsible for, such that
+    each motif instance is counted only once over all edges. Only global motif counts are maintained.
+
+    Each motif is either counted at an orbit that occurs exactly once per instance (4-path center edge, tailed
+    triangle tail edge, chordal cycle chord) or at its canonical edge w.r.t. the node IDs (wedge: edge to the smaller
+    leaf, triangle and 4-clique: edge between the two smallest nodes, 4-cycle: edge between the smallest node and its
+    smaller neighbor in the cycle, 4-star: edge to the smallest leaf). Orbits that are not needed for that are not
+    enumerated at all. The orbit counts read by the combinatorial relationships are kept in a scratch buffer, which is
+    discarded after the edge.
+
+    :param hin : HIN
+        the underlying graph
+    :param edge_id : int
+        edge id of the current edge between nodes i and j
+    :param counts : GlobalCountDict
+        maintain global motif counts
+    :param hf : HashMotif
+        class that can en- and decode motifs to hash strings
+    :param comb : bool
+        Flag to signal the use of combinatorial relationships for efficiency (Default: True)
+    :param metrics : Metrics
+        metrics of the run, which time the edge (Default: None)
+    """
+
+    if metrics is not None:
+        metrics.start_edge()
+
+    # add an empty scratch buffer for the orbit counts of the new edge ID
+    counts.orbit_count[edge_id] = {}
+
+    types = hin.types
+    neighbors = hin.neighbors
+
+    # ID of node i, ID of node j
+    i, j = hin.edges[edge_id]
+    # types of nodes i and j
+    t_i, t_j = types[i], types[j]
+    max_ij = max(i, j)
+
+    # set of node IDs that...
+    Si: Set[int] = set()      # ... form 3-paths centered at node i
+    Sj: Set[int] = set()      # ... form 3-paths centered at node j
+    Tij: Set[int] = set()     # ... form triangles with nodes i and j
+
+    for k in neighbors[i]:
+        if k != j:
+            Si.add(k)   # k may later be moved to Tij
+
+    for k in neighbors[j]:
+        if k != i:
+            if k in Si:  # if k is neighbour of i
+                Si.remove(k)
+                Tij.add(k)
+                if k > max_ij:  # triangle
+                    mh, _ = hf.hash_motif(2, t_i, t_j, types[k], '--')
+                    counts.update(edge_id, mh)
+            else:
+                Sj.add(k)
+                if i < k:   # 3-star centered at j
+                    mh, _ = hf.hash_motif(1, t_i, t_j, types[k], '--')
+                    counts.update(edge_id, mh)
+
+    for k in Si:
+        if j < k:   # 3-star centered at i
+            mh, _ = hf.hash_motif(1, t_i, t_j, types[k], '--')
+            counts.update(edge_id, mh)
+
+    # classifies all neighbors of a node k at once (instead of probing hin.connected per neighbor)
+    classes = NeighborClasses(hin, i, j, Si, Sj, Tij)
+
+    # path-based 4-node motifs
+    for k in Si:
+        t_k = types[k]
+        in_si, in_sj, _ = classes.classify(k)
+        # tailed-triangle (tail orbit)
+        classes.add(7, t_k, classes.type_counts(in_si, hi=k))
+
+        if not comb:    # these will be derived with combinatorial relationships instead
+
+            # 4-star
+            classes.add(5, t_k, classes.non_adjacent('Si', in_si, lo=j, hi=k), orbit=False)
+            # 4-path (center orbit)
+            classes.add(4, t_k, classes.non_adjacent('Sj', in_sj), orbit=False)
+
+    for k in Sj:
+        t_k = types[k]
+        in_si, in_sj, _ = classes.classify(k)
+        # tailed-triangle (tail orbit)
+        classes.add(7, t_k, classes.type_counts(in_sj, hi=k))
+        # 4-cycle i-j-k-r, counted at the edge between its smallest node and its smaller neighbor, i.e. if i < k and
+        # j < r (resp. i < j < r or j < i < k)
+        if i < k:
+            classes.add(6, t_k, classes.type_counts(in_si, lo=j))
+            if comb:
+                classes.add(6, t_k, classes.type_counts(in_si, hi=j), motif=False)
+        elif comb:
+            classes.add(6, t_k, classes.type_counts(in_si), motif=False)
+
+        if not comb:    # these will be derived with combinatorial relationships instead
+
+            # 4-star
+            classes.add(5, t_k, classes.non_adjacent('Sj', in_sj, lo=i, hi=k), orbit=False)
+
+    # triangle-based 4-node motifs
+    for k in Tij:
+        t_k = types[k]
+        in_si, in_sj, in_tij = classes.classify(k)
+        # 4-clique, counted at the edge between its two smallest nodes
+        classes.add(12, t_k, classes.type_counts(in_tij, lo=max_ij, hi=k))
+        if comb:
+            classes.add(12, t_k, classes.type_counts(in_tij, hi=min(k, max_ij + 1)), motif=False)
+            # chordal-cycle (edge orbit)
+            classes.add(10, t_k, classes.type_counts(in_si | in_sj), motif=False)
+
+        if not comb:    # these will be derived with combinatorial relationships instead
+
+            # chordal cycle (center orbit)
+            classes.add(11, t_k, classes.non_adjacent('Tij', in_tij, hi=k), orbit=False)
+
+    classes.flush(counts, edge_id, hf)
+
+    if comb:    # derive remaining motif counts from combinatorial relationships (for g4, g5, g9, g11)
+        derive_comb_counts(hin, edge_id, Si, Sj, Tij, counts, hf)
+
+    # discard the scratch buffer
+    del counts.orbit_count[edge_id]
+
+    if metrics is not None:
+        metrics.lap('global')
+        metrics.end_edge(edge_id)
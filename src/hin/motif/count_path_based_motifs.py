@@ -2,15 +2,18 @@ from typing import Set
 from ..hin import HIN
 from .hash import HashMotif
 from .count_dict import CountDict
+from .neighbor_classes import NeighborClasses
 
 
 def count_path_based_4_node_motifs(hin: HIN,
                                    edge_id: int,
                                    Si: Set[int],
                                    Sj: Set[int],
+                                   Tij: Set[int],
                                    counts: CountDict,
                                    hf: HashMotif,
-                                   comb: bool):
+                                   comb: bool,
+                                   classes: NeighborClasses = None):
 
     """
     Derive path-based 4-node motifs.
@@ -23,65 +26,88 @@ def count_path_based_4_node_motifs(hin: HIN,
         set of node IDs that are connected to i (and not j)
     :param Sj: Set[int]
         set of node IDs that are connected to j (and not i)
+    :param Tij: Set[int]
+        set of node IDs that are connected to i and j
     :param counts : CountDict
         maintain local and global motif counts, as well as local orbit counts
     :param hf: HashMotif
         class that can en- and decode motifs to hash strings
     :param comb : bool
         Flag to signal the use of combinatorial relationships for efficiency
+    :param classes: NeighborClasses (optional)
+        classes of the neighbors around the edge, which are shared with the other counting steps of the edge
+        (Default: None, i.e. they are created for the edge)
     """
 
     i, j = hin.edges[edge_id]
-    t_i, t_j = hin.nodes[i].type, hin.nodes[j].type
+    # classifies all neighbors of a node k at once (instead of probing hin.connected per neighbor)
+    if classes is None:
+        classes = NeighborClasses(hin, i, j, Si, Sj, Tij)
 
     for k in Si:
 
-        t_k = hin.nodes[k].type
-        for r in hin.neighbors[k]:
-            if r != i and r != j:
-                t_r = hin.nodes[r].type
-                if not hin.connected(r, i) and not hin.connected(r, j):  # 4-path (edge orbit)
-                    mh, oh = hf.hash_motif(3, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
-                elif r in Si and r < k:  # tailed-triangle (tail orbit)
-                    mh, oh = hf.hash_motif(7, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
+        t_k = hin.types[k]
+        in_si, in_sj, in_tij = classes.classify(k)
+        # 4-path (edge orbit)
+        classes.add(3, t_k, classes.outside(k, in_si, in_sj, in_tij))
+        # tailed-triangle (tail orbit)
+        classes.add(7, t_k, classes.type_counts(in_si, hi=k))
 
         if not comb:    # these will be derived with combinatorial relationships instead
 
-            for r in Si:
-                if r != j and r < k and not hin.connected(r, k):  # 4-star
-                    t_r = hin.nodes[r].type
-                    mh, oh = hf.hash_motif(5, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
-
-            for r in Sj:    # 4-path (center orbit)
-                if r != i and not hin.connected(r, k):
-                    t_r = hin.nodes[r].type
-                    mh, oh = hf.hash_motif(4, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
+            # 4-star
+            classes.add(5, t_k, classes.non_adjacent('Si', in_si, hi=k))
+            # 4-path (center orbit)
+            classes.add(4, t_k, classes.non_adjacent('Sj', in_sj))
 
     for k in Sj:
 
-        t_k = hin.nodes[k].type
-        for r in hin.neighbors[k]:  # all neighbours of k
-            if r != i and r != j:
-                t_r = hin.nodes[r].type
-                if not hin.connected(r, i) and not hin.connected(r, j):  # 4-path (edge orbit)
-                    mh, oh = hf.hash_motif(3, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
-                elif r in Sj and r < k:   # tailed-triangle (tail orbit)
-                    mh, oh = hf.hash_motif(7, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
-                elif r in Si:  # 4-cycle
-                    mh, oh = hf.hash_motif(6, t_i, t_j, t_k, t_r)
-
-                    counts.update(edge_id, mh, oh)
+        t_k = hin.types[k]
+        in_si, in_sj, in_tij = classes.classify(k)
+        # 4-path (edge orbit)
+        classes.add(3, t_k, classes.outside(k, in_si, in_sj, in_tij))
+        # tailed-triangle (tail orbit)
+        classes.add(7, t_k, classes.type_counts(in_sj, hi=k))
+        # 4-cycle
+        classes.add(6, t_k, classes.type_counts(in_si))
 
         if not comb:    # these will be derived with combinatorial relationships instead
 
-            for r in Sj:
-                if r != i and r < k and not hin.connected(r, k):  # 4-star
-                    t_r = hin.nodes[r].type
-                    mh, oh = hf.hash_motif(5, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
+            # 4-star
+            classes.add(5, t_k, classes.non_adjacent('Sj', in_sj, hi=k))
+
+    classes.flush(counts, edge_id, hf)
+
+
+def count_4_cycles(hin: HIN,
+                   edge_id: int,
+                   Si: Set[int],
+                   Sj: Set[int],
+                   counts: CountDict,
+                   hf: HashMotif):
+    """
+    Count 4-cycles only, i.e. the connected pairs of nodes in Si and Sj, by intersecting the neighbors of the nodes in
+    the smaller set with the larger set (used if the other path-based orbits are derived, cf. derive_path_counts).
+
+    :param hin: HIN
+        the underlying graph
+    :param edge_id: int
+        edge ID of the current edge between nodes i and j
+    :param Si: Set[int]
+        set of node IDs that are connected to i (and not j)
+    :param Sj: Set[int]
+        set of node IDs that are connected to j (and not i)
+    :param counts : CountDict
+        maintain local and global motif counts, as well as local orbit counts
+    :param hf: HashMotif
+        class that can en- and decode motifs to hash strings
+    """
+
+    i, j = hin.edges[edge_id]
+    classes = NeighborClasses(hin, i, j, Si, Sj, set())     # the nodes in Tij are not needed
+    smaller, larger = (Si, Sj) if len(Si) <= len(Sj) else (Sj, Si)
+
+    for k in smaller:   # 4-cycle
+        classes.add(6, hin.types[k], classes.type_counts(larger.intersection(hin.neighbors[k])))
+
+    classes.flush(counts, edge_id, hf)
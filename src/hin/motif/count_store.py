@@ -0,0 +1,231 @@
+from typing import Dict, List, Tuple, Union
+import os
+import json
+import numpy as np
+from numpy.lib.format import open_memmap
+from .hash import HashMotif
+from .count_dict import CountDict, ArrayCountDict
+
+
+# version of the binary layout, stored in the meta file
+STORE_VERSION: int = 1
+# per-edge count kinds, i.e. the attribute prefixes of CountDict
+KINDS: Tuple[str, ...] = ('orbit', 'local')
+
+
+def dump_to_binary(counts: CountDict, directory: str):
+    """
+    Dump the counts into a columnar binary format at the specified directory.
+
+    The per-edge orbit and local motif counts are stored as sparse CSR arrays over the edges: for each kind
+    ('orbit', 'local') the directory contains '<kind>_edges.npy' (sorted edge IDs), '<kind>_indptr.npy' (the counts
+    of the n-th edge are stored at positions indptr[n]:indptr[n + 1]), '<kind>_codes.npy' (integer motif/orbit codes)
+    and '<kind>_values.npy' (counts). The global motif counts are stored in 'global_codes.npy' and
+    'global_values.npy'. For each kind, '<kind>_index_codes.npy' (sorted distinct codes), '<kind>_index_indptr.npy'
+    and '<kind>_index_positions.npy' index the count columns by code: the positions of the n-th code in the columns
+    are stored at index_positions[index_indptr[n]:index_indptr[n + 1]] (in the order of the edge IDs).
+    'counts_meta.json' holds the node type integers, which are needed to decode the codes. All files can be read
+    lazily with a CountReader.
+
+    :param counts: CountDict
+        the counts to dump, must provide the hash function that produced them (counts.hf)
+    :param directory: str
+        path to the directory where files will be stored
+    """
+    if counts.hf is None:
+        raise ValueError("CountDict does not provide a hash function to encode motifs and orbits.")
+    hf = counts.hf
+    codes: Dict[Union[str, int], int] = {}
+
+    def encode(h: Union[str, int]) -> int:
+        if isinstance(h, int):
+            return h
+        if h not in codes:
+            codes[h] = hf.from_hash_str(h)
+        return codes[h]
+
+    for kind in KINDS:
+        if isinstance(counts, ArrayCountDict):
+            _dump_columns(counts, kind, directory, np.array([encode(h) for h in counts.hashes], dtype=np.int64))
+            continue
+        per_edge: Dict[int, Dict[Union[str, int], int]] = getattr(counts, f'{kind}_count')
+        edge_ids = sorted(per_edge)
+        indptr = np.zeros(len(edge_ids) + 1, dtype=np.int64)
+        np.cumsum([len(per_edge[e]) for e in edge_ids], out=indptr[1:])
+
+        np.save(os.path.join(directory, f'{kind}_edges.npy'), np.array(edge_ids, dtype=np.int64))
+        np.save(os.path.join(directory, f'{kind}_indptr.npy'), indptr)
+        # the columns are filled edge by edge, so that the counts are never held twice in memory
+        code_col = open_memmap(os.path.join(directory, f'{kind}_codes.npy'), mode='w+', dtype=np.int64,
+                               shape=(int(indptr[-1]),))
+        value_col = open_memmap(os.path.join(directory, f'{kind}_values.npy'), mode='w+', dtype=np.int64,
+                                shape=(int(indptr[-1]),))
+        for n, e in enumerate(edge_ids):
+            start, stop = indptr[n], indptr[n + 1]
+            code_col[start:stop] = [encode(h) for h in per_edge[e]]
+            value_col[start:stop] = list(per_edge[e].values())
+        code_col.flush()
+        value_col.flush()
+        del code_col, value_col
+        _dump_index(kind, directory)
+
+    np.save(os.path.join(directory, 'global_codes.npy'),
+            np.array([encode(h) for h in counts.global_count], dtype=np.int64))
+    np.save(os.path.join(directory, 'global_values.npy'),
+            np.array(list(counts.global_count.values()), dtype=np.int64))
+
+    meta = {'version': STORE_VERSION, 'type_ids': {t: i for t, i in hf.n_types.items() if t != '--'}}
+    with open(os.path.join(directory, 'counts_meta.json'), 'w') as meta_file:
+        json.dump(meta, meta_file)
+
+
+def _dump_columns(counts: ArrayCountDict, kind: str, directory: str, code_table: np.ndarray):
+    """ Dump the per-edge counts of a kind of an ArrayCountDict (cf. dump_to_binary), whose rows are copied edge by
+    edge to the position of the edge in the order of the edge IDs.
+
+    :param counts: ArrayCountDict
+        the counts to dump
+    :param kind: str
+        'orbit' or 'local'
+    :param directory: str
+        path to the directory where files will be stored
+    :param code_table: np.ndarray
+        integer motif/orbit code of each code of the ArrayCountDict (i.e. of each entry of counts.hashes)
+    """
+    edge_ids = np.frombuffer(counts.edge_ids, dtype=np.int64) if len(counts.edge_ids) else np.zeros(0, np.int64)
+    lengths = np.fromiter((len(codes) for _, codes, _ in counts.edge_counts(kind)), dtype=np.int64,
+                          count=len(edge_ids))
+    order = np.argsort(edge_ids, kind='stable')
+    indptr = np.zeros(len(edge_ids) + 1, dtype=np.int64)
+    np.cumsum(lengths[order], out=indptr[1:])
+    starts = np.empty(len(edge_ids), dtype=np.int64)
+    starts[order] = indptr[:-1]
+
+    np.save(os.path.join(directory, f'{kind}_edges.npy'), edge_ids[order])
+    np.save(os.path.join(directory, f'{kind}_indptr.npy'), indptr)
+    code_col = open_memmap(os.path.join(directory, f'{kind}_codes.npy'), mode='w+', dtype=np.int64,
+                           shape=(int(indptr[-1]),))
+    value_col = open_memmap(os.path.join(directory, f'{kind}_values.npy'), mode='w+', dtype=np.int64,
+                            shape=(int(indptr[-1]),))
+    for start, (_, codes, values) in zip(starts.tolist(), counts.edge_counts(kind)):
+        code_col[start:start + len(codes)] = code_table[codes]
+        value_col[start:start + len(codes)] = values
+    code_col.flush()
+    value_col.flush()
+    del code_col, value_col
+    _dump_index(kind, directory)
+
+
+def _dump_index(kind: str, directory: str):
+    """ Index the stored code column of a kind by code (cf. dump_to_binary), so that the counts of a single orbit
+    (resp. motif) can be read without scanning the whole column. """
+    codes = np.load(os.path.join(directory, f'{kind}_codes.npy'), mmap_mode='r')
+    positions = np.argsort(codes, kind='stable')
+    index_codes, index_counts = np.unique(codes[positions], return_counts=True)
+    index_indptr = np.zeros(len(index_codes) + 1, dtype=np.int64)
+    np.cumsum(index_counts, out=index_indptr[1:])
+    np.save(os.path.join(directory, f'{kind}_index_codes.npy'), index_codes.astype(np.int64))
+    np.save(os.path.join(directory, f'{kind}_index_indptr.npy'), index_indptr)
+    np.save(os.path.join(directory, f'{kind}_index_positions.npy'), positions.astype(np.int64))
+
+
+class CountReader:
+
+    def __init__(self, directory: str, decode: bool = True):
+        """
+        Initialize a lazy reader for counts stored by dump_to_binary. The arrays are memory-mapped, so only the
+        parts that are needed to answer a query are read from disk.
+
+        :param directory: str
+            path to the directory where files are stored
+        :param decode: bool
+            flag to signal whether motifs and orbits are returned as hash strings instead of integer codes
+            (Default: True)
+        """
+        with open(os.path.join(directory, 'counts_meta.json'), 'r') as meta_file:
+            meta = json.load(meta_file)
+        if meta['version'] != STORE_VERSION:
+            raise ValueError(f"Unsupported version of the binary counts ({meta['version']}).")
+
+        self.directory: str = directory
+        self.decode: bool = decode
+        self.hf: HashMotif = HashMotif.from_type_ids(meta['type_ids'], int_codes=not decode)
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def _array(self, name: str) -> np.ndarray:
+        """ Memory-map a stored array on first access. """
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r')
+        return self._arrays[name]
+
+    def _key(self, code: int) -> Union[str, int]:
+        return self.hf.to_hash_str(code) if self.decode else code
+
+    def edge_ids(self, kind: str = 'orbit') -> np.ndarray:
+        """ Return the (sorted) IDs of all edges with stored counts of the given kind ('orbit' or 'local'). """
+        return self._array(f'{kind}_edges')
+
+    def edge_counts(self, edge_id: int, kind: str = 'orbit') -> Dict[Union[str, int], int]:
+        """ Return the orbit (resp. local motif) counts of a single edge.
+
+        :param edge_id: int
+            edge ID
+        :param kind: str
+            'orbit' for orbit counts or 'local' for local motif counts (Default: 'orbit')
+        :return: Dict[Union[str, int], int]
+            counts by orbit (resp. motif), empty if the edge is not stored
+        """
+        edges = self._array(f'{kind}_edges')
+        n = int(np.searchsorted(edges, edge_id))
+        if n == len(edges) or edges[n] != edge_id:
+            return {}
+        indptr = self._array(f'{kind}_indptr')
+        start, stop = indptr[n], indptr[n + 1]
+        codes = self._array(f'{kind}_codes')[start:stop].tolist()
+        values = self._array(f'{kind}_values')[start:stop].tolist()
+        return {self._key(code): value for code, value in zip(codes, values)}
+
+    def edges_with(self, h: Union[str, int], kind: str = 'orbit') -> Dict[int, int]:
+        """ Return the counts of an orbit (resp. motif) for all edges where it occurs.
+
+        :param h: str or int
+            hash string or integer code of the orbit (resp. motif)
+        :param kind: str
+            'orbit' for orbit counts or 'local' for local motif counts (Default: 'orbit')
+        :return: Dict[int, int]
+            counts by edge ID
+        """
+        code = self.hf.from_hash_str(h) if isinstance(h, str) else h
+        index_codes = self._array(f'{kind}_index_codes')
+        n = int(np.searchsorted(index_codes, code))
+        if n == len(index_codes) or index_codes[n] != code:
+            return {}
+        index_indptr = self._array(f'{kind}_index_indptr')
+        positions = self._array(f'{kind}_index_positions')[index_indptr[n]:index_indptr[n + 1]]
+        rows = np.searchsorted(self._array(f'{kind}_indptr'), positions, side='right') - 1
+        edges = self._array(f'{kind}_edges')[rows].tolist()
+        return dict(zip(edges, self._array(f'{kind}_values')[positions].tolist()))
+
+    def global_counts(self) -> Dict[Union[str, int], int]:
+        """ Return the global motif counts. """
+        codes = self._array('global_codes').tolist()
+        values = self._array('global_values').tolist()
+        return {self._key(code): value for code, value in zip(codes, values)}
+
+    def to_count_dict(self) -> CountDict:
+        """ Load all counts into a CountDict (with hash strings or integer codes, cf. decode). """
+        counts = CountDict(None if self.decode else self.hf)
+        for kind in KINDS:
+            per_edge: Dict[int, Dict[Union[str, int], int]] = getattr(counts, f'{kind}_count')
+            edges: List[int] = self._array(f'{kind}_edges').tolist()
+            indptr: List[int] = self._array(f'{kind}_indptr').tolist()
+            codes: List[int] = self._array(f'{kind}_codes').tolist()
+            values: List[int] = self._array(f'{kind}_values').tolist()
+            for n, e in enumerate(edges):
+                per_edge[e] = {self._key(codes[p]): values[p] for p in range(indptr[n], indptr[n + 1])}
+        counts.global_count = self.global_counts()
+        return counts
+
+    def dump_to_json(self, directory: str):
+        """ Export the counts into the json files of CountDict.dump_to_json at the specified directory. """
+        self.to_count_dict().dump_to_json(directory)
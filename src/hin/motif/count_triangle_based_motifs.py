@@ -2,6 +2,7 @@ from typing import Set
 from ..hin import HIN
 from .hash import HashMotif
 from .count_dict import CountDict
+from .neighbor_classes import NeighborClasses
 
 
 def count_triangle_based_4_node_motifs(hin: HIN,
@@ -11,7 +12,8 @@ def count_triangle_based_4_node_motifs(hin: HIN,
                                        Tij: Set[int],
                                        counts: CountDict,
                                        hf: HashMotif,
-                                       comb: bool):
+                                       comb: bool,
+                                       classes: NeighborClasses = None):
 
     """
     Derive triangle-based 4-node motifs.
@@ -32,42 +34,33 @@ def count_triangle_based_4_node_motifs(hin: HIN,
         class that can en- and decode motifs to hash strings
     :param comb : bool
         Flag to signal the use of combinatorial relationships for efficiency
+    :param classes: NeighborClasses (optional)
+        classes of the neighbors around the edge, which are shared with the other counting steps of the edge
+        (Default: None, i.e. they are created for the edge)
     """
 
     i, j = hin.edges[edge_id]
-    t_i, t_j = hin.nodes[i].type, hin.nodes[j].type
+
+    # classifies all neighbors of a node k at once (instead of probing hin.connected per neighbor)
+    if classes is None:
+        classes = NeighborClasses(hin, i, j, Si, Sj, Tij)
 
     for k in Tij:
-        t_k = hin.nodes[k].type
-        for r in hin.neighbors[k]:
-            if r != i and r != j:
-                t_r = hin.nodes[r].type
-                if r in Tij and r < k:  # 4-clique
-                    mh, oh = hf.hash_motif(12, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
-                elif r in Si or r in Sj:    # chordal-cycle (edge orbit)
-                    mh, oh = hf.hash_motif(10, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
-                elif r not in Si and r not in Sj and r not in Tij:  # tailed-triangle (center orbit)
-                    mh, oh = hf.hash_motif(8, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
+        t_k = hin.types[k]
+        in_si, in_sj, in_tij = classes.classify(k)
+        # 4-clique
+        classes.add(12, t_k, classes.type_counts(in_tij, hi=k))
+        # chordal-cycle (edge orbit)
+        classes.add(10, t_k, classes.type_counts(in_si | in_sj))
+        # tailed-triangle (center orbit)
+        classes.add(8, t_k, classes.outside(k, in_si, in_sj, in_tij))
 
         if not comb:    # these will be derived with combinatorial relationships instead
 
-            for r in Tij:
-                if r < k and not hin.connected(r, k):  # chordal cycle (center orbit)
-                    t_r = hin.nodes[r].type
-                    mh, oh = hf.hash_motif(11, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
-
-            for r in Si:
-                if r != j and not hin.connected(r, k):  # tailed triangle (tri-edge orbit)
-                    t_r = hin.nodes[r].type
-                    mh, oh = hf.hash_motif(9, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
+            # chordal cycle (center orbit)
+            classes.add(11, t_k, classes.non_adjacent('Tij', in_tij, hi=k))
+            # tailed triangle (tri-edge orbit)
+            classes.add(9, t_k, classes.non_adjacent('Si', in_si))
+            classes.add(9, t_k, classes.non_adjacent('Sj', in_sj))
 
-            for r in Sj:
-                if r != i and not hin.connected(r, k):  # tailed triangle (tri-edge orbit)
-                    t_r = hin.nodes[r].type
-                    mh, oh = hf.hash_motif(9, t_i, t_j, t_k, t_r)
-                    counts.update(edge_id, mh, oh)
+    classes.flush(counts, edge_id, hf)
@@ -0,0 +1,451 @@
+from typing import Dict, List, Tuple, Union
+import json
+import select
+import socket
+import struct
+import time
+import selectors
+import multiprocessing as mp
+from collections import deque
+from contextlib import nullcontext
+import numpy as np
+from ..hin import HIN
+from ..metrics import Metrics
+from .hash import HashMotif
+from .count_dict import CountDict, GlobalCountDict
+from .count_3_4_node_motifs import restore_ids
+from .engine import ENGINES, make_engine
+from .count_global_motifs import count_global_per_edge
+from .parallel import estimate_edge_costs, split_edges, CHUNKS_PER_WORKER
+from .checkpoint import fingerprint
+
+
+# default host and TCP port of the coordinator, which only accepts workers on the same host unless another host
+# (e.g. '0.0.0.0' for all interfaces) is given, since workers are not authenticated
+DEFAULT_HOST: str = '127.0.0.1'
+DEFAULT_PORT: int = 47000
+# number of edge ID ranges the edges are initially split into per expected worker
+RANGES_PER_WORKER: int = CHUNKS_PER_WORKER
+# number of seconds without any connected worker after which a run with local workers is aborted
+WORKER_TIMEOUT: float = 60.0
+
+# message types, each message is framed by its type and the length of its payload
+MSG_HELLO, MSG_CONFIG, MSG_TASK, MSG_STEAL, MSG_SPLIT, MSG_RESULT, MSG_DONE, MSG_ERROR = range(8)
+_HEADER = struct.Struct('<BQ')
+# task ID, first and last (exclusive) edge ID of a range
+_RANGE = struct.Struct('<qqq')
+
+
+class Coordinator:
+
+    def __init__(self, hin: HIN, address: Tuple[str, int] = (DEFAULT_HOST, DEFAULT_PORT), comb: bool = True,
+                 int_codes: bool = False, global_only: bool = False, engine: str = 'python',
+                 expected_workers: int = 1, timeout: float = None, metrics: Metrics = None):
+        """
+        Coordinator of a distributed counting run. The edges are split into contiguous ranges of roughly equal
+        estimated cost (cf. split_edges), which are handed out to the workers (cf. run_worker) that connect via TCP,
+        most expensive first. Each worker loads the same graph itself, which is verified by its fingerprint, and
+        returns the partial counts of a range in a compact binary form (cf. encode_partial).
+
+        Once no ranges are left but a worker is idle, the coordinator steals work: the worker with the most
+        expensive range splits off the second half of the edges it has not started yet, which is handed out to the
+        idle worker. Hence, a slow range around hubs does not keep the other workers waiting (unless the remaining
+        range consists of a single edge). If a worker disconnects (e.g. because it died), its range is handed out
+        again. The partial results are merged in the order of the edge IDs, so that the result is identical to a
+        sequential run.
+
+        The workers are not authenticated: any process that can reach the address may connect as a worker and report
+        arbitrary counts (or keep ranges busy), hence the coordinator should only listen on other interfaces than
+        localhost in a trusted network.
+
+        :param hin: HIN
+            the graph for which all 3- and 4-node motifs are to be counted
+        :param address: (str, int)
+            host and port to listen on, port 0 picks a free port (cf. self.address) (Default: DEFAULT_HOST, i.e.
+            localhost, and DEFAULT_PORT)
+        :param comb: bool
+            flag to signal whether to utilize combinatorial relationships (Default: True)
+        :param int_codes: bool
+            flag to signal whether the result keeps integer motif and orbit codes (Default: False)
+        :param global_only: bool
+            flag to signal whether only global motif counts are computed (Default: False)
+        :param engine: str
+            per-edge counting engine of the workers, cf. engine.make_engine (Default: 'python')
+        :param expected_workers: int
+            number of workers that are expected to connect, which determines the number of ranges (Default: 1)
+        :param timeout: float
+            number of seconds without any connected worker after which the run is aborted (Default: None, i.e. wait
+            for workers indefinitely)
+        :param metrics: Metrics
+            metrics of the run, which report the progress per finished range (Default: None)
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown counting engine '{engine}', expected one of {', '.join(ENGINES)}")
+        if engine != 'python' and global_only:
+            raise ValueError(f"The {engine} engine cannot be combined with global-only counting")
+        self.hin: HIN = hin
+        self.comb: bool = comb
+        self.global_only: bool = global_only
+        self.timeout: float = timeout
+        self.metrics: Metrics = metrics
+        self.hf: HashMotif = HashMotif(hin.node_types, int_codes=int_codes)
+        self.config: Dict[str, object] = {'graph': fingerprint(hin), 'comb': comb, 'global_only': global_only,
+                                          'engine': engine,
+                                          'type_ids': {t: i for t, i in self.hf.n_types.items() if t != '--'}}
+
+        self.costs: np.ndarray = estimate_edge_costs(hin, comb)
+        ranges = split_edges(self.costs, max(1, expected_workers) * RANGES_PER_WORKER)
+        # ranges that are not handed out yet, most expensive first
+        self.queue: deque = deque(sorted(ranges, key=lambda r: -self.costs[r[0]:r[1]].sum()))
+        # (task ID, start, stop) of the range each worker is counting
+        self.assigned: Dict[socket.socket, Tuple[int, int, int]] = {}
+        self.idle: List[socket.socket] = []
+        # all accepted connections, including those of workers that did not send their hello yet
+        self.connections: set = set()
+        # tasks that were asked to split off a part of their range, resp. that cannot be split any further
+        self.stealing: set = set()
+        self.unsplittable: set = set()
+        self.next_task: int = 0
+        self.remaining: int = len(hin.edges)
+        # partial counts by the first edge ID of their range
+        self.partials: Dict[int, CountDict] = {}
+        self.names: Dict[int, str] = {}
+        self.selector: selectors.BaseSelector = selectors.DefaultSelector()
+
+        self.server: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(address)
+        self.server.listen()
+        self.address: Tuple[str, int] = self.server.getsockname()
+
+    def run(self) -> CountDict:
+        """ Hand out the ranges until all edges are counted (waiting for workers as long as necessary), and merge the
+        partial results.
+
+        :return: CountDict
+            a CountDict object that contains orbit counts, as well as local and global motif counts
+        """
+        if self.metrics is not None:
+            self.metrics.start(len(self.hin.edges), self.costs)
+        self.selector.register(self.server, selectors.EVENT_READ)
+        last_worker = time.monotonic()
+        try:
+            while self.remaining > 0:
+                if self.idle or self.assigned:
+                    last_worker = time.monotonic()
+                elif self.timeout is not None and time.monotonic() - last_worker > self.timeout:
+                    raise RuntimeError(f"No worker connected for {self.timeout:.0f} seconds, "
+                                       f"{self.remaining} edges are not counted.")
+                for key, _ in self.selector.select(timeout=1.0 if self.timeout is not None else None):
+                    if key.fileobj is self.server:
+                        conn, _ = self.server.accept()
+                        self.selector.register(conn, selectors.EVENT_READ)
+                        self.connections.add(conn)
+                        continue
+                    try:
+                        self._handle(key.fileobj, *_recv(key.fileobj))
+                    except OSError:     # including a ConnectionError once the worker is gone
+                        self._disconnect(key.fileobj)
+                    self._dispatch()
+            for conn in list(self.idle):
+                try:
+                    _send(conn, MSG_DONE)
+                except OSError:
+                    pass
+        finally:
+            self.close()
+
+        counts = GlobalCountDict(self.hf, comb=self.comb) if self.global_only else CountDict(self.hf)
+        for start in sorted(self.partials):
+            counts.merge(self.partials.pop(start))
+        with self.metrics.phase('correct') if self.metrics is not None else nullcontext():
+            counts.correct_global_counts()
+        return counts
+
+    def close(self):
+        """ Close the connections to all workers, which stop once they notice it (e.g. if the run is aborted), and the
+        server socket. """
+        for conn in self.connections:
+            conn.close()
+        self.connections.clear()
+        self.selector.close()
+        self.server.close()
+
+    def _handle(self, conn: socket.socket, kind: int, payload: bytes):
+        """ Handle a message of a worker. """
+        if kind == MSG_HELLO:
+            if json.loads(payload.decode())['graph'] != self.config['graph']:
+                _send(conn, MSG_ERROR, b"The worker loaded another graph than the coordinator.")
+                raise ConnectionError("The worker loaded another graph than the coordinator.")
+            _send(conn, MSG_CONFIG, json.dumps(self.config).encode())
+            self.idle.append(conn)
+        elif kind == MSG_SPLIT:
+            task, _, mid = _RANGE.unpack(payload)
+            self.stealing.discard(task)
+            current, start, stop = self.assigned.get(conn, (None, 0, 0))
+            if task == current and mid < stop:
+                self.assigned[conn] = (task, start, mid)
+                self.queue.appendleft((mid, stop))
+            else:
+                self.unsplittable.add(task)
+        elif kind == MSG_RESULT:
+            task, start, stop = _RANGE.unpack_from(payload)
+            del self.assigned[conn]
+            self.stealing.discard(task)
+            self.partials[start] = decode_partial(payload[_RANGE.size:], self.hf, self.global_only, self.names)
+            self.remaining -= stop - start
+            self.idle.append(conn)
+            if self.metrics is not None:
+                self.metrics.add_edges(stop - start, float(self.costs[start:stop].sum()))
+
+    def _dispatch(self):
+        """ Hand out the queued ranges to idle workers, and steal work for the remaining idle workers. """
+        while self.idle and self.queue:
+            conn = self.idle.pop()
+            start, stop = self.queue.popleft()
+            self.assigned[conn] = (self.next_task, start, stop)
+            self.next_task += 1
+            self._send(conn, MSG_TASK, _RANGE.pack(*self.assigned[conn]))
+        candidates = [(self.costs[start:stop].sum(), conn) for conn, (task, start, stop) in self.assigned.items()
+                      if task not in self.stealing and task not in self.unsplittable]
+        for _, conn in sorted(candidates, key=lambda c: -c[0])[:max(0, len(self.idle) - len(self.stealing))]:
+            task, start, stop = self.assigned[conn]
+            self.stealing.add(task)
+            self._send(conn, MSG_STEAL, _RANGE.pack(task, start, stop))
+
+    def _send(self, conn: socket.socket, kind: int, payload: bytes):
+        """ Send a message to a worker, which is disconnected if this fails. """
+        try:
+            _send(conn, kind, payload)
+        except OSError:
+            self._disconnect(conn)
+
+    def _disconnect(self, conn: socket.socket):
+        """ Hand out the range of a disconnected worker again. """
+        if conn.fileno() >= 0:
+            self.selector.unregister(conn)
+        if conn in self.assigned:
+            task, start, stop = self.assigned.pop(conn)
+            self.stealing.discard(task)
+            self.queue.appendleft((start, stop))
+        if conn in self.idle:
+            self.idle.remove(conn)
+        self.connections.discard(conn)
+        conn.close()
+
+
+def run_worker(hin: HIN, address: Tuple[str, int]) -> int:
+    """
+    Count the ranges of edges handed out by a coordinator (cf. Coordinator) until all edges are counted. Between two
+    edges, the worker checks whether the coordinator wants to steal a part of the range, in which case it splits off
+    the second half (by estimated cost) of the edges it has not started yet.
+
+    :param hin: HIN
+        the graph, which must be the same as the one of the coordinator
+    :param address: (str, int)
+        host and port of the coordinator
+    :return: int
+        number of edges counted by this worker
+    """
+    counted = 0
+    with socket.create_connection(address) as conn:
+        _send(conn, MSG_HELLO, json.dumps({'graph': fingerprint(hin)}).encode())
+        kind, payload = _recv(conn)
+        if kind == MSG_ERROR:
+            raise ValueError(payload.decode())
+        config = json.loads(payload.decode())
+        comb, global_only = config['comb'], config['global_only']
+        # the worker always counts with integer codes, which are decoded by the coordinator if necessary
+        hf = HashMotif.from_type_ids(config['type_ids'], int_codes=True)
+        engine = None if global_only else make_engine(config['engine'], hin, hf, comb=comb)
+        costs = estimate_edge_costs(hin, comb)
+
+        while True:
+            kind, payload = _recv(conn)
+            if kind == MSG_DONE:
+                return counted
+            if kind != MSG_TASK:   # e.g. a request to steal from a range that is already finished
+                continue
+            task, start, stop = _RANGE.unpack(payload)
+            partial = GlobalCountDict(comb=comb) if global_only else CountDict()
+            e_ij = start
+            while e_ij < stop:
+                if select.select([conn], [], [], 0)[0]:
+                    kind, payload = _recv(conn)
+                    if kind == MSG_STEAL and _RANGE.unpack(payload)[0] == task:
+                        stop = _split_point(costs, e_ij, stop)
+                        _send(conn, MSG_SPLIT, _RANGE.pack(task, e_ij, stop))
+                    elif kind == MSG_DONE:
+                        return counted
+                    continue
+                if global_only:
+                    count_global_per_edge(hin, e_ij, partial, hf, comb=comb)
+                else:
+                    engine.count_edges(partial, e_ij, e_ij + 1)
+                e_ij += 1
+            _send(conn, MSG_RESULT, _RANGE.pack(task, start, stop) + encode_partial(partial))
+            counted += stop - start
+
+
+def count_motifs_distributed(hin: HIN, workers: int, comb: bool = True, int_codes: bool = False,
+                             global_only: bool = False, engine: str = 'python',
+                             address: Tuple[str, int] = (DEFAULT_HOST, 0), expected_workers: int = None,
+                             metrics: Metrics = None) -> CountDict:
+    """
+    Count all 3- and 4-node motifs in an HIN with a coordinator (cf. Coordinator) and local worker processes, which
+    connect to it via TCP. Further workers on other hosts may connect to the address of the coordinator as well (which
+    need to load the graph in the same order, cf. hin.reorder). With local workers, the run is aborted if no worker
+    is connected for WORKER_TIMEOUT seconds (e.g. because all of them died), otherwise the coordinator waits for
+    workers indefinitely.
+
+    :param hin: HIN
+        the graph for which all 3- and 4-node motifs are to be counted
+    :param workers: int
+        number of local worker processes
+    :param comb: bool
+        flag to signal whether to utilize combinatorial relationships (Default: True)
+    :param int_codes: bool
+        flag to signal whether the result keeps integer motif and orbit codes (Default: False)
+    :param global_only: bool
+        flag to signal whether only global motif counts are computed (Default: False)
+    :param engine: str
+        per-edge counting engine of the workers, cf. engine.make_engine (Default: 'python')
+    :param address: (str, int)
+        host and port the coordinator listens on (Default: localhost, a free port)
+    :param expected_workers: int
+        number of (local and remote) workers that are expected to connect (Default: None, i.e. workers)
+    :param metrics: Metrics
+        metrics of the run (Default: None)
+    :return: CountDict
+        a CountDict object that contains orbit counts, as well as local and global motif counts
+    """
+    coordinator = Coordinator(hin, address, comb=comb, int_codes=int_codes, global_only=global_only, engine=engine,
+                              expected_workers=expected_workers if expected_workers is not None else workers,
+                              timeout=WORKER_TIMEOUT if workers > 0 else None, metrics=metrics)
+    ctx = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else mp.get_context()
+    processes = [ctx.Process(target=run_worker, args=(hin, coordinator.address), daemon=True) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        return restore_ids(coordinator.run(), hin)
+    finally:
+        # the local workers only stop once their connections are closed, e.g. if the run was aborted
+        coordinator.close()
+        for process in processes:
+            process.join()
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """ Parse an address of the form 'host:port' (or ':port' for DEFAULT_HOST, i.e. localhost). """
+    host, _, port = address.rpartition(':')
+    return host or DEFAULT_HOST, int(port)
+
+
+def encode_partial(counts: CountDict) -> bytes:
+    """
+    Encode the (uncorrected) partial counts of a range of edges with integer codes into a compact binary form: for
+    the per-edge orbit and local motif counts, the number of edges and counts, the edge IDs, the number of counts of
+    each edge, the codes and the counts follow, and then the number of global counts, their codes and the counts.
+    All numbers are little-endian 64-bit integers (32-bit for the number of counts of each edge).
+
+    :param counts: CountDict
+        partial counts with integer codes
+    :return: bytes
+        the encoded counts
+    """
+    parts = []
+    for per_edge in (counts.orbit_count, counts.local_count):
+        edge_ids = sorted(per_edge)
+        lengths = np.array([len(per_edge[e]) for e in edge_ids], dtype='<i4')
+        n_counts = int(lengths.sum())
+        parts.append(struct.pack('<qq', len(edge_ids), n_counts))
+        parts.append(np.array(edge_ids, dtype='<i8').tobytes())
+        parts.append(lengths.tobytes())
+        parts.append(np.fromiter((h for e in edge_ids for h in per_edge[e]), dtype='<i8', count=n_counts).tobytes())
+        parts.append(np.fromiter((c for e in edge_ids for c in per_edge[e].values()), dtype='<i8',
+                                 count=n_counts).tobytes())
+    parts.append(struct.pack('<q', len(counts.global_count)))
+    parts.append(np.array(list(counts.global_count), dtype='<i8').tobytes())
+    parts.append(np.array(list(counts.global_count.values()), dtype='<i8').tobytes())
+    return b''.join(parts)
+
+
+def decode_partial(data: bytes, hf: HashMotif, global_only: bool = False,
+                   names: Dict[int, str] = None) -> CountDict:
+    """ Decode partial counts encoded by encode_partial.
+
+    :param data: bytes
+        the encoded counts
+    :param hf: HashMotif
+        hash function of the counts, whose hash strings are used unless it produces integer codes
+    :param global_only: bool
+        flag to signal whether a GlobalCountDict is returned (Default: False)
+    :param names: Dict[int, str]
+        cache of already decoded hash strings by code (Default: None)
+    :return: CountDict
+        the decoded counts
+    """
+    names = {} if names is None else names
+
+    def key(code: int) -> Union[str, int]:
+        if hf.int_codes:
+            return code
+        if code not in names:
+            names[code] = hf.to_hash_str(code)
+        return names[code]
+
+    def read(dtype: str, n: int) -> np.ndarray:
+        nonlocal offset
+        array = np.frombuffer(data, dtype=dtype, count=n, offset=offset)
+        offset += array.nbytes
+        return array
+
+    counts = GlobalCountDict(comb=False) if global_only else CountDict()
+    offset = 0
+    for per_edge in (counts.orbit_count, counts.local_count):
+        n_edges, n_counts = struct.unpack_from('<qq', data, offset)
+        offset += 16
+        edge_ids, lengths = read('<i8', n_edges).tolist(), read('<i4', n_edges).tolist()
+        codes, values = read('<i8', n_counts).tolist(), read('<i8', n_counts).tolist()
+        position = 0
+        for e, length in zip(edge_ids, lengths):
+            per_edge[e] = {key(codes[p]): values[p] for p in range(position, position + length)}
+            position += length
+    n_global, = struct.unpack_from('<q', data, offset)
+    offset += 8
+    codes, values = read('<i8', n_global).tolist(), read('<i8', n_global).tolist()
+    counts.global_count = {key(code): value for code, value in zip(codes, values)}
+    return counts
+
+
+def _split_point(costs: np.ndarray, start: int, stop: int) -> int:
+    """ Return the edge ID that splits the range of edges into two halves of roughly equal estimated cost, where
+    the first half contains at least one edge (i.e. stop if the range cannot be split). """
+    if stop - start <= 1:
+        return stop
+    cum_costs = np.cumsum(costs[start:stop])
+    return start + int(np.clip(np.searchsorted(cum_costs, cum_costs[-1] / 2, side='right'), 1, stop - start - 1))
+
+
+def _send(conn: socket.socket, kind: int, payload: bytes = b''):
+    """ Send a message of the given type. """
+    conn.sendall(_HEADER.pack(kind, len(payload)) + payload)
+
+
+def _recv(conn: socket.socket) -> Tuple[int, bytes]:
+    """ Receive a message, raises a ConnectionError if the connection was closed. """
+    kind, length = _HEADER.unpack(_recv_exactly(conn, _HEADER.size))
+    return kind, _recv_exactly(conn, length)
+
+
+def _recv_exactly(conn: socket.socket, n: int) -> bytes:
+    """ Receive exactly n bytes. """
+    buffer = bytearray(n)
+    view = memoryview(buffer)
+    received = 0
+    while received < n:
+        size = conn.recv_into(view[received:], n - received)
+        if size == 0:
+            raise ConnectionError("Connection closed")
+        received += size
+    return bytes(buffer)
@@ -0,0 +1,77 @@
+from typing import Tuple
+from abc import ABC, abstractmethod
+from ..hin import HIN
+from ..metrics import Metrics
+from .hash import HashMotif
+from .count_dict import CountDict
+from .count_3_4_node_motifs import count_per_edge
+
+
+# names of the per-edge counting engines (cf. make_engine), 'python' is the reference implementation
+ENGINES: Tuple[str, ...] = ('python', 'kernel')
+
+
+class Engine(ABC):
+
+    def __init__(self, hin: HIN, hf: HashMotif, comb: bool = True):
+        """
+        Interface of the per-edge counting engines, which count all 3- and 4-node motifs of ranges of edges into a
+        CountDict (without correcting the global counts). The counts of an engine are identical to those of the
+        reference engine, so that count_motifs (and its workers and checkpoints) can use any of them.
+
+        :param hin: HIN
+            the graph for which all 3- and 4-node motifs are to be counted
+        :param hf: HashMotif
+            class that can en- and decode motifs to hash strings
+        :param comb: bool
+            flag to signal whether to utilize combinatorial relationships (Default: True)
+        """
+        self.hin: HIN = hin
+        self.hf: HashMotif = hf
+        self.comb: bool = comb
+
+    @abstractmethod
+    def count_edges(self, counts: CountDict, start: int, stop: int, metrics: Metrics = None):
+        """ Count the motifs of the edges start, ..., stop - 1 (in this order) into counts and finish each edge.
+
+        :param counts: CountDict
+            maintain local and global motif counts, as well as local orbit counts
+        :param start: int
+            first edge ID
+        :param stop: int
+            edge ID after the last edge
+        :param metrics: Metrics
+            metrics of the run, whose progress is updated per edge (resp. per range) (Default: None)
+        """
+
+
+class PythonEngine(Engine):
+    """ Reference engine, which counts each edge with count_per_edge on the (set-based or CSR) HIN. """
+
+    def count_edges(self, counts: CountDict, start: int, stop: int, metrics: Metrics = None):
+        for e_ij in range(start, stop):
+            count_per_edge(self.hin, e_ij, counts, self.hf, comb=self.comb, metrics=metrics)
+
+
+def make_engine(name: str, hin: HIN, hf: HashMotif, comb: bool = True) -> Engine:
+    """
+    Return the counting engine of the given name for a graph.
+
+    :param name: str
+        'python' for the reference engine (count_per_edge) or 'kernel' for the flat-array kernel (cf. kernel_engine,
+        which is compiled with Numba if it is installed)
+    :param hin: HIN
+        the graph for which all 3- and 4-node motifs are to be counted
+    :param hf: HashMotif
+        class that can en- and decode motifs to hash strings
+    :param comb: bool
+        flag to signal whether to utilize combinatorial relationships (Default: True)
+    :return: Engine
+        the counting engine
+    """
+    if name == 'python':
+        return PythonEngine(hin, hf, comb=comb)
+    if name == 'kernel':
+        from .kernel_engine import KernelEngine     # imported here, as it compiles the kernel (if Numba is installed)
+        return KernelEngine(hin, hf, comb=comb)
+    raise ValueError(f"Unknown counting engine '{name}', expected one of {', '.join(ENGINES)}")
@@ -1,13 +1,57 @@
-from typing import Dict, Set
+from __future__ import annotations
+from typing import Dict, List, Set, Tuple, Union
+
+
+# motif ID for each orbit ID (cf. section 4.4 of 'Heterogeneous Graphlets' by Rossi et al.)
+ORBIT_TO_MOTIF: Tuple[int, ...] = (0,
+                                   1,        # 3-star/3-path
+                                   2,        # triangle/3-clique
+                                   3, 3,     # 4-path
+                                   4,        # 4-star
+                                   5,        # 4-cycle
+                                   6, 6, 6,  # tailed triangle
+                                   7, 7,     # chordal cycle
+                                   8)        # 4-clique
+
+# number of edges of each motif ID
+MOTIF_EDGES: Tuple[int, ...] = (0,
+                                2,  # 3-star/3-path
+                                3,  # triangle/3-clique
+                                3,  # 4-path
+                                3,  # 4-star
+                                4,  # 4-cycle
+                                4,  # tailed triangle
+                                5,  # chordal cycle
+                                6)  # 4-clique
+
+# the motif (resp. orbit) ID is stored in the lowest bits of an integer code, followed by the node type fields
+ID_BITS: int = 4
+ID_MASK: int = (1 << ID_BITS) - 1
+
+
+def motif_id(h: Union[str, int]) -> int:
+    """ Return the motif (resp. orbit) ID encoded by a hash string or an integer code. """
+    if isinstance(h, str):
+        return int(h[0:2])
+    return h & ID_MASK
+
+
+def untyped_hash(h: Union[str, int]) -> Union[str, int]:
+    """ Return the hash string (resp. integer code) of the untyped motif (resp. orbit). """
+    if isinstance(h, str):
+        return h[0:2]
+    return h & ID_MASK
 
 
 class HashMotif:
 
-    def __init__(self, n_types: Set[str]):
+    def __init__(self, n_types: Set[str], int_codes: bool = False):
         """ Initialize the hash function based on the number of node types in the HIN schema.
 
         :param n_types: List[str]
             list of the node type names
+        :param int_codes: bool
+            flag to signal whether hash_motif returns integer codes instead of hash strings (Default: False)
         """
         self.n_types: Dict[str, int] = {'--': -1}
         self.n_types_num: Dict[int, str] = {-1: '--'}
@@ -17,23 +61,79 @@ class HashMotif:
             self.n_types[n_type] = i
             self.n_types_num[i] = n_type
 
-    def decode(self, hash_str: str) -> (int, str, str, str, str):
-        """ Decode hash string into a more readable format. """
+        self.int_codes: bool = int_codes
+        self._init_fields()
+
+    @classmethod
+    def from_type_ids(cls, type_ids: Dict[str, int], int_codes: bool = False) -> HashMotif:
+        """ Initialize the hash function with a given assignment of node type names to integers.
+
+        :param type_ids: Dict[str, int]
+            integer value of each node type name (e.g. the n_types of another HashMotif)
+        :param int_codes: bool
+            flag to signal whether hash_motif returns integer codes instead of hash strings (Default: False)
+        """
+        hf = cls(set(), int_codes=int_codes)
+        for n_type, i in type_ids.items():
+            hf.n_types[n_type] = i
+            hf.n_types_num[i] = n_type
+        hf._init_fields()
+        return hf
+
+    def _init_fields(self):
+        """ Initialize the formats of hash strings and integer codes based on the node type integers. """
+        max_type = max(self.n_types.values())
+        # number of digits per node type in hash strings (2 for up to 100 types, as in the original format)
+        self.width: int = max(2, len(str(max_type)))
+        # number of bits per node type in integer codes, a field stores type + 1 such that 0 encodes '--'
+        self.type_bits: int = max(1, (max_type + 1).bit_length())
+        self._fields: Dict[str, int] = {n_type: t + 1 for n_type, t in self.n_types.items()}
+
+        # lookup table for already computed hashes, indexed by the orbit ID and the unsorted node type fields
+        self._table: Dict[int, Tuple[Union[str, int], Union[str, int]]] = {}
+
+    def decode(self, hash_str: Union[str, int]) -> (int, str, str, str, str):
+        """ Decode hash string (or integer code) into a more readable format. """
+        if not isinstance(hash_str, str):
+            hash_str = self.to_hash_str(hash_str)
+        w = self.width
         g = int(hash_str[0:2])
-        i = self.n_types_num[int(hash_str[2:4])]
-        j = self.n_types_num[int(hash_str[4:6])]
-        k = self.n_types_num[int(hash_str[6:8])]
-        if hash_str[8:10] == '--':
-            r = '--'
-        else:
-            r = self.n_types_num[int(hash_str[8:10])]
+        types = []
+        for p in range(4):
+            chunk = hash_str[2 + p * w:2 + (p + 1) * w]
+            types.append('--' if chunk.startswith('-') else self.n_types_num[int(chunk)])
+        i, j, k, r = types
         return g, i, j, k, r
 
-    def hash_motif(self, g: int, i: str, j: str, k: str, r: str) -> (str, str):
+    def to_hash_str(self, code: int) -> str:
+        """ Convert an integer motif (resp. orbit) code into its hash string. """
+        g = code & ID_MASK
+        packed = code >> ID_BITS
+        if packed == 0:     # untyped motif (resp. orbit)
+            return f"{g:02}"
+        b, w = self.type_bits, self.width
+        mask = (1 << b) - 1
+        fields = [(packed >> (b * (3 - p))) & mask for p in range(4)]
+        return f"{g:02}" + ''.join(f"{f - 1:0{w}}" if f else '-' * w for f in fields)
+
+    def from_hash_str(self, hash_str: str) -> int:
+        """ Convert a hash string into its integer motif (resp. orbit) code. """
+        if len(hash_str) == 2:  # untyped motif (resp. orbit)
+            return int(hash_str)
+        w = self.width
+        packed = 0
+        for p in range(4):
+            chunk = hash_str[2 + p * w:2 + (p + 1) * w]
+            packed = (packed << self.type_bits) | (0 if chunk.startswith('-') else int(chunk) + 1)
+        return (packed << ID_BITS) | int(hash_str[0:2])
+
+    def hash_motif(self, g: int, i: str, j: str, k: str, r: str) -> (Union[str, int], Union[str, int]):
         """
-        Compute a hash that encodes the edge types in the motif (for max. 100 types in the schema).
+        Compute a hash that encodes the edge types in the motif.
         (cf. section 4.4 of 'Heterogeneous Graphlets' by Rossi et al.)
 
+        Hashes are only computed once for each orbit ID and combination of node types and looked up afterwards.
+
         :param g: int
             orbit ID
         :param i: str
@@ -44,42 +144,44 @@ class HashMotif:
             type of node k
         :param r: str
             type of node r
-        :return: (str, str)
-            motif hash and orbit hash that encode the node types
+        :return: (str, str) or (int, int)
+            motif hash and orbit hash that encode the node types (integer codes if int_codes is set)
         """
+        f, b = self._fields, self.type_bits
+        key = (((((g << b | f[i]) << b) | f[j]) << b | f[k]) << b) | f[r]
+        hashes = self._table.get(key)
+        if hashes is None:
+            if not 1 <= g <= 12:
+                raise Exception(f"Invalid orbit ID ({g}). ID must be between 1 and 12.")
+            if self.int_codes:
+                hashes = self._encode(g, i, j, k, r)
+            else:
+                hashes = self._hash_str(g, i, j, k, r)
+            self._table[key] = hashes
+        return hashes
 
-        # derive motif ID m from orbit ID g
-        if g == 1 or g == 2:
-            m = g  # 3-star/3-path (1) or triangle/3-clique (2)
-        elif g == 3 or g == 4:
-            m = 3  # 4-path
-        elif g == 5:
-            m = 4  # 4-star
-        elif g == 6:
-            m = 5  # 4-cycle
-        elif g == 7 or g == 8 or g == 9:
-            m = 6  # tailed triangle
-        elif g == 10 or g == 11:
-            m = 7  # chordal cycle
-        elif g == 12:
-            m = 8  # 4-clique
-        else:
-            raise Exception(f"Invalid orbit ID ({g}). ID must be between 1 and 12.")
-
+    def _sorted_types(self, i: str, j: str, k: str, r: str) -> List[int]:
+        """ Return the node types in ascending order, which provides a canonical encoding. """
         if r == '--':
-            types = sorted([self.n_types[i], self.n_types[j], self.n_types[k]])
-            type_sum = types[0] * pow(10, 4) + types[1] * pow(10, 2) + types[2]
-            g = g * pow(10, 6)
-            m = m * pow(10, 6)
-            orbit_hash = f"{g + type_sum:08}--"
-            motif_hash = f"{m + type_sum:08}--"
-        else:
-            types = sorted([self.n_types[i], self.n_types[j],
-                            self.n_types[k], self.n_types[r]])
-            type_sum = types[0] * pow(10, 6) + types[1] * pow(10, 4) + types[2] * pow(10, 2) + types[3]
-            g = g * pow(10, 8)
-            m = m * pow(10, 8)
-            orbit_hash = f"{g + type_sum:010}"
-            motif_hash = f"{m + type_sum:010}"
+            return sorted([self.n_types[i], self.n_types[j], self.n_types[k]])
+        return sorted([self.n_types[i], self.n_types[j], self.n_types[k], self.n_types[r]])
 
+    def _hash_str(self, g: int, i: str, j: str, k: str, r: str) -> (str, str):
+        """ Compute motif and orbit hash strings, e.g. '02001005--' (with two digits per type for <= 100 types). """
+        w = self.width
+        type_str = ''.join(f"{t:0{w}}" for t in self._sorted_types(i, j, k, r))
+        if r == '--':
+            type_str += '-' * w
+        orbit_hash = f"{g:02}{type_str}"
+        motif_hash = f"{ORBIT_TO_MOTIF[g]:02}{type_str}"
         return motif_hash, orbit_hash
+
+    def _encode(self, g: int, i: str, j: str, k: str, r: str) -> (int, int):
+        """ Compute integer motif and orbit codes by packing the orbit ID and the sorted node types into bits. """
+        packed = 0
+        for t in self._sorted_types(i, j, k, r):
+            packed = (packed << self.type_bits) | (t + 1)
+        if r == '--':
+            packed <<= self.type_bits
+        packed <<= ID_BITS
+        return packed | ORBIT_TO_MOTIF[g], packed | g
@@ -0,0 +1,152 @@
+from typing import Dict, List, Set, Tuple, Union
+from ..hin import HIN
+from .hash import HashMotif, MOTIF_EDGES, motif_id
+from .count_dict import CountDict
+from .count_3_4_node_motifs import count_motifs, count_per_edge
+
+
+class IncrementalCounter:
+
+    def __init__(self, hin: HIN, counts: CountDict = None, comb: bool = True):
+        """
+        Maintain the motif counts of an HIN under edge insertions and deletions.
+
+        When an edge (a, b) is inserted or deleted, only the motifs on node sets that contain both a and b change.
+        All edges of such motifs have an endpoint in the closed neighborhoods N[a] and N[b], hence exactly these edges
+        are recounted with count_per_edge (including the combinatorial relationships), and the global counts are
+        updated by the differences of their local counts. The cost of an update grows with the size of the 2-hop
+        neighborhood of the changed edge rather than with the size of the graph.
+
+        :param hin: HIN
+            the (set-based) graph, which is modified by add_edge and remove_edge, in its original order (i.e. not
+            relabeled when it was loaded, cf. hin.reorder), as the counts refer to the original edge IDs
+        :param counts: CountDict (optional)
+            the (corrected) counts of hin, e.g. loaded with CountDict.load_from_json. If None, they are computed
+        :param comb: bool
+            flag to signal whether to utilize combinatorial relationships (Default: True)
+        """
+        if hin.node_ids is not None or hin.edge_ids is not None:
+            raise ValueError("Incremental updates require a graph in its original order, load it without reordering")
+        if counts is None:
+            counts = count_motifs(hin, comb=comb)
+
+        self.hin: HIN = hin
+        self.counts: CountDict = counts
+        self.comb: bool = comb
+        self.hf: HashMotif = counts.hf if counts.hf is not None else HashMotif(hin.node_types)
+        # edge ID for each (ordered) pair of connected nodes
+        self.edge_ids: Dict[Tuple[int, int], int] = {(min(i, j), max(i, j)): e for e, (i, j) in enumerate(hin.edges)}
+
+    def _incident_edges(self, nodes: Set[int]) -> Set[int]:
+        """ Return the IDs of all edges that have an endpoint in the given set of nodes. """
+        edge_ids = set()
+        for v in nodes:
+            for u in self.hin.neighbors[v]:
+                edge_ids.add(self.edge_ids[(min(u, v), max(u, v))])
+        return edge_ids
+
+    def _affected_edges(self, a: int, b: int) -> Set[int]:
+        """ Return the IDs of all edges whose counts may change if the edge (a, b) is inserted or deleted. """
+        nodes = {a, b} | self.hin.neighbors[a] | self.hin.neighbors[b]
+        return self._incident_edges(nodes)
+
+    def _subtract(self, edge_ids: Set[int], diff: Dict[Union[str, int], int]):
+        """ Remove the per-edge counts of the given edges and subtract their local counts from diff. """
+        for e in edge_ids:
+            self.counts.orbit_count.pop(e, None)
+            for h, count in self.counts.local_count.pop(e, {}).items():
+                diff[h] = diff.get(h, 0) - count
+
+    def _recount(self, edge_ids: Set[int], diff: Dict[Union[str, int], int]):
+        """ Recount the given edges and add their local counts to diff. """
+        recounts = CountDict()     # the (uncorrected) global counts are maintained by _apply instead
+        for e in sorted(edge_ids):
+            count_per_edge(self.hin, e, recounts, self.hf, comb=self.comb)
+            self.counts.orbit_count[e] = recounts.orbit_count.pop(e)
+            self.counts.local_count[e] = recounts.local_count.pop(e)
+            for h, count in self.counts.local_count[e].items():
+                diff[h] = diff.get(h, 0) + count
+
+    def _apply(self, diff: Dict[Union[str, int], int]):
+        """ Update the (corrected) global counts by the differences of the local counts. """
+        global_count = self.counts.global_count
+        for h, count in diff.items():
+            if count == 0:
+                continue
+            # each motif instance that changed is counted once for each of its edges
+            global_count[h] = global_count.get(h, 0) + count // MOTIF_EDGES[motif_id(h)]
+            if global_count[h] == 0:
+                del global_count[h]
+
+    def add_edge(self, i: int, j: int, edge_type: int = -1) -> int:
+        """ Insert an edge between node i and node j and update the counts.
+
+        :param i: int
+            node ID
+        :param j: int
+            node ID
+        :param edge_type: int
+            integer edge type of the new edge, if edge types are known (Default: -1)
+        :return: int
+            edge ID of the new edge
+        """
+        edge_id = self.hin.add_edge(i, j, edge_type)
+        self.edge_ids[(min(i, j), max(i, j))] = edge_id
+
+        affected = self._affected_edges(i, j)
+        diff: Dict[Union[str, int], int] = {}
+        self._subtract(affected, diff)
+        self._recount(affected, diff)
+        self._apply(diff)
+        return edge_id
+
+    def remove_edge(self, i: int, j: int) -> int:
+        """ Delete the edge between node i and node j and update the counts.
+
+        Note that the last edge takes over the edge ID of the deleted edge (cf. HIN.remove_edge).
+
+        :param i: int
+            node ID
+        :param j: int
+            node ID
+        :return: int
+            edge ID of the deleted edge
+        """
+        key = (min(i, j), max(i, j))
+        if key not in self.edge_ids:
+            raise ValueError(f"Cannot remove edge ({i}, {j}), since the nodes are not connected.")
+        edge_id = self.edge_ids[key]
+
+        affected = self._affected_edges(i, j)
+        del self.edge_ids[key]
+        diff: Dict[Union[str, int], int] = {}
+        self._subtract(affected, diff)
+
+        moved = self.hin.remove_edge(edge_id)
+        affected.discard(edge_id)
+        if moved != edge_id:    # the last edge takes over the ID of the deleted edge
+            u, v = self.hin.edges[edge_id]
+            self.edge_ids[(min(u, v), max(u, v))] = edge_id
+            if moved in affected:
+                affected.discard(moved)
+                affected.add(edge_id)
+            else:
+                self.counts.orbit_count[edge_id] = self.counts.orbit_count.pop(moved)
+                self.counts.local_count[edge_id] = self.counts.local_count.pop(moved)
+
+        self._recount(affected, diff)
+        self._apply(diff)
+        return edge_id
+
+    def update(self, added: List[Tuple[int, int]] = (), removed: List[Tuple[int, int]] = ()):
+        """ Apply a batch of edge deletions and insertions (in this order), e.g. the daily changes of the graph.
+
+        :param added: List[Tuple[int, int]]
+            node ID pairs of the edges to insert
+        :param removed: List[Tuple[int, int]]
+            node ID pairs of the edges to delete
+        """
+        for i, j in removed:
+            self.remove_edge(i, j)
+        for i, j in added:
+            self.add_edge(i, j)
@@ -0,0 +1,288 @@
+from typing import Dict, List, Tuple, Union
+from contextlib import nullcontext
+import numpy as np
+from ..hin import HIN, build_csr
+from ..metrics import Metrics
+from .hash import HashMotif
+from .count_dict import CountDict, NodeCountDict
+from .engine import Engine
+from .node_orbits import attribute_other_nodes
+
+try:
+    from numba import njit
+except ImportError:     # the kernel runs as pure Python (on lists instead of arrays)
+    njit = None
+
+
+# flag to signal whether the kernel is compiled with Numba
+NUMBA: bool = njit is not None
+# number of (edge ID, orbit key, count) rows that the kernel writes, before the counts are updated in Python
+OUTPUT_ROWS: int = 1 << 16
+
+Sequence = Union[np.ndarray, List[int]]
+
+
+def _add(local: Sequence, touched: Sequence, n_touched: int, key: int, count: int) -> int:
+    """ Add count to the orbit key of the current edge and return the new number of touched keys. """
+    if local[key] == 0:
+        touched[n_touched] = key
+        n_touched += 1
+    local[key] += count
+    return n_touched
+
+
+def _derive(local: Sequence, touched: Sequence, n_touched: int, g: int, g_sub: int, n_comb: int, a: int, b: int,
+            plane: int, width: int) -> int:
+    """ Add the orbit g for the node types (a, b) with a <= b, whose number of combinations n_comb includes the
+    orbit g_sub (of both orders of the node types), cf. derive_comb_counts. Return the new number of touched keys. """
+    n_sub = local[g_sub * plane + a * width + b]
+    if a != b:
+        n_sub += local[g_sub * plane + b * width + a]
+    if n_comb > n_sub:
+        n_touched = _add(local, touched, n_touched, g * plane + a * width + b, n_comb - n_sub)
+    return n_touched
+
+
+def _count_kernel(indptr: Sequence, indices: Sequence, node_type: Sequence, src: Sequence, dst: Sequence, n_t: int,
+                  comb: bool, start: int, stop: int, mark: Sequence, adjacent: Sequence, nodes: Sequence,
+                  local: Sequence, touched: Sequence, sizes: Sequence, active: Sequence, out_edge: Sequence,
+                  out_key: Sequence, out_count: Sequence) -> Tuple[int, int]:
+    """
+    Count the orbits of the edges start, ..., stop - 1 with the algorithm of count_per_edge over the flat arrays of
+    the CSR adjacency, and write a row (edge ID, orbit key, count) per orbit and pair of node types of each edge to
+    the output columns, where the orbit key of the orbit g and the node types (t_k, t_r) is
+    (g * n_t + t_k) * (n_t + 1) + t_r, with t_r = n_t for the 3-node orbits. The kernel stops early, once the output
+    columns could overflow with the next edge.
+
+    The sets of an edge (i, j) are marked per node (1 for Si, 2 for Sj, 3 for Tij) instead of kept as sets, so that
+    each neighbor r of a node k in Si, Sj or Tij is classified by a single lookup. The orbits g4, g5, g9 and g11
+    are derived from the typed sizes of the sets (cf. derive_comb_counts) if comb is set, and enumerated otherwise.
+
+    All other arguments are scratch space, which is all zero between two calls: mark and adjacent have an entry
+    per node, nodes has an entry per neighbor of i and j, local and touched have an entry per orbit key, sizes has
+    3 * n_t entries and active has n_t entries.
+
+    :return: (int, int)
+        the edge ID after the last counted edge and the number of output rows
+    """
+    width = n_t + 1
+    plane = n_t * width
+    rows = 0
+    e = start
+    while e < stop and rows + len(touched) <= len(out_key):
+        i = src[e]
+        j = dst[e]
+        n_touched = 0
+        n_active = 0
+
+        # nodes[:n_si] are the neighbors of i (in Si or Tij), nodes[n_si:n_nodes] the other neighbors of j (in Sj)
+        n_si = 0
+        for p in range(indptr[i], indptr[i + 1]):
+            k = indices[p]
+            if k != j:
+                mark[k] = 1
+                nodes[n_si] = k
+                n_si += 1
+        n_nodes = n_si
+        for p in range(indptr[j], indptr[j + 1]):
+            k = indices[p]
+            if k != i:
+                if mark[k] == 1:
+                    mark[k] = 3
+                else:
+                    mark[k] = 2
+                    nodes[n_nodes] = k
+                    n_nodes += 1
+
+        # 3-star and triangle, and the typed sizes of Si, Sj and Tij
+        for q in range(n_nodes):
+            k = nodes[q]
+            m = mark[k]
+            t_k = node_type[k]
+            g = 2 if m == 3 else 1
+            n_touched = _add(local, touched, n_touched, g * plane + t_k * width + n_t, 1)
+            if comb:
+                if sizes[t_k] + sizes[n_t + t_k] + sizes[2 * n_t + t_k] == 0:
+                    active[n_active] = t_k
+                    n_active += 1
+                sizes[(m - 1) * n_t + t_k] += 1
+
+        # path-based (k in Si or Sj) and triangle-based (k in Tij) orbits by the class of each neighbor r of k
+        for q in range(n_nodes):
+            k = nodes[q]
+            m = mark[k]
+            row = node_type[k] * width
+            for p in range(indptr[k], indptr[k + 1]):
+                r = indices[p]
+                if r == i or r == j:
+                    continue
+                m_r = mark[r]
+                g = 0
+                if m == 3:
+                    if m_r == 0:
+                        g = 8       # tailed triangle (center orbit)
+                    elif m_r != 3:
+                        g = 10      # chordal cycle (edge orbit)
+                    elif r < k:
+                        g = 12      # 4-clique
+                elif m_r == 0:
+                    g = 3           # 4-path (edge orbit)
+                elif m_r == m:
+                    if r < k:
+                        g = 7       # tailed triangle (tail orbit)
+                elif m == 2 and m_r == 1:
+                    g = 6           # 4-cycle
+                if g != 0:
+                    n_touched = _add(local, touched, n_touched, g * plane + row + node_type[r], 1)
+                if not comb:
+                    adjacent[r] = 1
+
+            if not comb:    # the nodes of Si, Sj and Tij that are not connected to k
+                for s in range(n_nodes):
+                    r = nodes[s]
+                    if adjacent[r] == 1:
+                        continue
+                    m_r = mark[r]
+                    g = 0
+                    if m == 3:
+                        if m_r != 3:
+                            g = 9       # tailed triangle (tri-edge orbit)
+                        elif r < k:
+                            g = 11      # chordal cycle (center orbit)
+                    elif m_r == m:
+                        if r < k:
+                            g = 5       # 4-star
+                    elif m == 1 and m_r == 2:
+                        g = 4           # 4-path (center orbit)
+                    if g != 0:
+                        n_touched = _add(local, touched, n_touched, g * plane + row + node_type[r], 1)
+                for p in range(indptr[k], indptr[k + 1]):
+                    adjacent[indices[p]] = 0
+
+        # cf. derive_comb_counts, for each pair of node types (a, b) with a <= b
+        for x in range(n_active):
+            a = active[x]
+            si_a, sj_a, tij_a = sizes[a], sizes[n_t + a], sizes[2 * n_t + a]
+            for y in range(n_active):
+                b = active[y]
+                if b < a:
+                    continue
+                if a == b:
+                    n_4 = si_a * sj_a
+                    n_5 = si_a * (si_a - 1) // 2 + sj_a * (sj_a - 1) // 2
+                    n_9 = tij_a * (si_a + sj_a)
+                    n_11 = tij_a * (tij_a - 1) // 2
+                else:
+                    si_b, sj_b, tij_b = sizes[b], sizes[n_t + b], sizes[2 * n_t + b]
+                    n_4 = si_a * sj_b + si_b * sj_a
+                    n_5 = si_a * si_b + sj_a * sj_b
+                    n_9 = tij_a * (si_b + sj_b) + tij_b * (si_a + sj_a)
+                    n_11 = tij_a * tij_b
+                n_touched = _derive(local, touched, n_touched, 4, 6, n_4, a, b, plane, width)
+                n_touched = _derive(local, touched, n_touched, 5, 7, n_5, a, b, plane, width)
+                n_touched = _derive(local, touched, n_touched, 9, 10, n_9, a, b, plane, width)
+                n_touched = _derive(local, touched, n_touched, 11, 12, n_11, a, b, plane, width)
+        for x in range(n_active):
+            a = active[x]
+            sizes[a] = 0
+            sizes[n_t + a] = 0
+            sizes[2 * n_t + a] = 0
+
+        for x in range(n_touched):
+            key = touched[x]
+            out_edge[rows] = e
+            out_key[rows] = key
+            out_count[rows] = local[key]
+            local[key] = 0
+            rows += 1
+        for q in range(n_nodes):
+            mark[nodes[q]] = 0
+        e += 1
+    return e, rows
+
+
+if NUMBA:
+    # the kernel resolves the helpers when it is compiled (on its first call), i.e. their compiled versions
+    _add = njit(cache=True)(_add)
+    _derive = njit(cache=True)(_derive)
+    _count_kernel = njit(cache=True)(_count_kernel)
+
+
+class KernelEngine(Engine):
+
+    def __init__(self, hin: HIN, hf: HashMotif, comb: bool = True):
+        """
+        Counting engine that runs the per-edge algorithm of count_per_edge over the flat integer arrays of the CSR
+        adjacency of the graph (cf. _count_kernel), which is compiled with Numba if it is installed and runs as pure
+        Python on lists otherwise. The kernel writes the orbit counts of a range of edges to flat output columns,
+        which are then hashed and added to the CountDict edge by edge in Python. The counts are identical to those
+        of the reference engine.
+
+        :param hin: HIN
+            the graph for which all 3- and 4-node motifs are to be counted (set-based or CSR)
+        :param hf: HashMotif
+            class that can en- and decode motifs to hash strings
+        :param comb: bool
+            flag to signal whether to utilize combinatorial relationships (Default: True)
+        """
+        super().__init__(hin, hf, comb=comb)
+        n, n_t = len(hin.node_type), len(hin.type_names)
+        edges = np.asarray(hin.edge_array, dtype=np.int64).reshape(-1, 2)
+        if hasattr(hin, 'indptr'):  # CSRHIN
+            indptr, indices = hin.indptr, hin.indices
+        else:
+            indptr, indices = build_csr(hin.node_type, edges, n_t)[:2]
+        max_degree = int(np.diff(indptr).max()) if n > 0 else 0
+        n_keys = 13 * n_t * (n_t + 1)
+        self.n_t: int = n_t
+        self.n_keys: int = n_keys
+
+        graph = [np.asarray(a, dtype=np.int64) for a in (indptr, indices, hin.node_type, edges[:, 0], edges[:, 1])]
+        scratch = [np.zeros(n, dtype=np.int8), np.zeros(n, dtype=np.int8), np.zeros(2 * max_degree, dtype=np.int64),
+                   np.zeros(n_keys, dtype=np.int64), np.zeros(n_keys, dtype=np.int64),
+                   np.zeros(3 * n_t, dtype=np.int64), np.zeros(n_t, dtype=np.int64)]
+        out = [np.zeros(max(OUTPUT_ROWS, n_keys), dtype=np.int64) for _ in range(3)]
+        if not NUMBA:   # plain lists are much faster to index in Python
+            graph, scratch, out = ([a.tolist() for a in arrays] for arrays in (graph, scratch, out))
+        self._graph: List[Sequence] = graph
+        self._scratch: List[Sequence] = scratch
+        self._out: List[Sequence] = out
+        # motif and orbit hash by (node type of i, node type of j, orbit key)
+        self._hashes: Dict[int, Tuple[Union[str, int], Union[str, int]]] = {}
+
+    def count_edges(self, counts: CountDict, start: int, stop: int, metrics: Metrics = None):
+        with metrics.phase('kernel') if metrics is not None else nullcontext():
+            e = start
+            while e < stop:
+                first = e
+                e, rows = _count_kernel(*self._graph, self.n_t, self.comb, first, stop, *self._scratch, *self._out)
+                self._update(counts, first, e, rows)
+                if metrics is not None:
+                    cost = float(metrics.costs[first:e].sum()) if metrics.costs is not None else float(e - first)
+                    metrics.add_edges(e - first, cost)
+
+    def _update(self, counts: CountDict, start: int, stop: int, rows: int):
+        """ Add the output rows of the kernel for the edges start, ..., stop - 1 to counts and finish the edges. """
+        hin, hf, hashes = self.hin, self.hf, self._hashes
+        n_t, n_keys = self.n_t, self.n_keys
+        plane, width = n_t * (n_t + 1), n_t + 1
+        node_type = self._graph[2]
+        out_edge, out_key, out_count = (col[:rows].tolist() if NUMBA else col[:rows] for col in self._out)
+        row = 0
+        for e_ij in range(start, stop):
+            counts.orbit_count[e_ij] = {}
+            counts.local_count[e_ij] = {}
+            i, j = hin.edges[e_ij]
+            pair = (int(node_type[i]) * n_t + int(node_type[j])) * n_keys
+            while row < rows and out_edge[row] == e_ij:
+                key = out_key[row]
+                h = hashes.get(pair + key)
+                if h is None:
+                    g, a, b = key // plane, key % plane // width, key % width
+                    t_r = hin.type_names[b] if b < n_t else '--'
+                    h = hashes[pair + key] = hf.hash_motif(g, hin.types[i], hin.types[j], hin.type_names[a], t_r)
+                counts.update(e_ij, h[0], h[1], count=out_count[row])
+                row += 1
+            if isinstance(counts, NodeCountDict):
+                attribute_other_nodes(hin, e_ij, counts, hf)
+            counts.finish_edge(e_ij, i, j)
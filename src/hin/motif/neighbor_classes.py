@@ -0,0 +1,143 @@
+from typing import Dict, Iterable, List, Set, Tuple, Union
+from itertools import chain
+import numpy as np
+from ..hin import HIN
+from .hash import HashMotif
+from .count_dict import CountDict
+
+
+# the nodes of Si, Sj or Tij that are not connected to a node k are counted from prefix sums over the sorted set (cf.
+# NeighborClasses.non_adjacent) once it has at least this many nodes, smaller sets are filtered directly
+PREFIX_MIN_SIZE: int = 64
+
+
+class NeighborClasses:
+
+    def __init__(self, hin: HIN, i: int, j: int, Si: Set[int], Sj: Set[int], Tij: Set[int], keep: bool = False):
+        """
+        Classify the neighbors r of a node k around an edge (i, j) as in Si, in Sj, in Tij or outside (i.e. not
+        connected to i or j), all neighbors of k at once instead of probing hin.connected and the sets per neighbor.
+        The classes in Si, Sj and Tij are the intersections of the neighbors of k with these sets (which run in C and
+        only visit the smaller side for set-based HINs), the outside neighbors are never enumerated, but only counted
+        per node type as the typed degree of k minus the node types of the other classes. The orbit instances of each
+        class are collected in a batch per orbit and pair of node types (cf. add), so that the counts of the edge are
+        only updated once per combination (cf. flush) instead of once per neighbor.
+
+        The nodes of Si, Sj and Tij that are not connected to k (which the enumeration without combinatorial
+        relationships needs) are counted per node type likewise, as the nodes of the set within an ID range (from
+        prefix sums over the sorted set, which are built once per edge and set) minus those connected to k.
+
+        With keep, the classes of each node k are kept once they are classified, so that the enumeration of the node
+        positions of the edge (cf. node_orbits.attribute_other_nodes) does not intersect the neighbors of k again.
+
+        :param hin: HIN
+            the underlying graph
+        :param i: int
+            node ID of node i of the current edge
+        :param j: int
+            node ID of node j of the current edge
+        :param Si: Set[int]
+            set of node IDs that are connected to i (and not j)
+        :param Sj: Set[int]
+            set of node IDs that are connected to j (and not i)
+        :param Tij: Set[int]
+            set of node IDs that are connected to i and j
+        :param keep: bool
+            flag to signal whether the classes of each classified node are kept (Default: False)
+        """
+        self.hin: HIN = hin
+        self.Si: Set[int] = Si
+        self.Sj: Set[int] = Sj
+        self.Tij: Set[int] = Tij
+        self.types: List[str] = hin.types
+        self.type_names: List[str] = hin.type_names
+        self.t_i: str = hin.types[i]
+        self.t_j: str = hin.types[j]
+        # number of orbit instances by (orbit, node type of k, node type of r, update motif, update orbit)
+        self.batch: Dict[Tuple[int, str, str, bool, bool], int] = {}
+        # sorted node IDs and prefix sums of their integer node types of each set, built on demand (cf. non_adjacent)
+        self._prefix: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # classes of the neighbors of each classified node k, if they are kept (cf. classify)
+        self._classified: Union[Dict[int, Tuple[Set[int], Set[int], Set[int]]], None] = {} if keep else None
+
+    def add(self, g: int, t_k: str, type_counts: Dict[str, int], motif: bool = True, orbit: bool = True):
+        """ Add the instances of the orbit g with a node k of type t_k and the given number of fourth nodes per node
+        type to the batch of the edge (cf. flush). The motif resp. orbit counts are only updated if motif resp. orbit
+        is set. """
+        batch = self.batch
+        for t_r, count in type_counts.items():
+            if count > 0:
+                key = (g, t_k, t_r, motif, orbit)
+                batch[key] = batch.get(key, 0) + count
+
+    def flush(self, counts: CountDict, edge_id: int, hf: HashMotif):
+        """ Update the counts of the edge once per orbit and pair of node types in the batch, and clear the batch.
+
+        :param counts: CountDict
+            maintain local and global motif counts, as well as local orbit counts
+        :param edge_id: int
+            edge ID of the current edge
+        :param hf: HashMotif
+            class that can en- and decode motifs to hash strings
+        """
+        for (g, t_k, t_r, motif, orbit), count in self.batch.items():
+            mh, oh = hf.hash_motif(g, self.t_i, self.t_j, t_k, t_r)
+            counts.update(edge_id, mh if motif else None, oh if orbit else None, count=count)
+        self.batch.clear()
+
+    def classify(self, k: int) -> Tuple[Set[int], Set[int], Set[int]]:
+        """ Return the neighbors of node k that are in Si, in Sj and in Tij (which must not be modified). """
+        classified = self._classified
+        if classified is not None and k in classified:
+            return classified[k]
+        neighbors = self.hin.neighbors[k]
+        classes = self.Si.intersection(neighbors), self.Sj.intersection(neighbors), self.Tij.intersection(neighbors)
+        if classified is not None:
+            classified[k] = classes
+        return classes
+
+    def outside(self, k: int, in_si: Set[int], in_sj: Set[int], in_tij: Set[int]) -> Dict[str, int]:
+        """ Return the number of neighbors of node k per node type that are neither i, j nor in Si, Sj or Tij, given
+        the other classes of its neighbors (cf. classify). Node types without such neighbors may have count 0. """
+        types = self.types
+        counts = {t: count for t, count in zip(self.type_names, self.hin.typed_degrees(k).tolist()) if count}
+        for r in chain(in_si, in_sj, in_tij):
+            counts[types[r]] -= 1
+        if k in self.Si or k in self.Tij:
+            counts[self.t_i] -= 1
+        if k in self.Sj or k in self.Tij:
+            counts[self.t_j] -= 1
+        return counts
+
+    def type_counts(self, nodes: Iterable[int], lo: int = None, hi: int = None) -> Dict[str, int]:
+        """ Return the number of nodes per node type, only of the nodes r with lo < r < hi (if given). """
+        if not nodes:
+            return {}
+        types = self.types
+        counts: Dict[str, int] = {}
+        for r in nodes:
+            if (lo is None or r > lo) and (hi is None or r < hi):
+                counts[types[r]] = counts.get(types[r], 0) + 1
+        return counts
+
+    def non_adjacent(self, name: str, adjacent: Set[int], lo: int = None, hi: int = None) -> Dict[str, int]:
+        """ Return the number of nodes per node type of the set Si, Sj or Tij (by name) with lo < r < hi (if given)
+        that are not connected to a node k, given the nodes of the set that are connected to k (cf. classify). """
+        nodes = getattr(self, name)
+        if len(nodes) < PREFIX_MIN_SIZE:
+            return self.type_counts(nodes.difference(adjacent), lo, hi)
+        if name not in self._prefix:
+            nodes = np.sort(np.fromiter(nodes, dtype=np.int64, count=len(nodes)))
+            one_hot = np.eye(len(self.type_names), dtype=np.int64)[self.hin.node_type[nodes]]
+            prefix = np.zeros((len(nodes) + 1, len(self.type_names)), dtype=np.int64)
+            np.cumsum(one_hot, axis=0, out=prefix[1:])
+            self._prefix[name] = nodes, prefix
+        nodes, prefix = self._prefix[name]
+        start = int(np.searchsorted(nodes, lo, side='right')) if lo is not None else 0
+        stop = int(np.searchsorted(nodes, hi, side='left')) if hi is not None else len(nodes)
+        if stop <= start:
+            return {}
+        in_range = (prefix[stop] - prefix[start]).tolist()
+        adjacent = self.type_counts(adjacent, lo, hi)
+        return {t: count - adjacent.get(t, 0) for t, count in zip(self.type_names, in_range)
+                if count > adjacent.get(t, 0)}
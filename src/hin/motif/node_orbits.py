@@ -0,0 +1,100 @@
+from typing import Dict, Set, Tuple, Union
+from ..hin import HIN
+from .hash import HashMotif
+from .count_dict import NodeCountDict
+from .neighbor_classes import NeighborClasses
+
+
+def attribute_other_nodes(hin: HIN, edge_id: int, counts: NodeCountDict, hf: HashMotif,
+                          classes: NeighborClasses = None):
+    """
+    Add the orbit instances of an edge (i, j) to the rows of their other nodes k and r in the second plane of
+    counts.node_count, i.e. the node-level counts of the positions that are not an end node of the edge (cf.
+    NodeCountDict). Unlike the orbit counts of the edge, which derive several orbits with combinatorial relationships,
+    the instances of all orbits are attributed to the identities of k and r: for each node k around the edge, its
+    partners r are counted per node type from the classes of its neighbors (cf. NeighborClasses), and only the fourth
+    nodes r outside the neighborhoods of i and j are enumerated one by one (as the 4-path and tailed-triangle instances
+    are attributed to them).
+    The sets Si, Sj and Tij and the classes of the neighbors are taken from the classes that counted the edge, if
+    given (cf. count_per_edge, which keeps them), otherwise they are built for the edge (e.g. for the kernel engine).
+
+    :param hin: HIN
+        the underlying graph
+    :param edge_id: int
+        edge ID of the current edge between nodes i and j
+    :param counts: NodeCountDict
+        maintain the node-level orbit counts
+    :param hf: HashMotif
+        class that can en- and decode motifs to hash strings
+    :param classes: NeighborClasses (optional)
+        classes of the neighbors around the edge, whose classified nodes are reused (Default: None)
+    """
+    i, j = hin.edges[edge_id]
+    types = hin.types
+    t_i, t_j = types[i], types[j]
+    if classes is None:
+        neighbors_i: Set[int] = set(hin.neighbors[i])
+        Tij: Set[int] = neighbors_i.intersection(hin.neighbors[j])
+        Si: Set[int] = neighbors_i - Tij - {j}
+        Sj: Set[int] = set(hin.neighbors[j]) - Tij - {i}
+        classes = NeighborClasses(hin, i, j, Si, Sj, Tij)
+    Si, Sj, Tij = classes.Si, classes.Sj, classes.Tij
+    set_types = {name: classes.type_counts(nodes) for name, nodes in (('Si', Si), ('Sj', Sj), ('Tij', Tij))}
+
+    # number of instances by (node, orbit hash), and orbit hash by (orbit, type of k, type of r)
+    attributed: Dict[Tuple[int, Union[str, int]], int] = {}
+    hashes: Dict[Tuple[int, str, str], Union[str, int]] = {}
+
+    def add(v: int, g: int, t_k: str, t_r: str, count: int):
+        if count > 0:
+            oh = hashes.get((g, t_k, t_r))
+            if oh is None:
+                oh = hashes[(g, t_k, t_r)] = hf.hash_motif(g, t_i, t_j, t_k, t_r)[1]
+            attributed[(v, oh)] = attributed.get((v, oh), 0) + count
+
+    def add_types(v: int, g: int, t_k: str, type_counts: Dict[str, int], k_is_v: bool = True):
+        for t, count in type_counts.items():
+            add(v, g, t_k, t, count) if k_is_v else add(v, g, t, t_k, count)
+
+    def non_adjacent(name: str, adjacent: Set[int], v: int) -> Dict[str, int]:
+        """ Number of nodes of a set per node type that are neither connected to v nor v itself. """
+        result = dict(set_types[name])
+        for r in adjacent:
+            result[types[r]] -= 1
+        if v in getattr(classes, name):
+            result[types[v]] -= 1
+        return result
+
+    def outside(v: int, g: int, in_si: Set[int], in_sj: Set[int], in_tij: Set[int]):
+        """ Attribute the instances of orbit g with v as k and its neighbors outside N(i) and N(j) as r. """
+        add_types(v, g, types[v], classes.outside(v, in_si, in_sj, in_tij))
+        for r in hin.neighbors[v]:
+            if r != i and r != j and r not in Si and r not in Sj and r not in Tij:
+                add(r, g, types[v], types[r], 1)
+
+    for own, other in (('Si', 'Sj'), ('Sj', 'Si')):
+        for v in getattr(classes, own):
+            t_v = types[v]
+            in_sets = dict(zip(('Si', 'Sj', 'Tij'), classes.classify(v)))
+            add(v, 1, t_v, '--', 1)                                                     # 3-path
+            outside(v, 3, in_sets['Si'], in_sets['Sj'], in_sets['Tij'])                 # 4-path (edge orbit)
+            add_types(v, 7, t_v, classes.type_counts(in_sets[own]))                     # tailed-triangle (tail)
+            add_types(v, 6, t_v, classes.type_counts(in_sets[other]))                   # 4-cycle
+            add_types(v, 5, t_v, non_adjacent(own, in_sets[own], v))                    # 4-star
+            add_types(v, 4, t_v, non_adjacent(other, in_sets[other], v))                # 4-path (center orbit)
+            # v as the fourth node r of the instances with a node k in Tij
+            add_types(v, 10, t_v, classes.type_counts(in_sets['Tij']), k_is_v=False)    # chordal-cycle (edge)
+            add_types(v, 9, t_v, non_adjacent('Tij', in_sets['Tij'], v), k_is_v=False)  # tailed-triangle (tri-edge)
+
+    for v in Tij:
+        t_v = types[v]
+        in_si, in_sj, in_tij = classes.classify(v)
+        add(v, 2, t_v, '--', 1)                                                         # triangle
+        add_types(v, 12, t_v, classes.type_counts(in_tij))                              # 4-clique
+        add_types(v, 10, t_v, classes.type_counts(in_si | in_sj))                       # chordal-cycle (edge)
+        outside(v, 8, in_si, in_sj, in_tij)                                             # tailed-triangle (center)
+        add_types(v, 11, t_v, non_adjacent('Tij', in_tij, v))                           # chordal-cycle (center)
+        add_types(v, 9, t_v, non_adjacent('Si', in_si, v))                              # tailed-triangle (tri-edge)
+        add_types(v, 9, t_v, non_adjacent('Sj', in_sj, v))
+
+    counts.add_other(attributed)
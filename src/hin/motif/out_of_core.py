@@ -0,0 +1,240 @@
+from typing import Dict, List, Tuple, Union
+import os
+import json
+import shutil
+import warnings
+from contextlib import nullcontext
+import numpy as np
+from ..hin import CSRHIN
+from ..dataset_loader import stream_csr_arrays
+from ..metrics import Metrics
+from .hash import HashMotif
+from .count_dict import CountDict, GlobalCountDict
+from .count_3_4_node_motifs import count_per_edge
+from .stream import decode_counts
+
+
+# default maximum number of adjacency entries that are loaded for a partition
+PARTITION_VOLUME: int = 1 << 23
+
+
+def split_partitions(indptr: np.ndarray, indices: np.ndarray, edges: np.ndarray,
+                     max_volume: int = PARTITION_VOLUME) -> List[Tuple[int, int]]:
+    """
+    Split the edge IDs into contiguous ranges, such that the adjacency of the nodes that are loaded for each range
+    (cf. write_partitions) contains at most max_volume entries. If the first edge of a range exceeds max_volume on
+    its own (e.g. next to a hub), the range is extended as long as it does not exceed the volume of this edge, since
+    the peak memory is bounded by the largest single edge anyway, and the following edges often share its hubs.
+    The end of each range is found by an exponential and a binary search.
+
+    :param indptr: np.ndarray
+        CSR row pointers of the graph
+    :param indices: np.ndarray
+        CSR column indices of the graph
+    :param edges: np.ndarray
+        array of shape (m, 2) with the node IDs of the connected nodes
+    :param max_volume: int
+        maximum number of adjacency entries per range (Default: PARTITION_VOLUME)
+    :return: List[(int, int)]
+        the (start, stop) edge ID ranges
+    """
+    degree = np.diff(indptr)
+
+    def volume(start: int, stop: int) -> int:
+        return int(degree[_core_nodes(indptr, indices, edges[start:stop])].sum())
+
+    ranges = []
+    exceeded = 0
+    start = 0
+    while start < len(edges):
+        limit = max(max_volume, volume(start, start + 1))
+        exceeded += limit > max_volume
+        lo, hi = start + 1, None    # the range [start, lo) fits, [start, hi) does not
+        while hi is None and lo < len(edges):
+            candidate = min(len(edges), start + 2 * (lo - start))
+            if volume(start, candidate) <= limit:
+                lo = candidate
+            else:
+                hi = candidate
+        while hi is not None and hi - lo > 1:
+            mid = (lo + hi) // 2
+            if volume(start, mid) <= limit:
+                lo = mid
+            else:
+                hi = mid
+        ranges.append((start, lo))
+        start = lo
+    if exceeded > 0:
+        warnings.warn(f"{exceeded} of {len(ranges)} partitions exceed the volume {max_volume} with their first edge, "
+                      f"consider a larger volume.")
+    return ranges
+
+
+def write_partitions(path: str, directory: str, max_volume: int = PARTITION_VOLUME,
+                     cache: bool = True) -> List[Tuple[int, int]]:
+    """
+    Partition the edges of a dataset into contiguous edge ID ranges and write each partition to the file
+    'partition_<n>.npz' in the directory. A partition contains exactly the part of the graph that count_per_edge
+    touches for its edges (i, j): the complete adjacency of i, j and of all of their neighbors k (i.e. the nodes in
+    Si, Sj and Tij), whose neighbors r are only needed with their edges to these nodes. The nodes are relabeled in the
+    order of their IDs, so that the counts (and the order of the neighbors) match those of the whole graph.
+    The ranges and node type names are listed in the file 'partitions.json'.
+
+    The dataset is parsed in chunks into memory-mapped arrays (cf. stream_csr_arrays), which are written to the cache
+    of the dataset (or to the directory 'arrays' in the partition directory, which is removed again), so that apart
+    from arrays over the nodes only a chunk of the dataset files or the adjacency of the nodes of a single partition
+    is held in memory at a time.
+
+    :param path: str
+        path to the dataset folder
+    :param directory: str
+        path to the directory of the partition files (created if it does not exist)
+    :param max_volume: int
+        maximum number of adjacency entries per partition (Default: PARTITION_VOLUME)
+    :param cache: bool
+        flag to signal whether the parsed arrays are cached (resp. read from the cache) (Default: True)
+    :return: List[(int, int)]
+        the (start, stop) edge ID ranges of the partitions
+    """
+    array_dir = os.path.join(directory, 'arrays')
+    type_names, arrays = stream_csr_arrays(path, cache=cache, directory=array_dir, chunk_size=max_volume)
+    node_type, edges = arrays['node_type'], arrays['edges']
+    indptr, indices = arrays['indptr'], arrays['indices']
+    degree = np.diff(indptr)
+
+    ranges = split_partitions(indptr, indices, edges, max_volume)
+    os.makedirs(directory, exist_ok=True)
+    for n, (start, stop) in enumerate(ranges):
+        part_edges = np.asarray(edges[start:stop], dtype=np.int64)
+        core = _core_nodes(indptr, indices, part_edges)
+        src = np.repeat(core, degree[core])
+        dst = _neighbors(indptr, indices, core)
+        # edges between two core nodes are kept once only
+        keep = ~(np.isin(dst, core) & (dst < src))
+        src, dst = src[keep], dst[keep]
+        nodes = np.union1d(core, dst)
+
+        local_edges = np.concatenate([np.searchsorted(nodes, part_edges),
+                                      np.stack([np.searchsorted(nodes, src), np.searchsorted(nodes, dst)], axis=1)])
+        np.savez(os.path.join(directory, f'partition_{n}.npz'), start=start, stop=stop,
+                 node_type=np.asarray(node_type[nodes]), edges=local_edges)
+
+    meta = {'type_names': type_names, 'ranges': ranges}
+    with open(os.path.join(directory, 'partitions.json'), 'w') as meta_file:
+        json.dump(meta, meta_file)
+    if not cache:
+        del arrays, node_type, edges, indptr, indices
+        shutil.rmtree(array_dir, ignore_errors=True)
+    return ranges
+
+
+def load_partition(directory: str, n: int, type_names: List[str]) -> Tuple[int, int, CSRHIN]:
+    """ Load a partition written by write_partitions.
+
+    :param directory: str
+        path to the directory of the partition files
+    :param n: int
+        number of the partition
+    :param type_names: List[str]
+        node type names
+    :return: (int, int, CSRHIN)
+        the (start, stop) edge ID range of the partition and its graph, where the edge ID e - start refers to edge e
+    """
+    with np.load(os.path.join(directory, f'partition_{n}.npz')) as data:
+        hin = CSRHIN(data['node_type'], data['edges'], type_names)
+        return int(data['start']), int(data['stop']), hin
+
+
+def _core_nodes(indptr: np.ndarray, indices: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """ Return the (sorted) nodes whose complete adjacency is needed to count the edges, i.e. their end nodes and
+    the neighbors of the end nodes. """
+    ends = np.unique(edges)
+    return np.union1d(ends, _neighbors(indptr, indices, ends))
+
+
+def _neighbors(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """ Return the concatenated neighbors of the nodes, only these parts of (memory-mapped) indices are read. """
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return np.asarray(indices[offsets + np.arange(int(lengths.sum()))], dtype=np.int64)
+
+
+def count_motifs_out_of_core(path: str, output: str, comb: bool = True, int_codes: bool = False,
+                             max_volume: int = PARTITION_VOLUME, partition_dir: str = None, cache: bool = True,
+                             metrics: Metrics = None) -> GlobalCountDict:
+    """
+    Count all 3- and 4-node motifs of a dataset that does not fit into memory. The edges are partitioned into edge ID
+    ranges on disk (cf. write_partitions), and only one partition (the 2-hop neighborhood of its edges) is loaded at
+    a time. The per-edge counts of each partition are streamed to the files 'orbit_counts.json' and
+    'local_counts.json' in the output directory (cf. CountDict.dump_to_json) as soon as the partition is counted,
+    and only the global counts are kept in memory. Hence, the peak memory is bounded by the largest partition (plus
+    the arrays over the nodes that write_partitions needs to parse the dataset in chunks).
+
+    :param path: str
+        path to the dataset folder
+    :param output: str
+        path to the directory where the per-edge counts are written
+    :param comb: bool
+        flag to signal whether to utilize combinatorial relationships (Default: True)
+    :param int_codes: bool
+        flag to signal whether motifs and orbits are encoded by integer codes while counting (Default: False)
+    :param max_volume: int
+        maximum number of adjacency entries per partition (Default: PARTITION_VOLUME)
+    :param partition_dir: str
+        directory of the partition files, which are kept (Default: None, i.e. the folder 'partitions' in the output
+        directory, which is removed once all partitions are counted)
+    :param cache: bool
+        flag to signal whether the parsed arrays of the dataset are cached (resp. read from the cache) (Default: True)
+    :param metrics: Metrics
+        metrics of the run, which time the phases and report the progress per partition (Default: None)
+    :return: GlobalCountDict
+        the (corrected) global motif counts, the per-edge counts are only written to the output directory
+    """
+    directory = partition_dir if partition_dir is not None else os.path.join(output, 'partitions')
+    with metrics.phase('load') if metrics is not None else nullcontext():
+        ranges = write_partitions(path, directory, max_volume=max_volume, cache=cache)
+        with open(os.path.join(directory, 'partitions.json'), 'r') as meta_file:
+            meta = json.load(meta_file)
+    type_names = meta['type_names']
+
+    hf = HashMotif(set(type_names), int_codes=int_codes)
+    total = CountDict(hf)
+    if metrics is not None:
+        metrics.start(ranges[-1][1] if ranges else 0)
+
+    writers = {kind: open(os.path.join(output, f'{kind}_counts.json'), 'w') for kind in ('orbit', 'local')}
+    names: Dict[Union[str, int], str] = {}
+    try:
+        for writer in writers.values():
+            writer.write('{')
+        for n in range(len(ranges)):
+            with metrics.phase('load') if metrics is not None else nullcontext():
+                start, stop, hin = load_partition(directory, n, type_names)
+            partial = CountDict(hf)
+            for e in range(stop - start):
+                count_per_edge(hin, e, partial, hf, comb=comb)
+
+            with metrics.phase('dump') if metrics is not None else nullcontext():
+                for kind, writer in writers.items():
+                    per_edge = getattr(partial, f'{kind}_count')
+                    for e in range(stop - start):
+                        separator = ', ' if start + e > 0 else ''
+                        writer.write(f'{separator}"{start + e}": {json.dumps(decode_counts(per_edge[e], hf, names))}')
+            for h, count in partial.global_count.items():
+                total.global_count[h] = total.global_count.get(h, 0) + count
+            if metrics is not None:
+                metrics.add_edges(stop - start, float(stop - start))
+        for writer in writers.values():
+            writer.write('}')
+    finally:
+        for writer in writers.values():
+            writer.close()
+    if partition_dir is None:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    with metrics.phase('correct') if metrics is not None else nullcontext():
+        total.correct_global_counts()
+    counts = GlobalCountDict(hf, comb=comb)
+    counts.global_count = total.global_count
+    return counts
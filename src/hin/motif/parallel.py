@@ -0,0 +1,190 @@
+from typing import Dict, List, Tuple, Union
+import multiprocessing as mp
+from contextlib import nullcontext
+import numpy as np
+from ..hin import HIN
+from ..metrics import Metrics
+from .hash import HashMotif
+from .count_dict import CountDict, GlobalCountDict, NodeCountDict, ArrayCountDict
+from .count_global_motifs import count_global_per_edge
+from .checkpoint import Checkpoint
+from .engine import make_engine
+
+
+# number of chunks per worker process, more chunks give a better load balance but more transfer overhead
+CHUNKS_PER_WORKER: int = 16
+
+# state of a worker process, which is inherited when forking (or transferred once per worker otherwise)
+_worker_state: Dict[str, object] = {}
+
+
+def estimate_edge_costs(hin: HIN, comb: bool = True) -> np.ndarray:
+    """
+    Estimate the counting cost of each edge (i, j) by the number of nodes visited by count_per_edge, i.e. the
+    neighbors of all neighbors of i and j. Without combinatorial relationships, all pairs of neighbors of i and j
+    are enumerated additionally.
+
+    :param hin: HIN
+        the underlying graph
+    :param comb: bool
+        flag to signal whether combinatorial relationships are used (Default: True)
+    :return: np.ndarray
+        estimated cost for each edge ID
+    """
+    src, dst = hin.edge_array[:, 0], hin.edge_array[:, 1]
+    degree = hin.degrees(np.arange(len(hin.node_type)))
+    # sum of the degrees of all neighbors of each node
+    two_hop = np.bincount(src, weights=degree[dst], minlength=len(degree)) \
+        + np.bincount(dst, weights=degree[src], minlength=len(degree))
+    costs = two_hop[src] + two_hop[dst] + 1
+    if not comb:
+        costs += degree[src] * degree[dst] + degree[src] ** 2 + degree[dst] ** 2
+    return costs
+
+
+def split_edges(costs: np.ndarray, n_chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split the edge IDs into contiguous ranges of roughly equal total cost. An edge whose cost exceeds the cost of a
+    chunk (e.g. an edge between two hubs) forms a range on its own.
+
+    :param costs: np.ndarray
+        estimated cost for each edge ID
+    :param n_chunks: int
+        (maximum) number of ranges
+    :return: List[Tuple[int, int]]
+        list of (start, stop) edge ID ranges
+    """
+    cum_costs = np.cumsum(costs)
+    if len(cum_costs) == 0:
+        return []
+    targets = cum_costs[-1] * np.arange(1, n_chunks) / n_chunks
+    bounds = np.unique(np.concatenate([[0], np.searchsorted(cum_costs, targets, side='right'), [len(costs)]]))
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if start < stop]
+
+
+def _init_worker(hin: HIN, hf: HashMotif, comb: bool, global_only: bool, with_metrics: bool = False,
+                 node_counts: bool = False, storage: str = 'dict', engine: str = 'python', detailed: bool = False):
+    """ Store the graph, the hash function, the counting options and the counting engine in the worker process. """
+    _worker_state['hin'] = hin
+    _worker_state['hf'] = hf
+    _worker_state['comb'] = comb
+    _worker_state['global_only'] = global_only
+    _worker_state['with_metrics'] = with_metrics
+    _worker_state['detailed'] = detailed
+    _worker_state['node_counts'] = node_counts
+    _worker_state['storage'] = storage
+    _worker_state['engine'] = None if global_only else make_engine(engine, hin, hf, comb=comb)
+
+
+def _count_chunk(task: Tuple[int, int, int]) -> Tuple[int, CountDict, Union[Dict[str, object], None]]:
+    """ Count the motifs of all edges in an edge ID range (without correcting the global counts), and collect the
+    metrics of the range (if requested). """
+    chunk, start, stop = task
+    hin, hf, comb = _worker_state['hin'], _worker_state['hf'], _worker_state['comb']
+    if not _worker_state['with_metrics']:
+        return chunk, _count_range(hin, hf, comb, start, stop), None
+    metrics = Metrics(stream=None, detailed=_worker_state['detailed'])
+    with metrics.instrumented(hin):
+        counts = _count_range(hin, hf, comb, start, stop, metrics)
+    return chunk, counts, metrics.to_dict()
+
+
+def _count_range(hin: HIN, hf: HashMotif, comb: bool, start: int, stop: int, metrics: Metrics = None) -> CountDict:
+    """ Count the motifs of all edges in an edge ID range in a worker process. """
+    if _worker_state['global_only']:
+        counts = GlobalCountDict(comb=comb)
+        for e_ij in range(start, stop):
+            count_global_per_edge(hin, e_ij, counts, hf, comb=comb, metrics=metrics)
+    else:
+        if _worker_state['node_counts']:
+            counts = NodeCountDict(len(hin.node_type))
+        else:   # the partial counts of a chunk are never spilled, but pickled compactly as arrays
+            counts = ArrayCountDict() if _worker_state['storage'] == 'array' else CountDict()
+        _worker_state['engine'].count_edges(counts, start, stop, metrics=metrics)
+    return counts
+
+
+def count_motifs_parallel(hin: HIN, workers: int, comb: bool = True, int_codes: bool = False,
+                          global_only: bool = False, checkpoint: Checkpoint = None,
+                          metrics: Metrics = None, node_counts: bool = False, storage: str = 'dict',
+                          memory_limit: int = None, engine: str = 'python') -> CountDict:
+    """
+    Count all 3- and 4-node motifs in an HIN with multiple worker processes.
+
+    The edges are split into contiguous ranges of roughly equal estimated cost, which are handed out to the workers
+    (most expensive first). The graph is inherited by the workers when forking, so that it is never pickled per task
+    (on platforms without fork, it is transferred once per worker). The partial results are merged in the order of
+    the edge IDs, so that the result is identical to a sequential run.
+
+    :param hin: HIN
+        the graph for which all 3- and 4-node motifs are to be counted
+    :param workers: int
+        number of worker processes
+    :param comb: bool
+        flag to signal whether to utilize combinatorial relationships (default: True)
+    :param int_codes: bool
+        flag to signal whether motifs and orbits are encoded by integer codes (default: False)
+    :param global_only: bool
+        flag to signal whether only global motif counts are computed (default: False)
+    :param checkpoint: Checkpoint
+        checkpoints of the run, finished edges are skipped and each newly finished chunk is saved (default: None)
+    :param metrics: Metrics
+        metrics of the run, to which the metrics of the workers are added per chunk (default: None)
+    :param node_counts: bool
+        flag to signal whether node-level orbit counts are computed instead of per-edge counts (default: False)
+    :param storage: str
+        storage backend of the per-edge counts, 'dict' (CountDict) or 'array' (ArrayCountDict) (default: 'dict')
+    :param memory_limit: int
+        number of bytes of the per-edge counts that an ArrayCountDict keeps in memory (default: None, i.e. no limit)
+    :param engine: str
+        per-edge counting engine of the workers, 'python' or 'kernel' (cf. make_engine) (default: 'python')
+    :return: CountDict
+        a CountDict object that contains orbit counts, as well as local and global motif counts
+    """
+
+    hf = HashMotif(hin.node_types, int_codes=int_codes)
+    costs = estimate_edge_costs(hin, comb)
+    chunks = split_edges(costs, workers * CHUNKS_PER_WORKER)
+    # partial counts by the first edge ID of their range
+    partials: Dict[int, Union[CountDict, None]] = {}
+    if metrics is not None:
+        metrics.start(len(hin.edges), costs)
+    if checkpoint is not None:
+        for start, stop, partial in checkpoint.load():
+            partials[start] = partial
+            if metrics is not None:
+                metrics.add_edges(stop - start, float(costs[start:stop].sum()))
+        chunks = [r for start, stop in chunks for r in checkpoint.remaining(start, stop)]
+    chunk_costs = [costs[start:stop].sum() for start, stop in chunks]
+    tasks = sorted(((c, start, stop) for c, (start, stop) in enumerate(chunks)), key=lambda t: -chunk_costs[t[0]])
+
+    if 'fork' in mp.get_all_start_methods():
+        ctx = mp.get_context('fork')
+    else:
+        ctx = mp.get_context()
+
+    initargs = (hin, hf, comb, global_only, metrics is not None, node_counts, storage, engine,
+                metrics is not None and metrics.detailed)
+    with ctx.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        for c, partial, chunk_metrics in pool.imap_unordered(_count_chunk, tasks):
+            partials[chunks[c][0]] = partial
+            if checkpoint is not None:
+                checkpoint.save(*chunks[c], partial)
+            if metrics is not None:
+                metrics.merge(chunk_metrics)
+                metrics.add_edges(chunks[c][1] - chunks[c][0], float(chunk_costs[c]))
+
+    if global_only:
+        counts = GlobalCountDict(hf, comb=comb)
+    elif node_counts:
+        counts = NodeCountDict(len(hin.node_type), hf)
+    elif storage == 'array':
+        counts = ArrayCountDict(hf, memory_limit=memory_limit)
+    else:
+        counts = CountDict(hf)
+    for start in sorted(partials):
+        counts.merge(partials[start])
+        partials[start] = None
+    with metrics.phase('correct') if metrics is not None else nullcontext():
+        counts.correct_global_counts()
+    return counts
@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple, Union
+import numpy as np
+from ..hin import HIN
+from .hash import HashMotif
+from .count_dict import CountDict
+from .count_3_4_node_motifs import count_per_edge
+
+
+# default number of edges whose counts are kept in the cache of a MotifQuery
+QUERY_CACHE_SIZE: int = 10000
+
+
+class MotifQuery:
+
+    def __init__(self, hin: HIN, comb: bool = True, cache_size: int = QUERY_CACHE_SIZE):
+        """
+        Answer queries for the orbit and local motif counts of single edges or of the edges incident to a node on
+        demand, i.e. without counting all edges of the graph first. Each edge is counted with count_per_edge, which
+        only visits the 2-hop neighborhood of the edge, and the counts of the most recently queried edges are kept
+        in an LRU cache.
+
+        The node and edge IDs of the queries and results are the original ones if the graph was relabeled when it was
+        loaded (cf. hin.reorder), like those of the counts of count_motifs. Note that the cache refers to edge IDs,
+        hence it must be cleared (clear_cache) if the graph is modified.
+
+        :param hin: HIN
+            the graph (set-based or CSR)
+        :param comb: bool
+            flag to signal whether to utilize combinatorial relationships (Default: True)
+        :param cache_size: int
+            maximum number of edges whose counts are cached (Default: QUERY_CACHE_SIZE)
+        """
+        self.hin: HIN = hin
+        self.comb: bool = comb
+        self.hf: HashMotif = HashMotif(hin.node_types)
+        self.cache_size: int = cache_size
+        # (orbit counts, local motif counts) by edge ID, in the order of their last use
+        self.cache: OrderedDict[int, Tuple[Dict[str, int], Dict[str, int]]] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        # relabeled edge ID of each original edge ID of a reordered graph, under which the edge is counted
+        self._edge_index: Union[np.ndarray, None] = None
+        if hin.edge_ids is not None:
+            self._edge_index = np.empty(len(hin.edge_ids), dtype=np.int64)
+            self._edge_index[hin.edge_ids] = np.arange(len(hin.edge_ids))
+
+        # edge IDs incident to each node in CSR layout, built on the first node query
+        self._indptr: Union[np.ndarray, None] = None
+        self._incident: Union[np.ndarray, None] = None
+        self._other: Union[np.ndarray, None] = None
+
+    def edge_counts(self, edge_id: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """ Return the orbit counts and the local motif counts of an edge (which must not be modified).
+
+        :param edge_id: int
+            ID of the edge
+        :return: (Dict[str, int], Dict[str, int])
+            orbit counts and local motif counts of the edge, by orbit resp. motif hash
+        """
+        if edge_id in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(edge_id)
+            return self.cache[edge_id]
+
+        self.misses += 1
+        e_ij = int(self._edge_index[edge_id]) if self._edge_index is not None else edge_id
+        counts = CountDict()
+        count_per_edge(self.hin, e_ij, counts, self.hf, comb=self.comb)
+        result = (counts.orbit_count[e_ij], counts.local_count[e_ij])
+        if self.cache_size > 0:
+            self.cache[edge_id] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    def edges(self, edge_ids: Iterable[int]) -> CountDict:
+        """ Return the orbit and local motif counts of the given edges.
+
+        :param edge_ids: Iterable[int]
+            IDs of the edges
+        :return: CountDict
+            a CountDict object that contains the orbit and local motif counts of the edges (but no global counts)
+        """
+        counts = CountDict()
+        for e in edge_ids:
+            counts.orbit_count[e], counts.local_count[e] = self.edge_counts(int(e))
+        return counts
+
+    def node(self, v: int) -> CountDict:
+        """ Return the orbit and local motif counts of all edges incident to a node (i.e. of its ego network).
+
+        :param v: int
+            ID of the node
+        :return: CountDict
+            a CountDict object that contains the orbit and local motif counts of the edges (but no global counts)
+        """
+        return self.edges(self.incident_edges(v))
+
+    def incident_edges(self, v: int) -> np.ndarray:
+        """ Return the IDs of all edges incident to a node. """
+        self._build_index()
+        return self._incident[self._indptr[v]:self._indptr[v + 1]]
+
+    def edge_id(self, i: int, j: int) -> int:
+        """ Return the ID of the edge between node i and node j. """
+        self._build_index()
+        start = self._indptr[i]
+        positions = np.flatnonzero(self._other[start:self._indptr[i + 1]] == j)
+        if len(positions) == 0:
+            raise ValueError(f"Node {i} and node {j} are not connected.")
+        return int(self._incident[start + positions[0]])
+
+    def clear_cache(self):
+        """ Discard all cached counts and the index of the incident edges (e.g. after the graph was modified). """
+        self.cache.clear()
+        self._indptr = self._incident = self._other = None
+
+    def _build_index(self):
+        """ Build the index of the (original) edge IDs incident to each (original) node ID (once). """
+        if self._indptr is not None:
+            return
+        edges = self.hin.edge_array
+        if self.hin.node_ids is not None:
+            edges = self.hin.node_ids[edges]
+        if self.hin.edge_ids is not None:
+            original = np.empty_like(edges)
+            original[self.hin.edge_ids] = edges
+            edges = original
+        n, m = len(self.hin.node_type), len(edges)
+        ends = np.concatenate([edges[:, 0], edges[:, 1]])
+        order = np.argsort(ends, kind='stable')
+        self._indptr = np.concatenate([[0], np.cumsum(np.bincount(ends, minlength=n))])
+        self._incident = np.concatenate([np.arange(m), np.arange(m)])[order]
+        self._other = np.concatenate([edges[:, 1], edges[:, 0]])[order]
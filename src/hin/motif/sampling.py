@@ -0,0 +1,230 @@
+from typing import Dict, Tuple, Union
+import os
+import json
+import time
+import numpy as np
+from ..hin import HIN
+from .hash import HashMotif, MOTIF_EDGES, motif_id
+from .count_dict import CountDict
+from .count_3_4_node_motifs import count_per_edge
+from .parallel import estimate_edge_costs
+
+
+# z-value of the (two-sided) 95% confidence intervals
+Z_95: float = 1.96
+# minimum number of sampled edges a motif has to occur in to be considered by the accuracy budget
+MIN_SUPPORT: int = 30
+# number of edges that are sampled between two evaluations of the budgets
+BATCH_SIZE: int = 1000
+
+
+class SampledCountDict(CountDict):
+
+    def __init__(self, hf: HashMotif = None):
+        """
+        Initialize the count dictionary for global motif counts that are estimated from a sample of edges.
+        Besides the (rounded) estimates in global_count, it maintains their standard errors and 95% confidence
+        intervals. Per-edge counts are not maintained.
+
+        :param hf: HashMotif (optional)
+            hash function that produced integer motif/orbit codes, used to decode them to hash strings at output time
+        """
+        super().__init__(hf)
+        self.std_error: Dict[Union[str, int], float] = {}
+        self.ci_low: Dict[Union[str, int], int] = {}
+        self.ci_high: Dict[Union[str, int], int] = {}
+        self.support: Dict[Union[str, int], int] = {}
+        self.n_samples: int = 0
+        self.n_edges: int = 0
+
+    def _decoded(self, counts: Dict[Union[str, int], float]) -> Dict[str, float]:
+        if self.hf is None or not self.hf.int_codes:
+            return counts
+        return {self.hf.to_hash_str(h): counts[h] for h in counts}
+
+    def dump_to_json(self, directory: str):
+        """ Dump the estimated global counts and their errors into json files at the specified directory.
+
+        Directory will then contain the 2 files 'global_counts.json' (rounded estimates) and
+        'global_count_errors.json' (standard error, 95% confidence interval and number of sampled edges it occurs in
+        per motif, and the sample size).
+
+        :param directory: str
+            path to the directory where files will be stored
+        """
+        json.dump(self._decoded(self.global_count), open(os.path.join(directory, 'global_counts.json'), 'w'))
+        errors = {'n_samples': self.n_samples, 'n_edges': self.n_edges,
+                  'std_error': self._decoded(self.std_error),
+                  'ci_low': self._decoded(self.ci_low),
+                  'ci_high': self._decoded(self.ci_high),
+                  'support': self._decoded(self.support)}
+        json.dump(errors, open(os.path.join(directory, 'global_count_errors.json'), 'w'))
+
+    def correct_global_counts(self):
+        """ Nothing to correct, the estimates already account for the number of edges of each motif. """
+        pass
+
+
+def estimate_motifs(hin: HIN,
+                    fraction: float = 0.1,
+                    method: str = 'uniform',
+                    time_budget: float = None,
+                    rel_error: float = None,
+                    comb: bool = True,
+                    int_codes: bool = False,
+                    seed: int = None) -> SampledCountDict:
+    """
+    Estimate the global 3- and 4-node motif counts of an HIN from the local counts of a random sample of edges.
+
+    With uniform sampling, edges are drawn without replacement and the sum of the local counts over all edges is
+    estimated by the sample mean times the number of edges. With degree-weighted sampling, edges are drawn with
+    replacement with probabilities proportional to the size of their 2-hop neighborhood (cf. estimate_edge_costs),
+    which favors the hub edges that participate in most motifs, and the sum is estimated by the Hansen-Hurwitz
+    estimator. Both estimators are unbiased, their standard errors are derived from the sample variance.
+
+    :param hin: HIN
+        the graph for which all 3- and 4-node motifs are to be counted
+    :param fraction: float
+        maximum number of sampled edges as fraction of all edges (Default: 0.1)
+    :param method: str
+        'uniform' or 'degree' (Default: 'uniform')
+    :param time_budget: float (optional)
+        stop sampling after this number of seconds
+    :param rel_error: float (optional)
+        stop sampling as soon as the 95% confidence interval of each motif that occurs in at least MIN_SUPPORT
+        distinct sampled edges is within +- rel_error times its estimate (and at least one motif does)
+    :param comb: bool
+        flag to signal whether to utilize combinatorial relationships (Default: True)
+    :param int_codes: bool
+        flag to signal whether motifs are encoded by integer codes (Default: False)
+    :param seed: int (optional)
+        seed of the random number generator
+    :return: SampledCountDict
+        estimated global motif counts with their standard errors and confidence intervals
+    """
+
+    n_edges = len(hin.edges)
+    max_samples = max(1, min(n_edges, int(round(fraction * n_edges))))
+    rng = np.random.default_rng(seed)
+    hf = HashMotif(hin.node_types, int_codes=int_codes)
+
+    if method == 'uniform':
+        draws = rng.permutation(n_edges)[:max_samples]
+        probs = None
+    elif method == 'degree':
+        costs = estimate_edge_costs(hin, comb).astype(np.float64)
+        probs = costs / costs.sum()
+        draws = rng.choice(n_edges, size=max_samples, p=probs)
+    else:
+        raise ValueError(f"Invalid sampling method ({method}). Method must be 'uniform' or 'degree'.")
+
+    # sums of the (weighted) local counts and of their squares for each motif
+    sum_y: Dict[Union[str, int], float] = {}
+    sum_y2: Dict[Union[str, int], float] = {}
+    # number of distinct sampled edges each motif occurs in
+    support: Dict[Union[str, int], int] = {}
+    edge_counts: Dict[int, Dict[Union[str, int], int]] = {}     # the same edge may be drawn repeatedly
+
+    scratch = CountDict()
+    start_time = time.perf_counter()
+    n = 0
+    while n < max_samples:
+        for e in draws[n:n + BATCH_SIZE].tolist():
+            first_draw = e not in edge_counts
+            if not first_draw:
+                local = edge_counts[e]
+            else:
+                count_per_edge(hin, e, scratch, hf, comb=comb)
+                local = scratch.local_count.pop(e)
+                del scratch.orbit_count[e]
+                if probs is not None:
+                    edge_counts[e] = local
+            weight = 1.0 if probs is None else 1.0 / (n_edges * probs[e])
+            for h, x in local.items():
+                y = x * weight
+                sum_y[h] = sum_y.get(h, 0.0) + y
+                sum_y2[h] = sum_y2.get(h, 0.0) + y * y
+                if first_draw:
+                    support[h] = support.get(h, 0) + 1
+        n = min(max_samples, n + BATCH_SIZE)
+        scratch.global_count.clear()
+
+        if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+            break
+        if rel_error is not None and n > 1:
+            estimates = _estimate(sum_y, sum_y2, n, n_edges, probs is None)
+            supported = [estimates[h] for h in estimates if support[h] >= MIN_SUPPORT]
+            # without any supported motif, the intervals are not reliable yet
+            if supported and all(Z_95 * se <= rel_error * est for est, se in supported):
+                break
+
+    counts = SampledCountDict(hf)
+    counts.n_samples, counts.n_edges = n, n_edges
+    for h, (est, se) in _estimate(sum_y, sum_y2, n, n_edges, probs is None).items():
+        counts.global_count[h] = int(round(est))
+        counts.std_error[h] = se
+        # counts are integers, so the bounds are rounded outwards (after dropping the rounding errors of the float
+        # sums, which would otherwise widen exact intervals, e.g. of a full sample)
+        counts.ci_low[h] = max(0, int(np.floor(round(est - Z_95 * se, 6))))
+        counts.ci_high[h] = int(np.ceil(round(est + Z_95 * se, 6)))
+        counts.support[h] = support[h]
+    return counts
+
+
+def _estimate(sum_y: Dict[Union[str, int], float],
+              sum_y2: Dict[Union[str, int], float],
+              n: int,
+              n_edges: int,
+              without_replacement: bool) -> Dict[Union[str, int], Tuple[float, float]]:
+    """ Return the estimated global count and its standard error for each motif from the sample sums. """
+    estimates = {}
+    for h in sum_y:
+        mean = sum_y[h] / n
+        var = max(0.0, (sum_y2[h] - n * mean * mean) / (n - 1)) if n > 1 else 0.0
+        var_mean = var / n
+        if without_replacement:     # finite population correction
+            var_mean *= 1 - n / n_edges
+        # the sum over all edges counts each motif once for each of its edges
+        e_m = MOTIF_EDGES[motif_id(h)]
+        estimates[h] = (n_edges * mean / e_m, n_edges * np.sqrt(var_mean) / e_m)
+    return estimates
+
+
+def compare_to_exact(estimate: SampledCountDict, exact: Dict[str, int]) -> Dict[str, float]:
+    """
+    Compare estimated global counts with exactly counted ones (e.g. loaded from 'global_counts.json').
+
+    The confidence intervals assume that the sample mean of the local counts is approximately normal. The local
+    counts of a typed motif are however heavy-tailed (a few edges, e.g. around hubs, take part in most of its
+    instances), and a sample that misses these edges underestimates both the count and its standard error. The
+    coverage is therefore reported for all motifs (motifs that were not sampled at all have the interval [0, 0]),
+    for the motifs found in the sample, and for the motifs found in at least MIN_SUPPORT sampled edges.
+
+    :param estimate: SampledCountDict
+        the estimated counts
+    :param exact: Dict[str, int]
+        exact global counts by motif hash string
+    :return: Dict[str, float]
+        the weighted mean and the median of the relative errors (weighted by the exact counts), the fraction of motifs
+        whose exact count lies within the confidence interval (of all motifs, of the sampled motifs and of the motifs
+        with at least MIN_SUPPORT sampled edges), and the fraction of motifs that were not found
+    """
+    if len(exact) == 0:
+        return {}
+    est = estimate._decoded(estimate.global_count)
+    low, high = estimate._decoded(estimate.ci_low), estimate._decoded(estimate.ci_high)
+    support = estimate._decoded(estimate.support)
+    rel_errors, weights, covered = [], [], {}
+    for h, count in exact.items():
+        rel_errors.append(abs(est.get(h, 0) - count) / count)
+        weights.append(count)
+        covered[h] = low.get(h, 0) <= count <= high.get(h, 0)
+    seen = [h for h in exact if h in est]
+    supported = [h for h in seen if support.get(h, 0) >= MIN_SUPPORT]
+    return {'weighted_rel_error': float(np.average(rel_errors, weights=weights)),
+            'median_rel_error': float(np.median(rel_errors)),
+            'ci_coverage': sum(covered.values()) / len(exact),
+            'ci_coverage_sampled': sum(covered[h] for h in seen) / len(seen) if seen else float('nan'),
+            'ci_coverage_supported': sum(covered[h] for h in supported) / len(supported) if supported
+            else float('nan'),
+            'missing': sum(h not in est for h in exact) / len(exact)}
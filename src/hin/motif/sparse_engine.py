@@ -0,0 +1,425 @@
+from typing import Dict, List, Tuple, Union
+from contextlib import nullcontext
+import numpy as np
+import scipy.sparse as sp
+from ..hin import HIN
+from ..metrics import Metrics
+from .hash import HashMotif
+from .count_dict import CountDict
+
+
+# maximum number of candidates that are checked at once when listing triangles and 4-cliques (resp. the pairs of
+# non-adjacent nodes without combinatorial relationships)
+CHUNK_SIZE: int = 1 << 22
+
+
+def count_motifs_sparse(hin: HIN, hf: HashMotif, comb: bool = True, metrics: Metrics = None) -> CountDict:
+    """
+    Count all 3- and 4-node motifs in an HIN for all edges at once with sparse matrix algebra instead of per-edge
+    Python loops. The result is identical to count_motifs (without correcting the global counts).
+
+    For an edge (i, j), let si, sj and tij be the typed counts of the sets Si, Sj and Tij (cf. count_per_edge). All
+    4-node orbits are counted per ordered pair of node types (t_k, t_r) in matrices of shape (edges, |types|²), and
+    then symmetrized to unordered pairs, as the orbit hashes do not distinguish the positions of the types:
+    - si, sj, tij follow from the typed-degree table and the typed triangle counts of the edges, which are obtained
+      from a list of all triangles (enumerated over a degree ordering, i.e. without the wedges at hubs).
+    - the 4-clique (g12) orbit follows from a list of all 4-cliques, which extend the triangles in the same way.
+    - the chordal cycle edge (g10) and tailed triangle center (g8) orbits follow from the typed degrees and typed
+      triangle counts of the edges (i, k) and (j, k) for all triangles (i, j, k).
+    - the 4-cycle (g6) orbit follows from the typed common neighbors of i and all other nodes (A · A per node i),
+      summed over the neighbors of j.
+    - the tailed triangle tail (g7) and the 4-path edge (g3) orbits follow from the typed triangle counts and the
+      typed 2-hop degrees of i and j, as in derive_path_counts.
+    - g4, g5, g9 and g11 follow from the combinatorial relationships, as in derive_comb_counts, or without comb from
+      the pairs of non-adjacent nodes (k, r) of the respective sets, which are enumerated in chunks (cf.
+      _non_adjacent_pairs) like the count_per_edge enumerates them.
+    All counts are integers throughout. Parallel edges are counted once and their counts are copied to each edge ID.
+
+    :param hin: HIN
+        the graph for which all 3- and 4-node motifs are to be counted (set-based or CSR)
+    :param hf: HashMotif
+        class that can en- and decode motifs to hash strings
+    :param comb: bool
+        flag to signal whether g4, g5, g9 and g11 are derived from combinatorial relationships instead of enumerated
+        (Default: True)
+    :param metrics: Metrics
+        metrics of the run, which time the counting phases (default: None)
+    :return: CountDict
+        a CountDict object that contains orbit counts, as well as local and global motif counts (uncorrected)
+    """
+    n, n_t = len(hin.node_type), len(hin.type_names)
+    all_edges = np.asarray(hin.edge_array, dtype=np.int64).reshape(-1, 2)
+    node_type = np.asarray(hin.node_type, dtype=np.int64)
+    if metrics is not None:
+        metrics.start(len(all_edges))
+    if len(all_edges) == 0:
+        return CountDict(hf)
+
+    with metrics.phase('count_3_node') if metrics is not None else nullcontext():
+        # the matrices have one row per distinct edge (cf. _EdgeIndex)
+        edge_index = _EdgeIndex(all_edges, n)
+        edges = all_edges[edge_index.first]
+        m = len(edges)
+        src, dst = edges[:, 0], edges[:, 1]
+        adj = sp.csr_matrix((np.ones(2 * m, dtype=np.int64), (np.concatenate([src, dst]), np.concatenate([dst, src]))),
+                            shape=(n, n))
+        adj.sort_indices()
+        onehot = _onehot(node_type, n_t)
+        degree = (adj @ onehot).tocsr()     # typed degrees
+        rank = _rank(adj)
+        out, out_keys = _oriented(adj, rank)
+        triangles = _list_triangles(out, out_keys)
+
+        # triangle incidences: edge e = (a, b) with the third node k and the edges (a, k), (b, k)
+        tri_edges = np.column_stack([edge_index.lookup(triangles[:, a], triangles[:, b])
+                                     for a, b in ((0, 1), (0, 2), (1, 2))])
+        inc_edge = tri_edges.ravel()
+        inc_node = triangles[:, [2, 1, 0]].ravel()
+        inc_other = tri_edges[:, [1, 0, 0]].ravel(), tri_edges[:, [2, 2, 1]].ravel()
+        n_inc = len(inc_edge)
+        incidence = sp.csr_matrix((np.ones(n_inc, dtype=np.int64), (inc_edge, np.arange(n_inc))), shape=(m, n_inc))
+
+        tij = incidence @ onehot[inc_node]
+        e_i, e_j = onehot[src], onehot[dst]
+        si = _prune(degree[src] - tij - e_j)
+        sj = _prune(degree[dst] - tij - e_i)
+
+    with metrics.phase('triangle_based') if metrics is not None else nullcontext():
+        # ordered pairs (k, r) of adjacent nodes in Tij, from the 4-cliques
+        cliques = _list_cliques(out, out_keys, triangles)
+        rows, cols = [], []
+        for a, b, c, d in ((0, 1, 2, 3), (0, 2, 1, 3), (0, 3, 1, 2), (1, 2, 0, 3), (1, 3, 0, 2), (2, 3, 0, 1)):
+            e = edge_index.lookup(cliques[:, a], cliques[:, b])
+            t_c, t_d = node_type[cliques[:, c]], node_type[cliques[:, d]]
+            rows += [e, e]
+            cols += [t_c * n_t + t_d, t_d * n_t + t_c]
+        c12 = _coo(np.concatenate(rows), np.concatenate(cols), None, (m, n_t * n_t))
+
+        # typed triangles of the edges (a, k) and (b, k), resp. typed degrees of k, for the nodes k in Tij
+        tri_rows = _outer(onehot[inc_node], tij[inc_other[0]] + tij[inc_other[1]], n_t)
+        tr = incidence @ tri_rows
+        dk = incidence @ _outer(onehot[inc_node], degree[inc_node], n_t)
+        eij = _outer(tij, e_i + e_j, n_t)
+
+    with metrics.phase('path_based') if metrics is not None else nullcontext():
+        # typed 3-paths (j, k, r, i) from j to i over all pairs of adjacent k in N(j) \ {i} and r in N(i) \ {j},
+        # where j is the endpoint of lower rank
+        r6 = _three_paths(adj, rank, onehot, node_type, edge_index, n_t)
+        low = rank[src] < rank[dst]
+        lo, hi = np.where(low, src, dst), np.where(low, dst, src)
+        r6 -= _outer(_prune(degree[lo] - onehot[hi]), onehot[lo], n_t)   # r = j
+
+        # ordered pairs (k, r) of adjacent nodes in the neighborhoods of i resp. j, and 2-hop typed degrees of i, j
+        pair_rows = [triangles[:, 0], triangles[:, 0], triangles[:, 1], triangles[:, 1], triangles[:, 2],
+                     triangles[:, 2]]
+        pair_cols = [(0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0)]
+        node_pairs = _coo(np.concatenate(pair_rows),
+                          np.concatenate([node_type[triangles[:, a]] * n_t + node_type[triangles[:, b]]
+                                          for _, a, b in pair_cols]), None, (n, n_t * n_t))
+        two_hop = adj @ _outer(onehot, degree, n_t)
+
+    with metrics.phase('comb') if metrics is not None else nullcontext():
+        sym = _symmetrizer(n_t)
+
+        def S(x: sp.csr_matrix) -> sp.csr_matrix:
+            return x @ sym
+
+        # the ordered pairs of the same set are counted twice (once per order), so these sums are even
+        g12 = _half(S(c12))
+        g10 = S(tr - eij - 2 * c12)
+        g8 = S(dk - tr + c12)
+        g6 = S(r6 - tr + eij + c12)
+        g7 = _half(S(node_pairs[src] + node_pairs[dst]) - 2 * S(tr) + 2 * S(c12))
+        paths = two_hop[src] + two_hop[dst] - 2 * dk - _outer(e_j, degree[dst], n_t) - _outer(e_i, degree[src], n_t)
+        g3 = S(paths - _outer(si, e_i, n_t) - _outer(sj, e_j, n_t)) - 2 * g7 - 2 * g6 - g10
+        if comb:
+            g9 = S(_outer(tij, si + sj, n_t)) - g10
+            g11 = _half(S(_outer(tij, tij, n_t)) - _diag(tij, n_t) - S(c12))
+            g4 = S(_outer(si, sj, n_t)) - g6
+            g5 = _half(S(_outer(si, si, n_t) + _outer(sj, sj, n_t)) - _diag(si + sj, n_t)) - g7
+
+    if not comb:
+        with metrics.phase('path_based') if metrics is not None else nullcontext():
+            # sorted keys u * n + v of the adjacency, and the members of Si, Sj and Tij of all edges
+            keys = np.repeat(np.arange(n), np.diff(adj.indptr)) * n + adj.indices
+            si_members, sj_members, tij_members = _members(adj, keys, src, dst)
+            g4 = S(_non_adjacent_pairs(keys, node_type, si_members, sj_members, n_t))
+            g5 = S(_non_adjacent_pairs(keys, node_type, si_members, si_members, n_t)
+                   + _non_adjacent_pairs(keys, node_type, sj_members, sj_members, n_t))
+        with metrics.phase('triangle_based') if metrics is not None else nullcontext():
+            g9 = S(_non_adjacent_pairs(keys, node_type, tij_members, si_members, n_t)
+                   + _non_adjacent_pairs(keys, node_type, tij_members, sj_members, n_t))
+            g11 = S(_non_adjacent_pairs(keys, node_type, tij_members, tij_members, n_t))
+
+    with metrics.phase('comb') if metrics is not None else nullcontext():
+        orbits = {1: si + sj, 2: tij, 3: g3, 4: g4, 5: g5, 6: g6, 7: g7, 8: g8, 9: g9, 10: g10, 11: g11, 12: g12}
+        # parallel edges get the counts of their distinct edge
+        orbits = {g: sp.csr_matrix(x)[edge_index.inverse] for g, x in orbits.items()}
+        counts = _to_count_dict(hin, hf, orbits, node_type[all_edges[:, 0]], node_type[all_edges[:, 1]],
+                                len(all_edges), n_t)
+
+    if metrics is not None:
+        metrics.add_edges(len(all_edges), float(len(all_edges)))
+    return counts
+
+
+class _EdgeIndex:
+
+    def __init__(self, edges: np.ndarray, n: int):
+        """ Lookup of the distinct edges by their (unordered) node IDs, where parallel edges (with the same pair of
+        nodes) are one distinct edge. The distinct edges are numbered in the order of their keys, first holds the
+        edge ID of the first edge of each distinct edge and inverse the distinct edge of each edge ID. """
+        self.n: int = n
+        keys = np.minimum(edges[:, 0], edges[:, 1]) * n + np.maximum(edges[:, 0], edges[:, 1])
+        self.keys, self.first, self.inverse = np.unique(keys, return_index=True, return_inverse=True)
+        self.inverse = self.inverse.reshape(-1)
+
+    def lookup(self, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        """ Return the distinct edges of the (existing) edges between the nodes u and v. """
+        keys = np.minimum(u, v) * self.n + np.maximum(u, v)
+        return np.searchsorted(self.keys, keys)
+
+
+def _onehot(types: np.ndarray, n_t: int) -> sp.csr_matrix:
+    """ Return a sparse matrix of shape (len(types), n_t) with a one in the column of each type. """
+    return sp.csr_matrix((np.ones(len(types), dtype=np.int64), (np.arange(len(types)), types)),
+                         shape=(len(types), n_t))
+
+
+def _coo(rows: np.ndarray, cols: np.ndarray, values: Union[np.ndarray, None], shape: Tuple[int, int]) -> sp.csr_matrix:
+    """ Return a CSR matrix with the (summed) values at the given positions (ones if values is None). """
+    if values is None:
+        values = np.ones(len(rows), dtype=np.int64)
+    return sp.csr_matrix((values, (rows, cols)), shape=shape)
+
+
+def _prune(x: sp.csr_matrix) -> sp.csr_matrix:
+    """ Drop explicit zeros of a sparse matrix. """
+    x.eliminate_zeros()
+    return x
+
+
+def _outer(u: sp.csr_matrix, v: sp.csr_matrix, n_t: int) -> sp.csr_matrix:
+    """ Return the row-wise outer products of u and v (of shape (rows, n_t)), where column a * n_t + b holds
+    u[:, a] * v[:, b]. """
+    eye = sp.identity(n_t, dtype=np.int64, format='csr')
+    ones = sp.csr_matrix(np.ones((1, n_t), dtype=np.int64))
+    return _prune(sp.csr_matrix((u @ sp.kron(eye, ones, format='csr')).multiply(v @ sp.kron(ones, eye, format='csr'))))
+
+
+def _half(x: sp.csr_matrix) -> sp.csr_matrix:
+    """ Return the (integer) half of a sparse matrix with even entries. """
+    x = sp.csr_matrix(x)
+    x.data //= 2
+    return x
+
+
+def _diag(x: sp.csr_matrix, n_t: int) -> sp.csr_matrix:
+    """ Return the matrix of shape (rows, n_t²) with x[:, a] in the column of the pair (a, a). """
+    return x @ _coo(np.arange(n_t), np.arange(n_t) * (n_t + 1), None, (n_t, n_t * n_t))
+
+
+def _symmetrizer(n_t: int) -> sp.csr_matrix:
+    """ Return the matrix that adds the column of the ordered pair (a, b) to the column of the unordered pair
+    (min(a, b), max(a, b)). """
+    a, b = np.divmod(np.arange(n_t * n_t), n_t)
+    return _coo(np.arange(n_t * n_t), np.minimum(a, b) * n_t + np.maximum(a, b), None, (n_t * n_t, n_t * n_t))
+
+
+def _expand(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Return the position in nodes and the neighbor for all neighbors of the given nodes (in CSR layout). """
+    sizes = indptr[nodes + 1] - indptr[nodes]
+    owner = np.repeat(np.arange(len(nodes)), sizes)
+    offsets = np.arange(len(owner)) - np.repeat(np.cumsum(sizes) - sizes, sizes) + np.repeat(indptr[nodes], sizes)
+    return owner, indices[offsets]
+
+
+def _chunks(sizes: np.ndarray) -> List[Tuple[int, int]]:
+    """ Split a sequence into contiguous ranges whose total size is at most CHUNK_SIZE (or a single element). """
+    if len(sizes) == 0:
+        return []
+    cum = np.cumsum(sizes)
+    bounds = np.searchsorted(cum, np.arange(1, cum[-1] // CHUNK_SIZE + 1) * CHUNK_SIZE, side='right')
+    bounds = np.unique(np.concatenate([[0], bounds, [len(sizes)]]))
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def _rank(adj: sp.csr_matrix) -> np.ndarray:
+    """ Return the rank of each node when ordered by degree and ID. """
+    n = adj.shape[0]
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), np.diff(adj.indptr)))] = np.arange(n)
+    return rank
+
+
+def _oriented(adj: sp.csr_matrix, rank: np.ndarray) -> Tuple[sp.csr_matrix, np.ndarray]:
+    """ Return the adjacency oriented from lower to higher rank (with sorted indices), and the sorted keys
+    u * n + v of its edges (u, v). """
+    n = adj.shape[0]
+    coo = adj.tocoo()
+    keep = rank[coo.row] < rank[coo.col]
+    out = sp.csr_matrix((coo.data[keep], (coo.row[keep], coo.col[keep])), shape=(n, n))
+    out.sort_indices()
+    rows = np.repeat(np.arange(n), np.diff(out.indptr))
+    return out, rows * n + out.indices
+
+
+def _contains(keys: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """ Return whether each query key is contained in the sorted keys. """
+    pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    return keys[pos] == query if len(keys) > 0 else np.zeros(len(query), dtype=bool)
+
+
+def _list_triangles(out: sp.csr_matrix, keys: np.ndarray) -> np.ndarray:
+    """ Return all triangles as an array of shape (triangles, 3), each once. For every oriented edge (u, v), the
+    out-neighbors w of v are checked for (u, w), such that no wedges at the center of hubs are enumerated. """
+    n = out.shape[0]
+    u_all = np.repeat(np.arange(n), np.diff(out.indptr))
+    v_all = out.indices.astype(np.int64)
+    found = []
+    for start, stop in _chunks(np.diff(out.indptr)[v_all]):
+        u, v = u_all[start:stop], v_all[start:stop]
+        owner, w = _expand(out.indptr, out.indices.astype(np.int64), v)
+        hit = _contains(keys, u[owner] * n + w)
+        found.append(np.column_stack([u[owner][hit], v[owner][hit], w[hit]]))
+    return np.concatenate(found) if found else np.zeros((0, 3), dtype=np.int64)
+
+
+def _list_cliques(out: sp.csr_matrix, keys: np.ndarray, triangles: np.ndarray) -> np.ndarray:
+    """ Return all 4-cliques as an array of shape (cliques, 4), each once, by extending each (oriented) triangle
+    (u, v, w) with the out-neighbors x of w that are adjacent to u and v. """
+    n = out.shape[0]
+    found = []
+    for start, stop in _chunks(np.diff(out.indptr)[triangles[:, 2]]):
+        tri = triangles[start:stop]
+        owner, x = _expand(out.indptr, out.indices.astype(np.int64), tri[:, 2])
+        hit = _contains(keys, tri[owner, 0] * n + x) & _contains(keys, tri[owner, 1] * n + x)
+        found.append(np.column_stack([tri[owner][hit], x[hit]]))
+    return np.concatenate(found) if found else np.zeros((0, 4), dtype=np.int64)
+
+
+def _three_paths(adj: sp.csr_matrix, rank: np.ndarray, onehot: sp.csr_matrix, node_type: np.ndarray,
+                 edge_index: _EdgeIndex, n_t: int) -> sp.csr_matrix:
+    """
+    Return the typed 3-paths (j, k, r, i) of all edges (i, j), i.e. the number of pairs of adjacent nodes
+    k in N(j) \\ {i} and r in N(i) for each ordered pair of types (t_k, t_r), where j is the endpoint of lower rank.
+
+    For each node i, the typed common neighbors of i and all nodes k are computed as A[:, N(i)] · onehot(N(i)), and
+    summed over the neighbors k of each (lower rank) neighbor j of i.
+    """
+    n = adj.shape[0]
+    rows, cols, values = [], [], []
+    for i in np.flatnonzero(np.diff(adj.indptr)).tolist():
+        nbrs = adj.indices[adj.indptr[i]:adj.indptr[i + 1]]
+        lower = nbrs[rank[nbrs] < rank[i]]
+        if len(lower) == 0:
+            continue
+        common = (adj[nbrs].T @ onehot[nbrs]).tocoo()     # typed common neighbors of i and k (for all k)
+        keep = common.row != i
+        k, t_r, count = common.row[keep], common.col[keep], common.data[keep]
+        shared = sp.csr_matrix((count, (k, node_type[k] * n_t + t_r)), shape=(n, n_t * n_t))
+        paths = (adj[lower] @ shared).tocoo()
+        rows.append(edge_index.lookup(np.full(len(lower), i), lower)[paths.row])
+        cols.append(paths.col)
+        values.append(paths.data)
+    if len(rows) == 0:
+        return sp.csr_matrix((len(edge_index.keys), n_t * n_t), dtype=np.int64)
+    return _coo(np.concatenate(rows), np.concatenate(cols), np.concatenate(values),
+                (len(edge_index.keys), n_t * n_t))
+
+
+def _members(adj: sp.csr_matrix, keys: np.ndarray, src: np.ndarray,
+             dst: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """ Return the members of the sets Si, Sj and Tij of all edges (i, j) = (src, dst), each as the arrays indptr,
+    edge and node in CSR layout over the edges (the members of the n-th edge are node[indptr[n]:indptr[n + 1]]). The
+    members of all edges are held at once, i.e. the sum of the squared degrees of the nodes. """
+    n, m = adj.shape[0], len(src)
+    indices = adj.indices.astype(np.int64)
+    owner_i, k_i = _expand(adj.indptr, indices, src)
+    owner_j, k_j = _expand(adj.indptr, indices, dst)
+    in_tij = _contains(keys, k_i * n + dst[owner_i])
+    in_si = ~in_tij & (k_i != dst[owner_i])
+    in_sj = ~_contains(keys, k_j * n + src[owner_j]) & (k_j != src[owner_j])
+    sets = []
+    for owner, k, keep in ((owner_i, k_i, in_si), (owner_j, k_j, in_sj), (owner_i, k_i, in_tij)):
+        indptr = np.zeros(m + 1, dtype=np.int64)
+        np.cumsum(np.bincount(owner[keep], minlength=m), out=indptr[1:])
+        sets.append((indptr, owner[keep], k[keep]))
+    return sets
+
+
+def _non_adjacent_pairs(keys: np.ndarray, node_type: np.ndarray, a: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                        b: Tuple[np.ndarray, np.ndarray, np.ndarray], n_t: int) -> sp.csr_matrix:
+    """ Return the number of pairs of non-adjacent nodes k in the set a and r in the set b of all edges (cf. _members)
+    per ordered pair of types (t_k, t_r), each unordered pair once if a and b are the same set. The pairs are
+    enumerated in chunks of at most CHUNK_SIZE candidates. """
+    n = len(node_type)
+    (_, edge_a, node_a), (indptr_b, _, node_b) = a, b
+    m = len(indptr_b) - 1
+    result = sp.csr_matrix((m, n_t * n_t), dtype=np.int64)
+    for start, stop in _chunks(np.diff(indptr_b)[edge_a]):
+        owner, r = _expand(indptr_b, node_b, edge_a[start:stop])
+        k = node_a[start:stop][owner]
+        keep = ~_contains(keys, k * n + r)
+        if a is b:
+            keep &= k < r
+        e, k, r = edge_a[start:stop][owner][keep], k[keep], r[keep]
+        result = result + _coo(e, node_type[k] * n_t + node_type[r], None, (m, n_t * n_t))
+    return result
+
+
+def _to_count_dict(hin: HIN, hf: HashMotif, orbits: Dict[int, sp.csr_matrix], t_src: np.ndarray,
+                   t_dst: np.ndarray, m: int, n_t: int) -> CountDict:
+    """ Convert the orbit counts of all edges (per type, resp. unordered pair of types) into a CountDict. """
+    edge_ids, combos, counts = [], [], []
+    for g, x in orbits.items():
+        x = sp.csr_matrix(x).tocoo()
+        x.sum_duplicates()
+        keep = x.data > 0
+        e, col, value = x.row[keep].astype(np.int64), x.col[keep].astype(np.int64), x.data[keep]
+        if g <= 2:  # 3-node orbits have a single type, the missing 4th type is encoded by n_t
+            a, b = col, np.full(len(col), n_t)
+        else:
+            a, b = np.divmod(col, n_t)
+        # (orbit, type of i, type of j, t1, t2)
+        combos.append((((g * n_t + t_src[e]) * n_t + t_dst[e]) * (n_t + 1) + a) * (n_t + 1) + b)
+        edge_ids.append(e)
+        counts.append(value.astype(np.int64))
+    edge_ids, combos, counts = np.concatenate(edge_ids), np.concatenate(combos), np.concatenate(counts)
+
+    names = list(hin.type_names) + ['--']
+    unique, inverse = np.unique(combos, return_inverse=True)
+    motif_of, orbit_hashes, motif_hashes = [], [], {}
+    for combo in unique.tolist():
+        rest, b = divmod(combo, n_t + 1)
+        rest, a = divmod(rest, n_t + 1)
+        rest, t_j = divmod(rest, n_t)
+        g, t_i = divmod(rest, n_t)
+        mh, oh = hf.hash_motif(g, names[t_i], names[t_j], names[a], names[b])
+        orbit_hashes.append(oh)
+        motif_of.append(motif_hashes.setdefault(mh, len(motif_hashes)))
+    motif_of = np.array(motif_of, dtype=np.int64)[inverse]
+    orbit_hashes = np.array(orbit_hashes, dtype=object)[inverse]
+    motif_list = list(motif_hashes)
+
+    result = CountDict(hf)
+    order = np.argsort(edge_ids, kind='stable')
+    bounds = np.searchsorted(edge_ids[order], np.arange(m + 1))
+    keys, values = orbit_hashes[order].tolist(), counts[order].tolist()
+    for e in range(m):
+        result.orbit_count[e] = dict(zip(keys[bounds[e]:bounds[e + 1]], values[bounds[e]:bounds[e + 1]]))
+
+    # local motif counts sum the orbits of the same motif (and types) per edge
+    local = np.unique(edge_ids * len(motif_list) + motif_of, return_inverse=True)
+    local_counts = np.zeros(len(local[0]), dtype=np.int64)
+    np.add.at(local_counts, local[1], counts)
+    local_edges, local_motifs = np.divmod(local[0], len(motif_list))
+    bounds = np.searchsorted(local_edges, np.arange(m + 1))
+    keys, values = [motif_list[h] for h in local_motifs.tolist()], local_counts.tolist()
+    for e in range(m):
+        result.local_count[e] = dict(zip(keys[bounds[e]:bounds[e + 1]], values[bounds[e]:bounds[e + 1]]))
+
+    global_counts = np.zeros(len(motif_list), dtype=np.int64)
+    np.add.at(global_counts, local_motifs, local_counts)
+    result.global_count = dict(zip(motif_list, global_counts.tolist()))
+    return result
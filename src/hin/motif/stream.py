@@ -0,0 +1,190 @@
+from typing import Dict, Iterator, List, Tuple, Union
+import os
+import json
+import queue
+import threading
+from contextlib import nullcontext
+from ..hin import HIN
+from ..metrics import Metrics
+from .hash import HashMotif
+from .count_dict import GlobalCountDict, StreamCountDict
+from .engine import Engine, make_engine
+
+
+# default number of edges per batch that is handed to the writer thread
+STREAM_BATCH_SIZE: int = 1000
+# default maximum number of batches that wait for the writer thread, before the counting waits for the writer
+WRITE_QUEUE_SIZE: int = 8
+
+EdgeCounts = Tuple[int, Dict[Union[str, int], int], Dict[Union[str, int], int]]
+
+
+class MotifStream:
+
+    def __init__(self, hin: HIN, comb: bool = True, int_codes: bool = False, batch_size: int = None,
+                 engine: str = 'python', metrics: Metrics = None):
+        """
+        Count all 3- and 4-node motifs in an HIN edge by edge, and yield the orbit and local motif counts of each
+        edge as soon as it is counted (in the order of the edge IDs, but under the original edge IDs of a relabeled
+        graph, cf. hin.reorder), instead of keeping them until all edges are counted. Only the global motif counts
+        are accumulated (in counts), which are corrected once the stream is exhausted. Hence, the memory does not
+        grow with the number of edges (unless the consumer keeps the counts).
+
+        Usage:
+            stream = MotifStream(hin)
+            for edge_id, orbit_counts, local_counts in stream:
+                ...
+            stream.counts.global_count
+
+        :param hin: HIN
+            the graph for which all 3- and 4-node motifs are to be counted
+        :param comb: bool
+            flag to signal whether to utilize combinatorial relationships (Default: True)
+        :param int_codes: bool
+            flag to signal whether motifs and orbits are encoded by integer codes instead of hash strings
+            (Default: False)
+        :param batch_size: int
+            number of edges per batch, if given, lists of (edge ID, orbit counts, local motif counts) are yielded
+            instead of single edges (Default: None)
+        :param engine: str
+            per-edge counting engine, cf. engine.make_engine (Default: 'python')
+        :param metrics: Metrics
+            metrics of the run, which time the counting phases and report the progress (Default: None)
+        """
+        self.hin: HIN = hin
+        self.comb: bool = comb
+        self.batch_size: Union[int, None] = batch_size
+        self.metrics: Metrics = metrics
+        self.hf: HashMotif = HashMotif(hin.node_types, int_codes=int_codes)
+        self.counts: StreamCountDict = StreamCountDict(self.hf)
+        self.engine: Engine = make_engine(engine, hin, self.hf, comb=comb)
+
+    def __iter__(self) -> Iterator[Union[EdgeCounts, List[EdgeCounts]]]:
+        # imported here, as it depends on the counting module
+        from .parallel import estimate_edge_costs
+
+        hin, metrics = self.hin, self.metrics
+        if metrics is not None:
+            metrics.start(len(hin.edges), estimate_edge_costs(hin, self.comb))
+        # original edge IDs of a relabeled graph (cf. hin.reorder), under which the counts are yielded
+        edge_ids = hin.edge_ids.tolist() if hin.edge_ids is not None else None
+        batch: List[EdgeCounts] = []
+        # the engine counts a batch of edges at a time (resp. single edges without batches)
+        step = self.batch_size or 1
+        with metrics.instrumented(hin) if metrics is not None else nullcontext():
+            for start in range(0, len(hin.edges), step):
+                self.engine.count_edges(self.counts, start, min(start + step, len(hin.edges)), metrics=metrics)
+                finished = self.counts.finished
+                if edge_ids is not None:
+                    finished = [(edge_ids[e], orbit_count, local_count) for e, orbit_count, local_count in finished]
+                if self.batch_size is None:
+                    yield from finished
+                else:
+                    batch.extend(finished)
+                    if len(batch) >= self.batch_size:
+                        yield batch
+                        batch = []
+                self.counts.finished.clear()
+        if batch:
+            yield batch
+
+        with metrics.phase('correct') if metrics is not None else nullcontext():
+            self.counts.correct_global_counts()
+
+
+def count_motifs_streamed(hin: HIN, directory: str, comb: bool = True, int_codes: bool = False,
+                          batch_size: int = STREAM_BATCH_SIZE, queue_size: int = WRITE_QUEUE_SIZE,
+                          engine: str = 'python', metrics: Metrics = None) -> GlobalCountDict:
+    """
+    Count all 3- and 4-node motifs in an HIN with a MotifStream, while a background thread writes the per-edge
+    counts of the finished batches of edges to the files 'orbit_counts.json' and 'local_counts.json' in the
+    directory (which are identical to those of CountDict.dump_to_json, except for a relabeled graph, cf. hin.reorder:
+    its keys are the original edge IDs, but in the order in which the edges were counted, so the files have the same
+    content as JSON objects, but not the same bytes). If the writer falls behind by queue_size batches, the counting
+    waits for it, so that the memory is bounded by the batches in the queue.
+
+    :param hin: HIN
+        the graph for which all 3- and 4-node motifs are to be counted
+    :param directory: str
+        path to the directory where the per-edge counts are written
+    :param comb: bool
+        flag to signal whether to utilize combinatorial relationships (Default: True)
+    :param int_codes: bool
+        flag to signal whether motifs and orbits are encoded by integer codes while counting (Default: False)
+    :param batch_size: int
+        number of edges per batch (Default: STREAM_BATCH_SIZE)
+    :param queue_size: int
+        maximum number of batches that wait for the writer (Default: WRITE_QUEUE_SIZE)
+    :param engine: str
+        per-edge counting engine, cf. engine.make_engine (Default: 'python')
+    :param metrics: Metrics
+        metrics of the run (Default: None)
+    :return: GlobalCountDict
+        the (corrected) global motif counts, the per-edge counts are only written to the directory
+    """
+    stream = MotifStream(hin, comb=comb, int_codes=int_codes, batch_size=batch_size, engine=engine,
+                         metrics=metrics)
+    batches: queue.Queue = queue.Queue(maxsize=queue_size)
+    errors: List[BaseException] = []
+    writer = threading.Thread(target=_write_batches, args=(batches, directory, stream.hf, errors), daemon=True)
+    writer.start()
+    try:
+        for batch in stream:
+            if errors:
+                break
+            batches.put(batch)
+    finally:
+        batches.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+
+    counts = GlobalCountDict(stream.hf, comb=comb)
+    counts.global_count = stream.counts.global_count
+    return counts
+
+
+def _write_batches(batches: queue.Queue, directory: str, hf: HashMotif, errors: List[BaseException]):
+    """ Write the per-edge counts of the batches in the queue until None is taken. If writing fails, the error is
+    recorded and the remaining batches are discarded, so that the counting never waits for the writer forever. """
+    names: Dict[int, str] = {}
+    try:
+        with open(os.path.join(directory, 'orbit_counts.json'), 'w') as orbit_file, \
+                open(os.path.join(directory, 'local_counts.json'), 'w') as local_file:
+            orbit_file.write('{')
+            local_file.write('{')
+            separator = ''
+            for batch in iter(batches.get, None):
+                for counts_file, kind in ((orbit_file, 1), (local_file, 2)):
+                    chunk = ', '.join(f'"{edge[0]}": {json.dumps(decode_counts(edge[kind], hf, names))}'
+                                      for edge in batch)
+                    counts_file.write(separator + chunk)
+                separator = ', '
+            orbit_file.write('}')
+            local_file.write('}')
+    except BaseException as error:
+        errors.append(error)
+        while batches.get() is not None:
+            pass
+
+
+def decode_counts(counts: Dict[Union[str, int], int], hf: HashMotif, names: Dict[int, str]) -> Dict[str, int]:
+    """ Decode the integer codes of counts to hash strings (if the hash function produces integer codes).
+
+    :param counts: Dict[str or int, int]
+        counts by hash string (resp. integer code)
+    :param hf: HashMotif
+        hash function that produced the counts
+    :param names: Dict[int, str]
+        cache of already decoded hash strings by code
+    :return: Dict[str, int]
+        counts by hash string
+    """
+    if not hf.int_codes:
+        return counts
+    decoded = {}
+    for code, count in counts.items():
+        if code not in names:
+            names[code] = hf.to_hash_str(code)
+        decoded[names[code]] = count
+    return decoded
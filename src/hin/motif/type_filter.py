@@ -0,0 +1,126 @@
+from typing import Dict, Iterable, Tuple, Union
+import numpy as np
+from ..hin import HIN, CSRHIN
+from .hash import HashMotif, motif_id, ORBIT_TO_MOTIF
+from .count_dict import CountDict, NodeCountDict
+
+
+def allowed_types(hin: HIN, types: Iterable[str] = None, motifs: Iterable[str] = None) -> np.ndarray:
+    """
+    Return the integer node types that may occur in the counted motifs, i.e. the given node types and/or the node
+    types of the given motifs (the intersection, if both are given).
+
+    :param hin: HIN
+        the underlying graph
+    :param types: Iterable[str]
+        node type names (Default: None, i.e. all node types)
+    :param motifs: Iterable[str]
+        motif hashes (Default: None, i.e. all motifs)
+    :return: np.ndarray
+        boolean array of shape (|types|,) that marks the allowed integer node types
+    """
+    type_ids = {t: k for k, t in enumerate(hin.type_names)}
+    allowed = np.ones(len(hin.type_names), dtype=bool)
+    if types is not None:
+        unknown = set(types) - set(type_ids)
+        if unknown:
+            raise ValueError(f"Unknown node types: {', '.join(sorted(unknown))}")
+        allowed[:] = False
+        allowed[[type_ids[t] for t in types]] = True
+    if motifs is not None:
+        hf = HashMotif(hin.node_types)
+        in_motifs = np.zeros(len(hin.type_names), dtype=bool)
+        unknown = set()
+        for h in motifs:
+            types = motif_types(hf, h)
+            if types is None:
+                unknown.add(str(h))
+                continue
+            in_motifs[[type_ids[t] for t in types if t != '--']] = True
+        if unknown:
+            raise ValueError(f"Unknown motif hashes: {', '.join(sorted(unknown))}")
+        allowed &= in_motifs
+    return allowed
+
+
+def motif_types(hf: HashMotif, h: str) -> Union[Tuple[str, str, str, str], None]:
+    """ Return the node types of a motif hash string, or None if it is not the (canonical) hash of a motif of the node
+    types of the hash function, e.g. an orbit hash or a malformed string. """
+    if not isinstance(h, str):
+        return None
+    try:
+        g, *types = hf.decode(h)
+    except (KeyError, ValueError):
+        return None
+    if g not in ORBIT_TO_MOTIF[1:] or '--' in types[:3] or (types[3] == '--') != (g <= 2):
+        return None
+    # the hash of the motif with the first of its orbits and the decoded node types
+    if hf.hash_motif(ORBIT_TO_MOTIF.index(g), *types)[0] != h:
+        return None
+    return tuple(types)
+
+
+def type_subgraph(hin: HIN, allowed: np.ndarray) -> Tuple[CSRHIN, np.ndarray]:
+    """
+    Return the subgraph of the edges between nodes of the allowed node types (as CSRHIN). The node IDs are kept (the
+    nodes of the other types are isolated), the edges are numbered in the order of their original IDs. Hence, counting
+    the subgraph counts exactly the motif instances of the graph whose nodes all have allowed types, but only visits
+    the relevant part of the graph, e.g. the combinatorial relationships only evaluate the allowed type pairs.
+
+    :param hin: HIN
+        the underlying graph (set-based or CSR)
+    :param allowed: np.ndarray
+        boolean array of shape (|types|,) that marks the allowed integer node types
+    :return: (CSRHIN, np.ndarray)
+        the subgraph and the original edge ID of each of its edges
+    """
+    edges = hin.edge_array
+    edge_ids = np.flatnonzero(allowed[hin.node_type[edges[:, 0]]] & allowed[hin.node_type[edges[:, 1]]])
+    edge_type = hin.edge_type[edge_ids] if hin.edge_type is not None else None
+    sub = CSRHIN(hin.node_type, edges[edge_ids], hin.type_names, edge_type=edge_type)
+    return sub, edge_ids
+
+
+def restrict_counts(counts: CountDict, edge_ids: np.ndarray, motifs: Iterable[str] = None) -> CountDict:
+    """
+    Map the edge IDs of the counts of a subgraph (cf. type_subgraph) to the original edge IDs, and drop all counts of
+    motifs that are not among the given ones (as well as the orbit counts of their orbits).
+
+    :param counts: CountDict
+        counts of the subgraph, must provide the hash function that produced them (counts.hf)
+    :param edge_ids: np.ndarray
+        original edge ID of each edge of the subgraph
+    :param motifs: Iterable[str]
+        motif hashes to keep (Default: None, i.e. all motifs)
+    :return: CountDict
+        the counts (modified in place)
+    """
+    original = edge_ids.tolist()
+    counts.orbit_count = {original[e]: c for e, c in counts.orbit_count.items()}
+    counts.local_count = {original[e]: c for e, c in counts.local_count.items()}
+    if motifs is None:
+        return counts
+
+    hf = counts.hf
+    targets = {hf.from_hash_str(h) if hf.int_codes else h for h in motifs}
+    # motif of each orbit hash (resp. integer code)
+    orbit_motif: Dict[Union[str, int], Union[str, int]] = {}
+
+    def keep_orbit(h: Union[str, int]) -> bool:
+        if h not in orbit_motif:
+            orbit_motif[h] = hf.hash_motif(motif_id(h), *hf.decode(h)[1:])[0]
+        return orbit_motif[h] in targets
+
+    for per_edge in counts.orbit_count.values():
+        for h in [h for h in per_edge if not keep_orbit(h)]:
+            del per_edge[h]
+    for per_edge in counts.local_count.values():
+        for h in [h for h in per_edge if h not in targets]:
+            del per_edge[h]
+    counts.global_count = {h: c for h, c in counts.global_count.items() if h in targets}
+    if isinstance(counts, NodeCountDict):
+        keep = [c for c, h in enumerate(counts.orbits) if keep_orbit(h)]
+        counts.node_count = counts.node_count[:, :, keep]
+        counts.orbits = [counts.orbits[c] for c in keep]
+        counts.columns = {h: c for c, h in enumerate(counts.orbits)}
+    return counts
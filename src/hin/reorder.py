@@ -0,0 +1,89 @@
+from typing import Tuple
+import numpy as np
+
+
+# node orderings of reorder_arrays: by descending degree, breadth-first from the hubs, or reverse Cuthill-McKee
+ORDERS: Tuple[str, ...] = ('degree', 'bfs', 'rcm')
+
+
+def node_order(edges: np.ndarray, n: int, method: str) -> np.ndarray:
+    """
+    Return an ordering of the nodes that improves the locality of the counting, i.e. the nodes whose adjacency is
+    visited by consecutive edges get close IDs.
+
+    'degree' sorts the nodes by descending degree, so that the hubs (whose adjacency is visited by most edges) get the
+    smallest IDs. 'bfs' orders the nodes breadth-first, starting at the node of the largest degree of each connected
+    component, so that the neighbors of a node get consecutive IDs. 'rcm' is the reverse Cuthill-McKee ordering,
+    i.e. breadth-first from a node of the smallest degree of each component with the neighbors in ascending order of
+    their degree, reversed, which minimizes the bandwidth of the adjacency matrix. Ties are broken by node ID.
+
+    :param edges: np.ndarray
+        array of shape (m, 2) with the node IDs of the connected nodes
+    :param n: int
+        number of nodes
+    :param method: str
+        'degree', 'bfs' or 'rcm'
+    :return: np.ndarray
+        the node IDs in their new order, i.e. the original node ID of each new node ID
+    """
+    if method not in ORDERS:
+        raise ValueError(f"Unknown node order '{method}', expected one of {', '.join(ORDERS)}")
+    degree = np.bincount(edges.reshape(-1), minlength=n)
+    if method == 'degree':
+        return np.lexsort((np.arange(n), -degree))
+
+    # adjacency sorted by node ID (resp. by degree and node ID) per node
+    src = np.concatenate([edges[:, 0], edges[:, 1]])
+    dst = np.concatenate([edges[:, 1], edges[:, 0]])
+    keys = (dst, src) if method == 'bfs' else (dst, degree[dst], src)
+    indices = dst[np.lexsort(keys)]
+    indptr = np.concatenate([[0], np.cumsum(degree)])
+
+    starts = np.lexsort((np.arange(n), -degree if method == 'bfs' else degree))
+    order = np.empty(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=bool)
+    size = 0
+    for s in starts.tolist():
+        if visited[s]:
+            continue
+        visited[s] = True
+        order[size] = s
+        head, size = size, size + 1
+        while head < size:     # the queue of the breadth-first search is order[head:size]
+            v = order[head]
+            head += 1
+            neighbors = indices[indptr[v]:indptr[v + 1]]
+            new = neighbors[~visited[neighbors]]
+            visited[new] = True
+            order[size:size + len(new)] = new
+            size += len(new)
+    return order[::-1].copy() if method == 'rcm' else order
+
+
+def reorder_arrays(node_type: np.ndarray, edges: np.ndarray, edge_type: np.ndarray,
+                   method: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Relabel the nodes of a graph in the given order (cf. node_order) and sort its edges by their smaller and then by
+    their larger (new) node ID, so that the edges of a node are counted consecutively while its adjacency (and that
+    of its neighbors) is still in the cache. The direction of each edge is kept.
+
+    :param node_type: np.ndarray
+        integer node type of each node ID
+    :param edges: np.ndarray
+        array of shape (m, 2) with the node IDs of the connected nodes
+    :param edge_type: np.ndarray
+        integer edge type of each edge ID (or None)
+    :param method: str
+        'degree', 'bfs' or 'rcm'
+    :return: (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray)
+        the node types, edges and edge types of the relabeled graph, as well as the original node ID of each new node
+        ID and the original edge ID of each new edge ID
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    node_ids = node_order(edges, len(node_type), method)
+    new_id = np.empty(len(node_ids), dtype=np.int64)
+    new_id[node_ids] = np.arange(len(node_ids))
+    relabeled = new_id[edges]
+    edge_ids = np.lexsort((relabeled.max(axis=1), relabeled.min(axis=1)))
+    edge_type = np.asarray(edge_type)[edge_ids] if edge_type is not None else None
+    return np.asarray(node_type)[node_ids], relabeled[edge_ids], edge_type, node_ids, edge_ids
@@ -1,11 +1,22 @@
 import argparse
 from hin.hin import HIN
-from hin.dataset_loader import load_dataset
+from hin.dataset_loader import load_dataset, read_type_labels
+from hin.reorder import ORDERS
 from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.engine import ENGINES
 import cProfile
 import pstats
 from hin.motif.count_dict import CountDict
+from hin.motif.count_store import dump_to_binary
+from hin.motif.sampling import estimate_motifs, compare_to_exact
+from hin.motif.checkpoint import Checkpoint, CHECKPOINT_INTERVAL
+from hin.motif.out_of_core import count_motifs_out_of_core, PARTITION_VOLUME
+from hin.motif.distributed import count_motifs_distributed, run_worker, parse_address
+from hin.motif.stream import count_motifs_streamed
+from hin.metrics import Metrics, PROGRESS_INTERVAL
+import json
 import os
+import sys
 
 
 descr = '''
@@ -27,25 +38,235 @@ parser.add_argument("-o", "--output",
 parser.add_argument("--no_comb",
                     help="Turns off the use combinatorial relationships",
                     action="store_true")
+parser.add_argument("--csr",
+                    help="Use the compact array-backed (CSR) graph representation",
+                    action="store_true")
+parser.add_argument("--order",
+                    help="Relabel the nodes by descending degree ('degree'), breadth-first ('bfs') or in reverse "
+                         "Cuthill-McKee order ('rcm') and count the edges grouped by their smaller node, for a better "
+                         "memory locality (the results refer to the original IDs)",
+                    choices=list(ORDERS),
+                    default=None)
+parser.add_argument("--int_codes",
+                    help="Encode motifs and orbits by integer codes while counting (decoded on output)",
+                    action="store_true")
+parser.add_argument("--workers",
+                    help="Number of worker processes to distribute the edges among, with '--coordinator' the number "
+                         "of workers that are expected to connect (Default: 1)",
+                    type=int,
+                    default=1)
+parser.add_argument("--coordinator",
+                    help="Distribute the edges among workers that connect to this address (host:port, or :port for "
+                         "localhost) via TCP, see '--worker'. Workers are not authenticated, so only listen on other "
+                         "interfaces (e.g. 0.0.0.0:port) in a trusted network",
+                    default=None)
+parser.add_argument("--worker",
+                    help="Count the edges handed out by the coordinator at this address (host:port), the coordinator "
+                         "writes the results",
+                    default=None)
+parser.add_argument("--local_workers",
+                    help="Number of worker processes started on this host with '--coordinator' (Default: 0)",
+                    type=int,
+                    default=0)
+parser.add_argument("--global_only",
+                    help="Only count global motifs (no per-edge orbit and motif counts are computed or written)",
+                    action="store_true")
+parser.add_argument("--node_counts",
+                    help="Aggregate the orbit counts per node (written as a nodes x orbits matrix) instead of "
+                         "writing per-edge counts",
+                    action="store_true")
+parser.add_argument("--storage",
+                    help="Storage of the per-edge counts while counting, nested dictionaries ('dict', Default) or "
+                         "compact typed arrays ('array')",
+                    choices=["dict", "array"],
+                    default="dict")
+parser.add_argument("--memory_limit",
+                    help="Number of megabytes of per-edge counts kept in memory with '--storage array', beyond which "
+                         "they are spilled to temporary files (Default: no limit)",
+                    type=float)
+parser.add_argument("--types",
+                    help="Only count the motifs whose nodes all have one of these node types (values or labels of "
+                         "'node_types.csv'), edges between other node types are skipped",
+                    nargs="+")
+parser.add_argument("--motifs",
+                    help="Only count these motifs (hashes as in 'global_counts.json') and their orbits",
+                    nargs="+")
+parser.add_argument("--sparse",
+                    help="Count all edges at once with sparse matrix algebra (requires SciPy)",
+                    action="store_true")
+parser.add_argument("--engine",
+                    help="Per-edge counting engine, the reference 'python' engine (Default) or the flat-array "
+                         "'kernel', which is compiled with Numba if it is installed",
+                    choices=list(ENGINES),
+                    default="python")
+parser.add_argument("--out_of_core",
+                    help="Count the edges in partitions on disk, so that the graph is never loaded into memory as a "
+                         "whole (only the global counts are kept in memory, the per-edge counts are written as JSON)",
+                    action="store_true")
+parser.add_argument("--partition_volume",
+                    help=f"Maximum number of adjacency entries per partition with '--out_of_core' "
+                         f"(Default: {PARTITION_VOLUME})",
+                    type=int,
+                    default=PARTITION_VOLUME)
+parser.add_argument("--stream",
+                    help="Write the per-edge counts in a background thread while counting, instead of keeping them "
+                         "in memory until all edges are counted (JSON only)",
+                    action="store_true")
+parser.add_argument("--no_cache",
+                    help="Turns off the binary cache of the parsed dataset (placed in the dataset folder)",
+                    action="store_true")
+parser.add_argument("--format",
+                    help="Format of the result files, 'json' (Default) or the columnar 'binary' format",
+                    choices=["json", "binary"],
+                    default="json")
+parser.add_argument("--sample",
+                    help="Estimate the global motif counts from a random sample of this fraction of the edges",
+                    type=float)
+parser.add_argument("--sampling",
+                    help="Sampling method, 'uniform' (Default) or 'degree' (weighted by the 2-hop neighborhood size)",
+                    choices=["uniform", "degree"],
+                    default="uniform")
+parser.add_argument("--time_budget",
+                    help="Stop sampling after this number of seconds",
+                    type=float)
+parser.add_argument("--rel_error",
+                    help="Stop sampling as soon as all 95%% confidence intervals are within +- this relative error",
+                    type=float)
+parser.add_argument("--exact",
+                    help="Path to a folder with exact results ('global_counts.json') to compare the estimates with",
+                    default=None)
+parser.add_argument("--checkpoint",
+                    help="Periodically save the counts of the finished edges to the folder 'checkpoint' in the output "
+                         "folder, which is removed once the results are written",
+                    action="store_true")
+parser.add_argument("--checkpoint_interval",
+                    help=f"Number of seconds between two checkpoints (Default: {CHECKPOINT_INTERVAL:.0f})",
+                    type=float,
+                    default=CHECKPOINT_INTERVAL)
+parser.add_argument("--resume",
+                    help="Continue an interrupted run from its last checkpoint (implies --checkpoint)",
+                    action="store_true")
+parser.add_argument("--progress_interval",
+                    help=f"Number of seconds between two progress lines (Default: {PROGRESS_INTERVAL:.0f})",
+                    type=float,
+                    default=PROGRESS_INTERVAL)
+parser.add_argument("--detailed_metrics",
+                    help="Time the counting phases of each edge and count the orbit instances and hin.connected "
+                         "calls in 'metrics.json' (slows down the counting)",
+                    action="store_true")
+parser.add_argument("--profile",
+                    help="Profile the whole run with cProfile and write the statistics to 'timing.pstats' "
+                         "(slows down the counting considerably)",
+                    action="store_true")
 args = parser.parse_args()
 
 path_to_dataset: str = args.dataset
 path_to_output: str = args.output
 
 
+def reject_options(mode: str, *names: str):
+    """ Raise a ValueError if any of the options (by argument name) is given, as the mode does not support it. """
+    given = [f"--{name} {getattr(args, name)}" if isinstance(getattr(args, name), str) else f"--{name}"
+             for name in names if getattr(args, name) != parser.get_default(name)]
+    if given:
+        raise ValueError(f"{mode} cannot be combined with {', '.join(given)}")
+
+
 if not os.path.exists(path_to_dataset):
     raise FileNotFoundError(f"Dataset path does not exist: {path_to_dataset}")
 if not os.path.exists(path_to_output):
     raise FileNotFoundError(f"Output path does not exist: {path_to_output}")
+if args.out_of_core:
+    # the partitions are counted sequentially with count_per_edge and written as JSON
+    reject_options("Out-of-core counting", "order", "worker", "coordinator", "stream", "sample", "csr", "workers",
+                   "global_only", "node_counts", "storage", "memory_limit", "types", "motifs", "sparse", "engine",
+                   "checkpoint", "resume", "format")
+if args.stream:
+    # the edges are counted sequentially and their counts are written as JSON while counting
+    reject_options("Streamed counting", "worker", "coordinator", "sample", "workers", "global_only", "node_counts",
+                   "storage", "memory_limit", "types", "motifs", "sparse", "checkpoint", "resume", "format")
+if args.worker is not None:
+    # the counting options are sent by the coordinator, which writes the results
+    reject_options("A worker", "coordinator", "sample", "no_comb", "int_codes", "workers", "local_workers",
+                   "global_only", "node_counts", "storage", "memory_limit", "types", "motifs", "sparse", "engine",
+                   "checkpoint", "resume", "format")
+if args.coordinator is not None:
+    # the workers count the ranges of edges with count_per_edge (resp. the engine) into plain CountDicts
+    reject_options("Distributed counting", "sample", "node_counts", "storage", "memory_limit", "types", "motifs",
+                   "sparse", "checkpoint", "resume")
+if args.sample is not None:
+    # the sampled edges are counted sequentially with count_per_edge, only the global estimates are written
+    reject_options("Sampling", "workers", "global_only", "node_counts", "storage", "memory_limit", "types", "motifs",
+                   "sparse", "engine", "checkpoint", "resume", "format")
+else:
+    # the options of the sampling only apply with --sample
+    reject_options("Counting without --sample", "sampling", "time_budget", "rel_error", "exact")
+if args.node_counts:
+    # the node x orbit matrices are always written as '.npy' files
+    reject_options("Node-level orbit counting", "format")
 
 
+metrics = Metrics(progress_interval=args.progress_interval, detailed=args.detailed_metrics)
 profiler = cProfile.Profile()
 
-profiler.enable()
-hin: HIN = load_dataset(path_to_dataset)
-counts: CountDict = count_motifs(hin, comb=not args.no_comb)
-profiler.disable()
+if args.profile:
+    profiler.enable()
+if not args.out_of_core:
+    with metrics.phase('load'):
+        hin: HIN = load_dataset(path_to_dataset, csr=args.csr, cache=not args.no_cache, order=args.order)
+if args.worker is not None:
+    # a worker only counts the ranges handed out by the coordinator, nothing is written
+    run_worker(hin, parse_address(args.worker))
+    sys.exit()
+types = args.types
+if types is not None:
+    labels = read_type_labels(path_to_dataset) or []
+    types = [str(labels.index(t)) if t in labels else t for t in types]
+checkpoint = None
+memory_limit = None if args.memory_limit is None else int(args.memory_limit * 2**20)
+if args.out_of_core:
+    # the per-edge counts are written while counting, only the global counts are dumped below
+    counts: CountDict = count_motifs_out_of_core(path_to_dataset, path_to_output, comb=not args.no_comb,
+                                                 int_codes=args.int_codes, max_volume=args.partition_volume,
+                                                 cache=not args.no_cache, metrics=metrics)
+elif args.stream:
+    # the per-edge counts are written while counting, only the global counts are dumped below
+    counts: CountDict = count_motifs_streamed(hin, path_to_output, comb=not args.no_comb, int_codes=args.int_codes,
+                                              engine=args.engine, metrics=metrics)
+elif args.coordinator is not None:
+    counts: CountDict = count_motifs_distributed(hin, args.local_workers, comb=not args.no_comb,
+                                                 int_codes=args.int_codes, global_only=args.global_only,
+                                                 engine=args.engine, address=parse_address(args.coordinator),
+                                                 expected_workers=args.workers, metrics=metrics)
+elif args.sample is not None:
+    counts: CountDict = estimate_motifs(hin, fraction=args.sample, method=args.sampling,
+                                        time_budget=args.time_budget, rel_error=args.rel_error,
+                                        comb=not args.no_comb, int_codes=args.int_codes)
+else:
+    if args.checkpoint or args.resume:
+        checkpoint = Checkpoint(os.path.join(path_to_output, 'checkpoint'), hin, comb=not args.no_comb,
+                                int_codes=args.int_codes, global_only=args.global_only, resume=args.resume)
+    counts: CountDict = count_motifs(hin, comb=not args.no_comb, int_codes=args.int_codes,
+                                     workers=args.workers, global_only=args.global_only,
+                                     checkpoint=checkpoint, checkpoint_interval=args.checkpoint_interval,
+                                     metrics=metrics, node_counts=args.node_counts,
+                                     sparse=args.sparse, storage=args.storage, memory_limit=memory_limit,
+                                     types=types, motifs=args.motifs, engine=args.engine)
+if args.profile:
+    profiler.disable()
+
+if args.sample is not None and args.exact is not None:
+    exact = json.load(open(os.path.join(args.exact, 'global_counts.json'), 'r'))
+    print(json.dumps(compare_to_exact(counts, exact), indent=2))
 
-stats = pstats.Stats(profiler).sort_stats('tottime')
-stats.dump_stats(os.path.join(path_to_output, 'timing.pstats'))
-counts.dump_to_json(path_to_output)
+if args.profile:
+    stats = pstats.Stats(profiler).sort_stats('tottime')
+    stats.dump_stats(os.path.join(path_to_output, 'timing.pstats'))
+with metrics.phase('dump'):
+    if args.format == "binary":
+        dump_to_binary(counts, path_to_output)
+    else:
+        counts.dump_to_json(path_to_output)
+metrics.dump_to_json(path_to_output)
+if checkpoint is not None:
+    checkpoint.clear()
@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+
+# the packages live in src, which is the working directory of run.py
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from benchmarks.generators import typed_erdos_renyi, typed_power_law, write_dataset  # noqa: E402
+
+
+# small graphs that are counted by brute force, 'hubs' has edges around hubs whose path-based orbits are derived
+GRAPHS = {'random': lambda: typed_erdos_renyi(40, 150, 3, seed=1),
+          'hubs': lambda: typed_power_law(70, 260, 4, n_hubs=2, hub_degree=40, seed=2)}
+
+
+@pytest.fixture(scope='session')
+def datasets(tmp_path_factory):
+    """ Dataset folders of the test graphs by name. """
+    root = tmp_path_factory.mktemp('datasets')
+    paths = {}
+    for name, generate in GRAPHS.items():
+        node_type, edges = generate()
+        paths[name] = str(root / name)
+        write_dataset(paths[name], node_type, edges)
+    return paths
+
+
+@pytest.fixture(params=sorted(GRAPHS))
+def dataset(request, datasets):
+    """ Dataset folder of each test graph. """
+    return datasets[request.param]
@@ -0,0 +1,104 @@
+import os
+import json
+import tempfile
+from itertools import combinations
+from typing import Dict, Tuple
+from hin.motif.hash import HashMotif
+from hin.motif.count_dict import CountDict
+
+Counts = Tuple[Dict[str, Dict[str, int]], Dict[str, Dict[str, int]], Dict[str, int]]
+
+
+def dumped(counts: CountDict) -> Counts:
+    """ Return the orbit, local and global counts as written by dump_to_json (with hash strings and string edge IDs),
+    without the zero counts. """
+    with tempfile.TemporaryDirectory() as directory:
+        counts.dump_to_json(directory)
+        loaded = [json.load(open(os.path.join(directory, f'{name}_counts.json')))
+                  for name in ('orbit', 'local', 'global')]
+    orbit, local, global_count = loaded
+    return ({e: {h: c for h, c in d.items() if c} for e, d in orbit.items()},
+            {e: {h: c for h, c in d.items() if c} for e, d in local.items()},
+            {h: c for h, c in global_count.items() if c})
+
+
+def edge_orbit(adjacent, i: int, j: int, others: Tuple[int, ...]) -> int:
+    """ Return the orbit of the edge (i, j) in the connected graphlet induced by i, j and the other nodes (or 0 if the
+    induced graph is not connected). """
+    nodes = (i, j) + others
+    edges = [(a, b) for a, b in combinations(nodes, 2) if adjacent(a, b)]
+    degree = {v: sum(v in edge for edge in edges) for v in nodes}
+    if len(nodes) == 3:
+        return {2: 1, 3: 2}[len(edges)]
+    if len(edges) < 3 or min(degree.values()) == 0:
+        return 0
+    if len(edges) == 3:
+        if max(degree.values()) == 3:
+            return 5
+        if degree[i] == 1 and degree[j] == 1:   # two paths of 2 edges
+            return 0
+        return 4 if degree[i] == degree[j] == 2 else 3
+    if len(edges) == 4:
+        if all(d == 2 for d in degree.values()):
+            return 6
+        if degree[i] == 1 or degree[j] == 1:
+            return 7
+        return 9 if 3 in (degree[i], degree[j]) else 8
+    if len(edges) == 5:
+        return 11 if degree[i] == degree[j] == 3 else 10
+    return 12
+
+
+def brute_force_counts(hin) -> Counts:
+    """ Count the orbits of all edges by enumerating all sets of 3 and 4 nodes around each edge. """
+    hf = HashMotif(hin.node_types)
+    neighbors = [set(hin.neighbors[v]) for v in range(len(hin.types))]
+    types = hin.types
+    orbit_count, local_count, global_count = {}, {}, {}
+    for e, (i, j) in enumerate(hin.edges):
+        orbits, motifs = {}, {}
+        around = (neighbors[i] | neighbors[j]) - {i, j}
+        sets = {(k,) for k in around}
+        for k in around:
+            for r in (around | neighbors[k]) - {i, j, k}:
+                sets.add(tuple(sorted((k, r))))
+        for others in sets:
+            g = edge_orbit(lambda a, b: b in neighbors[a], i, j, others)
+            if g == 0:
+                continue
+            t_r = types[others[1]] if len(others) == 2 else '--'
+            mh, oh = hf.hash_motif(g, types[i], types[j], types[others[0]], t_r)
+            orbits[oh] = orbits.get(oh, 0) + 1
+            motifs[mh] = motifs.get(mh, 0) + 1
+            global_count[mh] = global_count.get(mh, 0) + 1
+        orbit_count[str(e)], local_count[str(e)] = orbits, motifs
+    counts = CountDict(hf)
+    counts.global_count = global_count
+    counts.correct_global_counts()
+    return orbit_count, local_count, counts.global_count
+
+
+def brute_force_node_counts(hin) -> Tuple[Dict[Tuple[int, str], int], Dict[Tuple[int, str], int]]:
+    """ Count the orbits of all edges by brute force (cf. brute_force_counts), attributed to the end nodes i and j
+    resp. to the other nodes k and r of each instance, by (node ID, orbit hash). """
+    hf = HashMotif(hin.node_types)
+    neighbors = [set(hin.neighbors[v]) for v in range(len(hin.types))]
+    types = hin.types
+    node_count, other_count = {}, {}
+    for i, j in hin.edges:
+        around = (neighbors[i] | neighbors[j]) - {i, j}
+        sets = {(k,) for k in around}
+        for k in around:
+            for r in (around | neighbors[k]) - {i, j, k}:
+                sets.add(tuple(sorted((k, r))))
+        for others in sets:
+            g = edge_orbit(lambda a, b: b in neighbors[a], i, j, others)
+            if g == 0:
+                continue
+            t_r = types[others[1]] if len(others) == 2 else '--'
+            _, oh = hf.hash_motif(g, types[i], types[j], types[others[0]], t_r)
+            for v in (i, j):
+                node_count[(v, oh)] = node_count.get((v, oh), 0) + 1
+            for v in others:
+                other_count[(v, oh)] = other_count.get((v, oh), 0) + 1
+    return node_count, other_count
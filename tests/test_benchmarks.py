@@ -0,0 +1,23 @@
+import pytest
+from benchmarks import run_benchmarks
+from benchmarks.run_benchmarks import run_case, benchmark, compare, PHASES
+
+
+@pytest.mark.parametrize('mode', [dict(), dict(engine='kernel'), dict(workers=2), dict(sparse=True)])
+def test_run_case_modes(mode, dataset):
+    phases = run_case(dataset, comb=True, csr=True, int_codes=False, **mode)
+    assert set(phases) == set(PHASES)
+    assert all(p['seconds'] >= 0 and p['peak_rss_mb'] > 0 for p in phases.values())
+
+
+def test_benchmark_records_the_mode(monkeypatch):
+    monkeypatch.setitem(run_benchmarks.CASES, 'tiny', {'er': (run_benchmarks.typed_erdos_renyi,
+                                                              dict(n=60, m=200, n_types=3))})
+    bench = benchmark('tiny', combs=(True,), engine='kernel', workers=2)
+    run, = bench['results']
+    assert (run['engine'], run['workers'], run['sparse'], run['csr']) == ('kernel', 2, False, False)
+    # runs of another mode are not compared
+    other = {'results': [dict(run, engine='python', phases={p: dict(v, seconds=v['seconds'] / 10, peak_rss_mb=1)
+                                                            for p, v in run['phases'].items()})]}
+    assert compare(bench, other) == []
+    assert compare(bench, {'results': [dict(other['results'][0], engine='kernel')]}) != []
@@ -0,0 +1,69 @@
+import os
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif import count_3_4_node_motifs
+from hin.motif.checkpoint import Checkpoint
+from hin.motif.count_3_4_node_motifs import count_motifs
+from helpers import dumped
+
+
+class Interrupt(Exception):
+    pass
+
+
+def test_ranges():
+    checkpoint = Checkpoint.__new__(Checkpoint)
+    checkpoint.ranges = [(0, 10, 'a'), (20, 30, 'b')]
+    assert checkpoint.next_edge == 10
+    assert checkpoint.remaining(0, 40) == [(10, 20), (30, 40)]
+    assert checkpoint.remaining(5, 25) == [(10, 20)]
+
+
+@pytest.mark.parametrize('global_only', [False, True])
+def test_resume_after_interruption(global_only, dataset, tmp_path, monkeypatch):
+    hin = load_dataset(dataset, cache=False)
+    directory = str(tmp_path / 'checkpoint')
+    expected = count_motifs(hin, global_only=global_only)
+
+    # interrupt the run after 60 edges, with a checkpoint after every edge
+    count_global = count_3_4_node_motifs.count_global_per_edge
+    count_edge = count_3_4_node_motifs.count_per_edge
+    calls = []
+
+    def interrupted(count):
+        def wrapper(*args, **kwargs):
+            if len(calls) == 60:
+                raise Interrupt()
+            calls.append(args[1])
+            return count(*args, **kwargs)
+        return wrapper
+    monkeypatch.setattr(count_3_4_node_motifs, 'count_global_per_edge', interrupted(count_global))
+    monkeypatch.setattr('hin.motif.engine.count_per_edge', interrupted(count_edge))
+    with pytest.raises(Interrupt):
+        count_motifs(hin, global_only=global_only, checkpoint_interval=0,
+                     checkpoint=Checkpoint(directory, hin, global_only=global_only))
+    monkeypatch.undo()
+
+    checkpoint = Checkpoint(directory, hin, global_only=global_only, resume=True)
+    assert checkpoint.next_edge == 60
+    resumed = count_motifs(hin, global_only=global_only, checkpoint=checkpoint)
+    if global_only:
+        assert resumed.global_count == expected.global_count
+    else:
+        assert dumped(resumed) == dumped(expected)
+
+    # a checkpoint of other counting options is not resumed
+    with pytest.raises(ValueError):
+        Checkpoint(directory, hin, comb=False, global_only=global_only, resume=True)
+    checkpoint.clear()
+    assert not os.path.exists(directory)
+
+
+def test_workers_save_chunks(dataset, tmp_path):
+    hin = load_dataset(dataset, cache=False)
+    checkpoint = Checkpoint(str(tmp_path), hin)
+    counts = count_motifs(hin, workers=2, checkpoint=checkpoint)
+    assert checkpoint.next_edge == len(hin.edges)
+    assert dumped(counts) == dumped(count_motifs(hin))
+    resumed = count_motifs(hin, workers=2, checkpoint=Checkpoint(str(tmp_path), hin, resume=True))
+    assert dumped(resumed) == dumped(counts)
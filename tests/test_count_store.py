@@ -0,0 +1,40 @@
+import os
+import numpy as np
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.count_store import dump_to_binary, CountReader
+from helpers import dumped
+
+
+def scanned(counts, h, kind):
+    return {e: c[h] for e, c in getattr(counts, f'{kind}_count').items() if c.get(h)}
+
+
+def test_round_trip(dataset, tmp_path):
+    hin = load_dataset(dataset, cache=False)
+    for storage in ('dict', 'array'):
+        counts = count_motifs(hin, storage=storage)
+        directory = str(tmp_path / storage)
+        os.makedirs(directory)
+        dump_to_binary(counts, directory)
+        reader = CountReader(directory)
+        assert dumped(reader.to_count_dict()) == dumped(count_motifs(hin))
+        e = int(reader.edge_ids()[3])
+        assert reader.edge_counts(e) == count_motifs(hin).orbit_count[e]
+
+
+def test_edges_with_uses_the_code_index(dataset, tmp_path):
+    hin = load_dataset(dataset, cache=False)
+    counts = count_motifs(hin)
+    dump_to_binary(counts, str(tmp_path))
+    reader = CountReader(str(tmp_path))
+    for kind in ('orbit', 'local'):
+        hashes = {h for c in getattr(counts, f'{kind}_count').values() for h in c}
+        for h in hashes:
+            assert reader.edges_with(h, kind) == scanned(counts, h, kind)
+        missing = int(np.load(os.path.join(str(tmp_path), f'{kind}_codes.npy')).max()) + 1
+        assert reader.edges_with(missing, kind) == {}
+    # the code column itself is never read by an indexed lookup
+    reader._arrays['orbit_codes'] = None
+    h = next(iter(counts.orbit_count[0]))
+    assert reader.edges_with(h) == scanned(counts, h, 'orbit')
@@ -0,0 +1,64 @@
+import numpy as np
+from hin.hin import CSRHIN, LINEAR_SCAN_SIZE
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from benchmarks.generators import write_dataset
+from helpers import dumped, brute_force_counts
+
+
+def test_csr_counts_match_brute_force(dataset):
+    hin = load_dataset(dataset, csr=True, cache=False)
+    expected = brute_force_counts(load_dataset(dataset, cache=False))
+    for comb in (True, False):
+        assert dumped(count_motifs(hin, comb=comb)) == expected
+
+
+def test_adjacency_matches_set_based_hin(dataset):
+    hin = load_dataset(dataset, cache=False)
+    csr = CSRHIN.from_hin(hin)
+    n = len(hin.types)
+    for v in range(n):
+        assert sorted(csr.neighbors[v]) == sorted(hin.neighbors[v])
+        for t in range(len(csr.type_names)):
+            of_type = sorted(u for u in hin.neighbors[v] if hin.node_type[u] == t)
+            assert csr.neighbors_of_type(v, t).tolist() == of_type
+    for i in range(n):
+        for j in range(n):
+            assert csr.connected(i, j) == (j in hin.neighbors[i])
+
+
+def test_connected_bisects_long_type_ranges(tmp_path):
+    # a star whose center has more neighbors of one type than are scanned linearly
+    leaves = 3 * LINEAR_SCAN_SIZE
+    node_type = np.array([0] + [1] * leaves + [2], dtype=np.int32)
+    edges = np.array([(0, v) for v in range(1, leaves + 1)] + [(0, leaves + 1)])
+    write_dataset(str(tmp_path), node_type, edges)
+    csr = load_dataset(str(tmp_path), csr=True, cache=False)
+    assert csr.typed_degrees(0).tolist() == [0, leaves, 1]
+    assert all(csr.connected(0, v) and csr.connected(v, 0) for v in range(1, leaves + 2))
+    assert not any(csr.connected(1, v) for v in range(2, leaves + 2))
+
+
+def test_runs_instead_of_typed_degree_table(dataset):
+    hin = load_dataset(dataset, cache=False)
+    csr = load_dataset(dataset, csr=True, cache=False)
+    # one run per node and node type of its neighbors, instead of a dense table
+    assert not hasattr(csr, 'typed_degree')
+    assert len(csr.type_ids) == len(csr.type_ends) == np.count_nonzero(hin.typed_degree)
+    assert csr.type_ids.dtype == np.int8 and csr.type_ends.dtype == csr.indices.dtype == np.int32
+    assert csr.nbytes() == sum(a.nbytes for a in (csr.node_type, csr.edge_array, csr.indptr, csr.indices,
+                                                  csr.type_indptr, csr.type_ids, csr.type_ends))
+    nodes = np.arange(len(hin.types))
+    assert np.array_equal(csr.typed_degrees(nodes), hin.typed_degree)
+    assert np.array_equal(csr.typed_degrees(nodes[::-3]), hin.typed_degrees(nodes[::-3]))
+    assert csr.typed_degrees([]).shape == (0, len(hin.type_names))
+    for v in nodes[::7].tolist():
+        assert np.array_equal(csr.typed_degrees(v), hin.typed_degrees(v))
+
+
+def test_cached_csr_arrays(dataset):
+    parsed = load_dataset(dataset, csr=True, cache=True)
+    cached = load_dataset(dataset, csr=True, cache=True)
+    assert isinstance(cached.indices, np.memmap)
+    for name in ('indptr', 'indices', 'type_indptr', 'type_ids', 'type_ends', 'edge_array', 'node_type'):
+        assert np.array_equal(getattr(parsed, name), getattr(cached, name))
@@ -0,0 +1,116 @@
+import os
+import time
+import tracemalloc
+import pytest
+import numpy as np
+from hin.hin import HIN
+from hin.dataset_loader import load_dataset, load_csr_arrays, stream_csr_arrays, CACHE_DIR, STREAM_CHUNK
+from benchmarks.generators import typed_erdos_renyi, write_dataset
+
+
+def write_small(path):
+    node_type = np.array([3, 3, 7, 9, 7], dtype=np.int32)
+    edges = np.array([(0, 1), (1, 2), (2, 3), (3, 4), (0, 2)])
+    write_dataset(path, node_type, edges)
+    return node_type, edges
+
+
+def test_parse(tmp_path):
+    node_type, edges = write_small(str(tmp_path))
+    hin = load_dataset(str(tmp_path), cache=False)
+    assert isinstance(hin, HIN)
+    assert hin.types == [str(t) for t in node_type.tolist()]
+    assert hin.type_names == ['3', '7', '9']
+    assert [tuple(e) for e in hin.edges] == [tuple(e) for e in edges.tolist()]
+    assert hin.edge_type.tolist() == [3 * 10 + 3, 3 * 10 + 7, 7 * 10 + 9, 7 * 10 + 9, 3 * 10 + 7]
+    assert hin.neighbors[2] == {0, 1, 3}
+
+
+def test_named_node_types(tmp_path):
+    with open(tmp_path / 'nodes.csv', 'w') as f:
+        f.write('author\npaper\nauthor\n')
+    with open(tmp_path / 'edges.csv', 'w') as f:
+        f.write('0,0,1\n2,0,1\n')
+    hin = load_dataset(str(tmp_path), cache=False)
+    assert hin.types == ['author', 'paper', 'author']
+    assert hin.neighbors[1] == {0, 2}
+
+
+def test_cache_is_reused_and_invalidated(tmp_path):
+    path = str(tmp_path)
+    write_small(path)
+    load_dataset(path)
+    assert os.path.isfile(os.path.join(path, CACHE_DIR, 'meta.json'))
+    load_dataset(path, csr=True)     # adds the CSR arrays to the cache
+    cached = load_dataset(path, csr=True)
+    assert isinstance(cached.indices, np.memmap) and isinstance(cached.type_ends, np.memmap)
+
+    # a changed edge file is parsed again
+    time.sleep(0.01)
+    with open(os.path.join(path, 'edges.csv'), 'a') as f:
+        f.write('1,0,4\n')
+    hin = load_dataset(path)
+    assert len(hin.edges) == 6 and 4 in hin.neighbors[1]
+    assert len(load_dataset(path, csr=True).edges) == 6
+
+
+def test_no_cache(tmp_path):
+    path = str(tmp_path)
+    write_small(path)
+    load_dataset(path, cache=False)
+    assert not os.path.exists(os.path.join(path, CACHE_DIR))
+
+
+def assert_same_arrays(streamed, loaded):
+    assert streamed[0] == loaded[0]
+    assert set(streamed[1]) == set(loaded[1])
+    for name, array in loaded[1].items():
+        assert streamed[1][name].dtype == array.dtype, name
+        assert np.array_equal(streamed[1][name], array), name
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, STREAM_CHUNK])
+def test_stream_csr_arrays(chunk_size, dataset, tmp_path):
+    expected = load_csr_arrays(dataset, cache=False)
+    streamed = stream_csr_arrays(dataset, cache=False, directory=str(tmp_path), chunk_size=chunk_size)
+    assert all(isinstance(array, np.memmap) for array in streamed[1].values())
+    assert_same_arrays(streamed, expected)
+
+
+def test_stream_csr_arrays_drops_parallel_edges(tmp_path):
+    with open(tmp_path / 'nodes.csv', 'w') as f:
+        f.write('author\npaper\nauthor\nvenue\n')
+    with open(tmp_path / 'edges.csv', 'w') as f:
+        f.write('0,0,1\n1,0,0\n2,0,1\n1,1,3\n0,0,1\n')
+    expected = load_csr_arrays(str(tmp_path), cache=False)
+    streamed = stream_csr_arrays(str(tmp_path), cache=False, directory=str(tmp_path / 'arrays'), chunk_size=2)
+    assert streamed[0] == ['author', 'paper', 'venue']
+    assert len(streamed[1]['indices']) == 6
+    assert_same_arrays(streamed, expected)
+
+
+def test_stream_csr_arrays_cache(tmp_path):
+    path = str(tmp_path)
+    write_small(path)
+    expected = load_csr_arrays(path, cache=False)
+    assert_same_arrays(stream_csr_arrays(path, chunk_size=2), expected)
+    # the streamed arrays form a valid cache, which both loaders read
+    assert_same_arrays(load_csr_arrays(path), expected)
+    assert isinstance(load_dataset(path, csr=True).indices, np.memmap)
+    assert_same_arrays(stream_csr_arrays(path, chunk_size=2), expected)
+    with pytest.raises(ValueError):
+        stream_csr_arrays(path, cache=False)
+
+
+def test_stream_csr_arrays_memory(tmp_path):
+    path = str(tmp_path / 'dataset')
+    node_type, edges = typed_erdos_renyi(5000, 200000, 4, seed=3)
+    write_dataset(path, node_type, edges)
+    write_small(str(tmp_path / 'small'))     # imports numpy modules lazily, which would count to the peak
+    stream_csr_arrays(str(tmp_path / 'small'), cache=False, directory=str(tmp_path / 'small_arrays'))
+    tracemalloc.start()
+    _, arrays = stream_csr_arrays(path, cache=False, directory=str(tmp_path / 'arrays'), chunk_size=1 << 10)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # the edges and the adjacency are only held in memory in chunks
+    assert peak < arrays['indices'].nbytes / 2
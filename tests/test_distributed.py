@@ -0,0 +1,165 @@
+import json
+import socket
+import threading
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif import distributed
+from hin.motif.hash import HashMotif
+from hin.motif.count_dict import CountDict
+from hin.motif.count_3_4_node_motifs import count_motifs, count_per_edge
+from hin.motif.checkpoint import fingerprint
+from hin.motif.distributed import Coordinator, run_worker, count_motifs_distributed, parse_address, \
+    encode_partial, _send, _recv, _split_point, MSG_HELLO, MSG_CONFIG, MSG_TASK, MSG_STEAL, MSG_SPLIT, MSG_RESULT, \
+    MSG_DONE, _RANGE
+from helpers import dumped
+
+
+def connect(hin, coordinator):
+    """ Connect a scripted worker to the coordinator, returns the connection and the hash function of its config. """
+    conn = socket.create_connection(coordinator.address)
+    _send(conn, MSG_HELLO, json.dumps({'graph': fingerprint(hin)}).encode())
+    kind, payload = _recv(conn)
+    assert kind == MSG_CONFIG
+    return conn, HashMotif.from_type_ids(json.loads(payload.decode())['type_ids'], int_codes=True)
+
+
+def count_range(conn, hin, hf, task, start, stop):
+    """ Count a range of edges for a scripted worker and send the result, returns the number of counted edges. """
+    partial = CountDict()
+    for e in range(start, stop):
+        count_per_edge(hin, e, partial, hf)
+    _send(conn, MSG_RESULT, _RANGE.pack(task, start, stop) + encode_partial(partial))
+    return stop - start
+
+
+def in_thread(target, *args):
+    """ Run the target in a thread, whose result (or exception) is stored in the returned dict once joined. """
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = target(*args)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    outcome['thread'] = thread
+    return outcome
+
+
+@pytest.mark.parametrize('options', [dict(), dict(comb=False), dict(int_codes=True), dict(global_only=True),
+                                     dict(engine='kernel'), dict(engine='kernel', comb=False)])
+def test_distributed_matches_count_motifs(options, dataset):
+    hin = load_dataset(dataset, csr=True, cache=False)
+    expected = count_motifs(hin, **{k: v for k, v in options.items() if k != 'engine'})
+    counts = count_motifs_distributed(hin, 2, **options)
+    if options.get('global_only'):
+        assert counts.global_count == expected.global_count
+    else:
+        assert dumped(counts) == dumped(expected)
+
+
+def test_distributed_reordered_graph(datasets):
+    expected = dumped(count_motifs(load_dataset(datasets['hubs'], cache=False)))
+    assert dumped(count_motifs_distributed(load_dataset(datasets['hubs'], cache=False, order='degree'), 2)) == expected
+
+
+def test_range_of_dead_worker_is_handed_out_again(datasets, monkeypatch):
+    monkeypatch.setattr(distributed, 'RANGES_PER_WORKER', 1)
+    hin = load_dataset(datasets['random'], cache=False)
+    coordinator = Coordinator(hin, ('127.0.0.1', 0))
+    run = in_thread(coordinator.run)
+
+    # the first worker dies with the only range
+    conn, _ = connect(hin, coordinator)
+    kind, payload = _recv(conn)
+    assert kind == MSG_TASK and _RANGE.unpack(payload)[1:] == (0, len(hin.edges))
+    conn.close()
+
+    assert run_worker(hin, coordinator.address) == len(hin.edges)
+    run['thread'].join()
+    assert dumped(run['result']) == dumped(count_motifs(hin))
+
+
+def test_work_stealing(datasets, monkeypatch):
+    monkeypatch.setattr(distributed, 'RANGES_PER_WORKER', 1)
+    hin = load_dataset(datasets['hubs'], cache=False)
+    coordinator = Coordinator(hin, ('127.0.0.1', 0))
+    run = in_thread(coordinator.run)
+
+    conn, hf = connect(hin, coordinator)
+    kind, payload = _recv(conn)
+    task, start, stop = _RANGE.unpack(payload)
+    assert kind == MSG_TASK and (start, stop) == (0, len(hin.edges))
+
+    # an idle worker makes the coordinator steal the second half of the range
+    other = in_thread(run_worker, hin, coordinator.address)
+    kind, payload = _recv(conn)
+    assert kind == MSG_STEAL and _RANGE.unpack(payload) == (task, start, stop)
+    mid = _split_point(coordinator.costs, start, stop)
+    assert 0 < mid < stop
+    _send(conn, MSG_SPLIT, _RANGE.pack(task, start, mid))
+
+    counted = count_range(conn, hin, hf, task, start, mid)
+    # the idle scripted worker steals from the other one in turn, it answers its tasks without splitting them
+    while True:
+        kind, payload = _recv(conn)
+        if kind == MSG_DONE:
+            break
+        if kind == MSG_TASK:
+            counted += count_range(conn, hin, hf, *_RANGE.unpack(payload))
+    conn.close()
+
+    run['thread'].join()
+    other['thread'].join()
+    assert counted >= mid and counted + other['result'] == len(hin.edges)
+    assert dumped(run['result']) == dumped(count_motifs(hin))
+
+
+def test_no_steals_while_more_are_pending_than_workers_idle(datasets):
+    hin = load_dataset(datasets['random'], cache=False)
+    coordinator = Coordinator(hin, ('127.0.0.1', 0))
+    sent = []
+    coordinator._send = lambda conn, kind, payload: sent.append((conn, kind))
+    # one idle worker, two steals are pending (e.g. the idle worker that requested one has disconnected since)
+    coordinator.queue.clear()
+    coordinator.idle = ['idle']
+    coordinator.assigned = {f'busy{t}': (t, 0, len(hin.edges)) for t in range(5)}
+    coordinator.stealing = {0, 1}
+    coordinator._dispatch()
+    coordinator.close()
+    assert sent == []
+
+
+def test_aborted_run_closes_worker_connections(datasets, monkeypatch):
+    monkeypatch.setattr(distributed, 'RANGES_PER_WORKER', 1)
+    hin = load_dataset(datasets['random'], cache=False)
+    coordinator = Coordinator(hin, ('127.0.0.1', 0))
+    run = in_thread(coordinator.run)
+    conn, _ = connect(hin, coordinator)
+    task, start, stop = _RANGE.unpack(_recv(conn)[1])
+    idle, _ = connect(hin, coordinator)
+    assert _recv(conn)[0] == MSG_STEAL
+
+    # a malformed result aborts the run, the connection of the idle worker is closed nevertheless
+    _send(conn, MSG_RESULT, _RANGE.pack(task, start, stop) + b'malformed')
+    run['thread'].join()
+    assert isinstance(run['error'], Exception)
+    idle.settimeout(5)
+    assert idle.recv(1) == b''
+    for c in (conn, idle):
+        c.close()
+
+
+def test_parse_address():
+    assert parse_address('example.org:47001') == ('example.org', 47001)
+    assert parse_address(':47001') == ('127.0.0.1', 47001)
+    assert parse_address('0.0.0.0:47001') == ('0.0.0.0', 47001)
+
+
+def test_invalid_engine(datasets):
+    hin = load_dataset(datasets['random'], cache=False)
+    for options in (dict(engine='unknown'), dict(engine='kernel', global_only=True)):
+        with pytest.raises(ValueError):
+            Coordinator(hin, ('127.0.0.1', 0), **options)
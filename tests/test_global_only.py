@@ -0,0 +1,15 @@
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.count_dict import GlobalCountDict
+
+
+def test_global_only_matches_full_counts(dataset):
+    for csr in (False, True):
+        hin = load_dataset(dataset, csr=csr, cache=False)
+        for comb in (True, False):
+            counts = count_motifs(hin, comb=comb, global_only=True)
+            assert isinstance(counts, GlobalCountDict)
+            assert counts.global_count == count_motifs(hin, comb=comb).global_count
+            # only the scratch orbits of the edges were kept, no local motif counts
+            assert not any(counts.local_count.values())
+            assert all(len(h) and h[:2] in ('06', '07', '10', '12') for d in counts.orbit_count.values() for h in d)
@@ -0,0 +1,45 @@
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif.hash import HashMotif, motif_id, untyped_hash
+from hin.motif.count_3_4_node_motifs import count_motifs
+from helpers import dumped
+
+
+def test_hash_string_format():
+    hf = HashMotif({'0', '1', '5'})
+    assert hf.hash_motif(2, '1', '5', '0', '--') == ('02000105--', '02000105--')
+    assert hf.hash_motif(8, '5', '0', '1', '1') == ('0600010105', '0800010105')
+    assert hf.decode('0800010105') == (8, '0', '1', '1', '5')
+
+
+def test_integer_codes_round_trip():
+    hf = HashMotif({'0', '1', '5'}, int_codes=True)
+    strings = HashMotif({'0', '1', '5'})
+    for g in range(1, 13):
+        t_r = '--' if g <= 2 else '1'
+        mh, oh = hf.hash_motif(g, '5', '0', '1', t_r)
+        assert isinstance(oh, int) and motif_id(oh) == g
+        assert (hf.to_hash_str(mh), hf.to_hash_str(oh)) == strings.hash_motif(g, '5', '0', '1', t_r)
+        assert hf.from_hash_str(hf.to_hash_str(oh)) == oh
+        assert hf.decode(oh) == strings.decode(strings.hash_motif(g, '5', '0', '1', t_r)[1])
+        assert hf.to_hash_str(untyped_hash(oh)) == untyped_hash(hf.to_hash_str(oh))
+
+
+def test_more_than_100_types():
+    types = {str(t) for t in range(150)}
+    hf = HashMotif(types)
+    codes = HashMotif(types, int_codes=True)
+    mh, oh = hf.hash_motif(12, '149', '7', '100', '3')
+    assert oh == '12003007100149'
+    assert codes.to_hash_str(codes.hash_motif(12, '149', '7', '100', '3')[1]) == oh
+    assert hf.decode(oh) == (12, '3', '7', '100', '149')
+
+
+def test_invalid_orbit():
+    with pytest.raises(Exception):
+        HashMotif({'0'}).hash_motif(13, '0', '0', '0', '0')
+
+
+def test_integer_codes_give_the_same_counts(dataset):
+    hin = load_dataset(dataset, cache=False)
+    assert dumped(count_motifs(hin, int_codes=True)) == dumped(count_motifs(hin))
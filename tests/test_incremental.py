@@ -0,0 +1,54 @@
+import random
+import numpy as np
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.incremental import IncrementalCounter
+from helpers import dumped
+
+
+def test_updates_match_recount(dataset):
+    hin = load_dataset(dataset, cache=False)
+    counter = IncrementalCounter(hin)
+    rng = random.Random(3)
+    for step in range(12):
+        if step % 3 == 2:
+            i, j = hin.edges[rng.randrange(len(hin.edges))]
+            counter.remove_edge(j, i)
+        else:
+            i, j = rng.sample(range(len(hin.nodes)), 2)
+            while hin.connected(i, j):
+                i, j = rng.sample(range(len(hin.nodes)), 2)
+            counter.add_edge(i, j, edge_type=step)
+        assert dumped(counter.counts) == dumped(count_motifs(hin))
+
+
+def test_edge_arrays_follow_updates(dataset):
+    hin = load_dataset(dataset, cache=False)
+    buffer = hin._edge_buffer
+    types = hin.edge_type.tolist()
+    n = len(hin.nodes)
+    added = [(i, j) for i in range(n) for j in range(i + 1, n) if not hin.connected(i, j)][:300]
+    for k, (i, j) in enumerate(added):
+        assert hin.add_edge(i, j, edge_type=k) == len(types)
+        types.append(k)
+    # the arrays grow geometrically instead of once per edge
+    assert hin._edge_buffer is not buffer and len(hin._edge_buffer) < 2 * len(hin.edges) + 1
+    assert hin.edge_array.tolist() == [list(e) for e in hin.edges]
+    assert hin.edge_type.tolist() == types
+
+    for edge_id in (0, 5, -1):
+        last = len(hin.edges) - 1
+        edge_id %= len(hin.edges)
+        types[edge_id] = types[last]
+        types.pop()
+        hin.remove_edge(edge_id)
+    assert hin.edge_array.tolist() == [list(e) for e in hin.edges]
+    assert hin.edge_type.tolist() == types
+    assert hin.edge_array.dtype == np.int64 and hin.edge_array.shape == (len(hin.edges), 2)
+
+
+def test_reordered_graph_is_rejected(datasets):
+    # the counts refer to the original edge IDs, which the updates of the relabeled graph cannot maintain
+    with pytest.raises(ValueError):
+        IncrementalCounter(load_dataset(datasets['hubs'], cache=False, order='degree'))
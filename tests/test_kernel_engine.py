@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from benchmarks.generators import typed_erdos_renyi, write_dataset
+from hin.dataset_loader import load_dataset
+from hin.motif import kernel_engine
+from hin.motif.engine import Engine
+from hin.motif.hash import HashMotif
+from hin.motif.count_3_4_node_motifs import count_motifs
+from helpers import dumped
+
+
+@pytest.fixture(params=['compiled', 'python'] if kernel_engine.NUMBA else ['python'])
+def kernel(request, monkeypatch):
+    """ Run the kernel compiled with Numba (if it is installed) and as pure Python on lists. """
+    if request.param == 'python' and kernel_engine.NUMBA:
+        monkeypatch.setattr(kernel_engine, 'NUMBA', False)
+        for name in ('_add', '_derive', '_count_kernel'):
+            monkeypatch.setattr(kernel_engine, name, getattr(kernel_engine, name).py_func)
+    assert callable(getattr(kernel_engine._count_kernel, 'py_func', None)) == (request.param == 'compiled')
+    return request.param
+
+
+@pytest.mark.parametrize('comb', [True, False])
+@pytest.mark.parametrize('csr', [False, True])
+def test_kernel_matches_python_engine(comb, csr, kernel, dataset):
+    hin = load_dataset(dataset, csr=csr, cache=False)
+    # the orbit, local and global counts
+    assert dumped(count_motifs(hin, comb=comb, engine='kernel')) == dumped(count_motifs(hin, comb=comb))
+
+
+@pytest.mark.parametrize('comb', [True, False])
+def test_kernel_with_parallel_edges_and_isolated_nodes(comb, kernel, tmp_path):
+    node_type, edges = typed_erdos_renyi(30, 100, 3, seed=4)
+    # repeat some edges, in both directions, and add nodes without edges
+    edges = np.concatenate([edges, edges[:10], edges[10:20, ::-1]])
+    write_dataset(str(tmp_path), np.concatenate([node_type, [0, 2]]), edges)
+    for csr in (False, True):
+        hin = load_dataset(str(tmp_path), csr=csr, cache=False)
+        assert dumped(count_motifs(hin, comb=comb, engine='kernel')) == dumped(count_motifs(hin, comb=comb))
+
+
+def test_kernel_with_small_output(kernel, datasets, monkeypatch):
+    # the output columns only hold the rows of a single edge, so the kernel stops after each edge
+    monkeypatch.setattr(kernel_engine, 'OUTPUT_ROWS', 1)
+    hin = load_dataset(datasets['hubs'], csr=True, cache=False)
+    for comb in (True, False):
+        assert dumped(count_motifs(hin, comb=comb, engine='kernel')) == dumped(count_motifs(hin, comb=comb))
+
+
+def test_kernel_with_int_codes_and_workers(kernel, datasets):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    expected = dumped(count_motifs(hin))
+    assert dumped(count_motifs(hin, engine='kernel', int_codes=True)) == expected
+    assert dumped(count_motifs(hin, engine='kernel', workers=2)) == expected
+    assert dumped(count_motifs(load_dataset(datasets['hubs'], cache=False, order='bfs'), engine='kernel')) == expected
+
+
+@pytest.mark.filterwarnings('ignore:loadtxt')
+def test_kernel_of_single_type_and_empty_graphs(kernel, tmp_path):
+    for name, node_type, edges in (('single', np.zeros(20, dtype=np.int32), typed_erdos_renyi(20, 60, 1, seed=5)[1]),
+                                   ('empty', np.array([0, 1, 1], dtype=np.int32), np.zeros((0, 2), dtype=np.int64))):
+        write_dataset(str(tmp_path / name), node_type, edges)
+        hin = load_dataset(str(tmp_path / name), csr=True, cache=False)
+        for comb in (True, False):
+            assert dumped(count_motifs(hin, comb=comb, engine='kernel')) == dumped(count_motifs(hin, comb=comb))
+
+
+def test_incomplete_engine_cannot_be_created(dataset):
+    class Incomplete(Engine):
+        pass
+
+    hin = load_dataset(dataset, cache=False)
+    with pytest.raises(TypeError):
+        Incomplete(hin, HashMotif(hin.node_types))
@@ -0,0 +1,48 @@
+import io
+from hin.dataset_loader import load_dataset
+from hin.metrics import Metrics
+from hin.hin import HIN
+from hin.motif.count_3_4_node_motifs import count_motifs
+from helpers import dumped
+
+COUNTING_PHASES = ('count_3_node', 'path_based', 'triangle_based', 'comb')
+
+
+def test_default_metrics_are_not_instrumented(dataset):
+    hin = load_dataset(dataset, cache=False)
+    metrics = Metrics(stream=None)
+    with metrics.instrumented(hin):
+        assert hin.connected.__func__ is HIN.connected
+    counts = count_motifs(hin, metrics=metrics)
+    assert dumped(counts) == dumped(count_motifs(hin))
+    assert metrics.counters['edges'] == len(hin.edges)
+    assert metrics.counters['connected_calls'] == metrics.counters['enumerated_instances'] == 0
+    assert all(metrics.phase_seconds[phase] == 0 for phase in COUNTING_PHASES)
+    assert metrics.phase_seconds['count'] > 0
+    assert len(metrics.to_dict()['top_edges']) == metrics.top_n
+
+
+def test_detailed_metrics(dataset):
+    hin = load_dataset(dataset, cache=False)
+    for workers in (1, 2):
+        metrics = Metrics(stream=None, detailed=True)
+        count_motifs(hin, workers=workers, metrics=metrics)
+        assert 'connected' not in vars(hin)
+        assert metrics.counters['enumerated_instances'] > 0 and metrics.counters['derived_instances'] > 0
+        assert all(metrics.phase_seconds[phase] > 0 for phase in COUNTING_PHASES)
+        assert metrics.phase_seconds['count'] == 0
+
+    metrics = Metrics(stream=None, detailed=True)
+    with metrics.instrumented(hin):
+        hin.connected(*hin.edges[0])
+        hin.add_edge(*next((i, j) for i in range(len(hin.nodes)) for j in range(i) if not hin.connected(i, j)))
+    assert 'connected' not in vars(hin)
+    assert metrics.counters['connected_calls'] >= 3
+
+
+def test_progress_line():
+    stream = io.StringIO()
+    metrics = Metrics(stream=stream, progress_interval=0)
+    metrics.start(4)
+    metrics.add_edges(2, 2.0)
+    assert stream.getvalue().startswith('2/4 edges (50.0% of the estimated cost)')
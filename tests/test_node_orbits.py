@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from helpers import brute_force_node_counts
+
+
+def nonzero(counts, other: bool):
+    """ Return the node-level orbit counts of a NodeCountDict by (node ID, orbit hash). """
+    matrix, orbits = counts.node_orbit_counts(other=other)
+    rows, cols = np.nonzero(matrix)
+    return {(int(v), orbits[c]): int(matrix[v, c]) for v, c in zip(rows, cols)}
+
+
+@pytest.mark.parametrize('comb', [True, False])
+@pytest.mark.parametrize('csr', [False, True])
+@pytest.mark.parametrize('engine', ['python', 'kernel'])
+def test_node_orbits_match_brute_force(comb, csr, engine, dataset):
+    hin = load_dataset(dataset, csr=csr, cache=False)
+    counts = count_motifs(hin, comb=comb, node_counts=True, engine=engine)
+    node_count, other_count = brute_force_node_counts(load_dataset(dataset, cache=False))
+    assert nonzero(counts, other=False) == node_count
+    assert nonzero(counts, other=True) == other_count
+
+
+def test_node_orbits_of_workers_and_reordered_graphs(datasets):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    expected = count_motifs(hin, node_counts=True)
+    parallel = count_motifs(hin, node_counts=True, workers=2)
+    reordered = count_motifs(load_dataset(datasets['hubs'], cache=False, order='degree'), node_counts=True)
+    for other in (False, True):
+        assert nonzero(parallel, other) == nonzero(expected, other)
+        assert nonzero(reordered, other) == nonzero(expected, other)
+
+
+def test_other_counts_are_dumped(datasets, tmp_path):
+    counts = count_motifs(load_dataset(datasets['random'], cache=False), node_counts=True, int_codes=True)
+    counts.dump_to_json(str(tmp_path))
+    matrix, _ = counts.node_orbit_counts(other=True)
+    assert np.array_equal(np.load(tmp_path / 'node_other_orbit_counts.npy'), matrix)
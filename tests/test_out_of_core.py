@@ -0,0 +1,59 @@
+import os
+import json
+import shutil
+import pytest
+from hin.dataset_loader import load_dataset, CACHE_DIR
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.out_of_core import count_motifs_out_of_core, write_partitions, load_partition
+from helpers import dumped
+
+
+def streamed(output):
+    """ Return the per-edge counts written by count_motifs_out_of_core (without the zero counts). """
+    loaded = [json.load(open(os.path.join(output, f'{kind}_counts.json'))) for kind in ('orbit', 'local')]
+    return tuple({e: {h: c for h, c in d.items() if c} for e, d in counts.items()} for counts in loaded)
+
+
+@pytest.mark.parametrize('options', [dict(), dict(comb=False), dict(int_codes=True)])
+def test_out_of_core_matches_count_motifs(options, dataset, tmp_path):
+    expected = dumped(count_motifs(load_dataset(dataset, cache=False), comb=options.get('comb', True)))
+    with pytest.warns(UserWarning):     # the first edge of the partitions around the hubs exceeds the small volume
+        counts = count_motifs_out_of_core(dataset, str(tmp_path), max_volume=64, cache=False, **options)
+    # the partitions and the streamed arrays are removed
+    assert sorted(os.listdir(tmp_path)) == ['local_counts.json', 'orbit_counts.json']
+    counts.dump_to_json(str(tmp_path))
+    global_count = json.load(open(os.path.join(tmp_path, 'global_counts.json')))
+    assert streamed(str(tmp_path)) + ({h: c for h, c in global_count.items() if c},) == expected
+
+
+def test_partitions(datasets, tmp_path):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    with pytest.warns(UserWarning):
+        ranges = write_partitions(datasets['hubs'], str(tmp_path / 'partitions'), max_volume=256, cache=False)
+    assert len(ranges) > 1 and ranges[0][0] == 0 and ranges[-1][1] == len(hin.edges)
+    assert all(stop == start for (_, stop), (start, _) in zip(ranges[:-1], ranges[1:]))
+    assert sorted(os.listdir(tmp_path / 'partitions')) == sorted(
+        ['partitions.json'] + [f'partition_{n}.npz' for n in range(len(ranges))])
+
+    # the first edges of a partition are its edge ID range, with the same node types as in the whole graph
+    for n, (start, stop) in enumerate(ranges):
+        part_start, part_stop, part = load_partition(str(tmp_path / 'partitions'), n, hin.type_names)
+        assert (part_start, part_stop) == (start, stop)
+        for e in range(stop - start):
+            (i, j), (a, b) = hin.edges[start + e], part.edges[e]
+            assert (hin.types[i], hin.types[j]) == (part.types[a], part.types[b])
+            assert len(hin.neighbors[i]) == len(part.neighbors[a])
+
+
+def test_out_of_core_cache(datasets, tmp_path):
+    path = str(tmp_path / 'dataset')
+    shutil.copytree(datasets['random'], path)
+    expected = dumped(count_motifs(load_dataset(path, cache=False)))
+    for run in ('parsed', 'cached'):
+        output = tmp_path / run
+        output.mkdir()
+        count_motifs_out_of_core(path, str(output), cache=True)
+        assert streamed(str(output)) == expected[:2]
+        assert os.path.isfile(os.path.join(path, CACHE_DIR, 'meta.json'))
+    # the streamed cache is also read by the in-memory loader
+    assert dumped(count_motifs(load_dataset(path, csr=True))) == expected
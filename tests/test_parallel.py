@@ -0,0 +1,33 @@
+import numpy as np
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.parallel import estimate_edge_costs, split_edges
+from helpers import dumped
+
+
+def test_split_edges_covers_all_edges():
+    costs = np.array([1, 1, 100, 1, 1, 1, 1, 50, 1, 1], dtype=float)
+    ranges = split_edges(costs, 4)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(costs)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    # each range costs at most one chunk plus a single (expensive) edge
+    assert len(ranges) <= 4
+    assert all(costs[start:stop].sum() <= costs.sum() / 4 + costs.max() for start, stop in ranges)
+    assert split_edges(np.zeros(0), 4) == []
+
+
+def test_edge_costs(dataset):
+    hin = load_dataset(dataset, cache=False)
+    costs = estimate_edge_costs(hin)
+    assert costs.shape == (len(hin.edges),) and (costs > 0).all()
+    assert (estimate_edge_costs(hin, comb=False) >= costs).all()
+
+
+def test_workers_match_sequential(dataset):
+    for csr in (False, True):
+        hin = load_dataset(dataset, csr=csr, cache=False)
+        for comb in (True, False):
+            sequential = dumped(count_motifs(hin, comb=comb))
+            assert dumped(count_motifs(hin, comb=comb, workers=3)) == sequential
+        assert count_motifs(hin, workers=3, global_only=True).global_count == \
+            count_motifs(hin, global_only=True).global_count
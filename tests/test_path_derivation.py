@@ -0,0 +1,24 @@
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif import count_3_4_node_motifs
+from hin.motif.comb_relationships import path_cost
+from hin.motif.count_3_4_node_motifs import count_motifs
+from helpers import dumped, brute_force_counts
+
+
+@pytest.mark.parametrize('threshold', [-1, 10 ** 9])
+def test_derived_and_enumerated_paths_match_brute_force(threshold, dataset, monkeypatch):
+    hin = load_dataset(dataset, cache=False)
+    monkeypatch.setattr(count_3_4_node_motifs, 'PATH_DERIVATION_COST', threshold)
+    assert dumped(count_motifs(hin)) == brute_force_counts(hin)
+    assert dumped(count_motifs(load_dataset(dataset, csr=True, cache=False))) == brute_force_counts(hin)
+
+
+def test_hub_edges_are_derived(datasets):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    costs = []
+    for i, j in hin.edges:
+        Tij = hin.neighbors[i] & hin.neighbors[j]
+        costs.append(path_cost(hin, hin.neighbors[i] - Tij - {j}, hin.neighbors[j] - Tij - {i}))
+    # the default threshold separates the edges around the hubs from the others
+    assert min(costs) <= count_3_4_node_motifs.PATH_DERIVATION_COST < max(costs)
@@ -0,0 +1,56 @@
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.query import MotifQuery
+
+
+@pytest.mark.parametrize('csr', [False, True])
+def test_queries_match_full_counts(csr, dataset):
+    hin = load_dataset(dataset, csr=csr, cache=False)
+    full = count_motifs(hin)
+    query = MotifQuery(hin, cache_size=8)
+    for e in range(0, len(hin.edges), 7):
+        assert query.edge_counts(e) == (full.orbit_count[e], full.local_count[e])
+
+    v = int(hin.edge_array[0, 0])
+    incident = sorted(query.incident_edges(v).tolist())
+    assert incident == [e for e, (i, j) in enumerate(hin.edge_array.tolist()) if v in (i, j)]
+    ego = query.node(v)
+    assert sorted(ego.orbit_count) == incident
+    assert all(ego.local_count[e] == full.local_count[e] for e in incident)
+    assert ego.global_count == {}
+
+    i, j = hin.edge_array[5].tolist()
+    assert query.edge_id(i, j) == query.edge_id(j, i) == 5
+    with pytest.raises(ValueError):
+        query.edge_id(i, i)
+
+
+def test_lru_cache(dataset):
+    query = MotifQuery(load_dataset(dataset, cache=False), cache_size=2)
+    query.edge_counts(0)
+    query.edge_counts(1)
+    query.edge_counts(0)       # 0 is now the most recently used edge
+    query.edge_counts(2)       # evicts 1
+    assert list(query.cache) == [0, 2]
+    assert (query.hits, query.misses) == (1, 3)
+    query.edge_counts(1)
+    assert (query.hits, query.misses) == (1, 4)
+    query.clear_cache()
+    assert len(query.cache) == 0
+
+
+@pytest.mark.parametrize('csr', [False, True])
+def test_queries_of_reordered_graph(csr, datasets):
+    original = load_dataset(datasets['hubs'], cache=False)
+    full = count_motifs(original)
+    query = MotifQuery(load_dataset(datasets['hubs'], csr=csr, cache=False, order='degree'))
+    # the queries and results refer to the original node and edge IDs, like the counts of count_motifs
+    for e in range(0, len(original.edges), 5):
+        assert query.edge_counts(e) == (full.orbit_count[e], full.local_count[e])
+    for v in range(0, len(original.nodes), 9):
+        incident = sorted(query.incident_edges(v).tolist())
+        assert incident == [e for e, (i, j) in enumerate(original.edges) if v in (i, j)]
+        assert all(query.node(v).orbit_count[e] == full.orbit_count[e] for e in incident)
+    i, j = original.edges[5]
+    assert query.edge_id(i, j) == query.edge_id(j, i) == 5
@@ -0,0 +1,65 @@
+import json
+import numpy as np
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif import sampling
+from hin.motif.sampling import estimate_motifs, compare_to_exact, MIN_SUPPORT
+
+
+def test_full_uniform_sample_is_exact(dataset, tmp_path):
+    hin = load_dataset(dataset, cache=False)
+    exact = count_motifs(hin).global_count
+    estimate = estimate_motifs(hin, fraction=1.0, seed=0)
+    assert estimate.n_samples == len(hin.edges)
+    assert estimate.global_count == exact
+    assert all(se == 0 for se in estimate.std_error.values())
+    assert estimate.ci_low == estimate.ci_high == exact
+    comparison = compare_to_exact(estimate, exact)
+    assert comparison['weighted_rel_error'] == 0 and comparison['missing'] == 0
+    assert comparison['ci_coverage'] == comparison['ci_coverage_sampled'] == 1
+
+    estimate.dump_to_json(str(tmp_path))
+    errors = json.load(open(tmp_path / 'global_count_errors.json'))
+    assert set(errors) == {'n_samples', 'n_edges', 'std_error', 'ci_low', 'ci_high', 'support'}
+    # the support of a motif is the number of edges it occurs in
+    local = count_motifs(hin).local_count
+    assert errors['support'] == {h: sum(h in c for c in local.values()) for h in exact}
+
+
+@pytest.mark.parametrize('method', ['uniform', 'degree'])
+def test_estimates_are_unbiased(method, dataset):
+    hin = load_dataset(dataset, cache=False)
+    exact = count_motifs(hin).global_count
+    h = max(exact, key=exact.get)
+    estimates = [estimate_motifs(hin, fraction=0.3, method=method, seed=seed) for seed in range(30)]
+    mean = np.mean([e.global_count.get(h, 0) for e in estimates])
+    std_error = np.mean([e.std_error.get(h, 0) for e in estimates]) / np.sqrt(len(estimates))
+    assert abs(mean - exact[h]) <= 4 * std_error
+    comparison = compare_to_exact(estimates[0], exact)
+    assert 0 <= comparison['ci_coverage'] <= comparison['ci_coverage_sampled'] <= 1
+    assert all(s >= 1 for s in estimates[0].support.values())
+    assert comparison['ci_coverage_supported'] == comparison['ci_coverage_supported'] or \
+        all(s < MIN_SUPPORT for s in estimates[0].support.values())
+
+
+def test_invalid_method(dataset):
+    with pytest.raises(ValueError):
+        estimate_motifs(load_dataset(dataset, cache=False), method='stratified')
+
+
+def test_rel_error_needs_supported_motifs(datasets, monkeypatch):
+    hin = load_dataset(datasets['random'], cache=False)
+    # no motif reaches the support in the first batches, so the accuracy budget cannot stop the sampling
+    monkeypatch.setattr(sampling, 'BATCH_SIZE', 5)
+    monkeypatch.setattr(sampling, 'MIN_SUPPORT', len(hin.edges) + 1)
+    estimate = estimate_motifs(hin, fraction=0.5, rel_error=10.0, seed=0)
+    assert estimate.n_samples == int(round(0.5 * len(hin.edges)))
+
+
+def test_degree_support_counts_distinct_edges(datasets):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    local = count_motifs(hin).local_count
+    # edges are drawn with replacement, but each sampled edge supports its motifs only once
+    estimate = estimate_motifs(hin, fraction=1.0, method='degree', seed=0)
+    assert all(s <= sum(h in c for c in local.values()) for h, s in estimate.support.items())
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from benchmarks.generators import typed_erdos_renyi, write_dataset
+from hin.dataset_loader import load_dataset
+from hin.motif import sparse_engine
+from hin.motif.count_3_4_node_motifs import count_motifs
+from helpers import dumped, brute_force_counts
+
+
+@pytest.mark.parametrize('comb', [True, False])
+@pytest.mark.parametrize('csr', [False, True])
+def test_sparse_engine_matches_brute_force(comb, csr, dataset):
+    hin = load_dataset(dataset, csr=csr, cache=False)
+    assert dumped(count_motifs(hin, comb=comb, sparse=True)) == brute_force_counts(load_dataset(dataset, cache=False))
+
+
+@pytest.mark.parametrize('comb', [True, False])
+def test_sparse_engine_with_parallel_edges(comb, tmp_path):
+    node_type, edges = typed_erdos_renyi(30, 100, 3, seed=3)
+    # repeat some edges, in both directions
+    edges = np.concatenate([edges, edges[:10], edges[10:20, ::-1]])
+    write_dataset(str(tmp_path), node_type, edges)
+    for csr in (False, True):
+        hin = load_dataset(str(tmp_path), csr=csr, cache=False)
+        assert dumped(count_motifs(hin, comb=comb, sparse=True)) == dumped(count_motifs(hin, comb=comb))
+
+
+def test_sparse_engine_counts_in_chunks(datasets, monkeypatch):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    expected = dumped(count_motifs(hin, sparse=True, comb=False))
+    monkeypatch.setattr(sparse_engine, 'CHUNK_SIZE', 64)
+    assert dumped(count_motifs(hin, sparse=True, comb=False)) == expected
+    assert dumped(count_motifs(hin, sparse=True)) == expected
+
+
+def test_sparse_engine_counts_are_integers(datasets):
+    counts = count_motifs(load_dataset(datasets['random'], cache=False), sparse=True)
+    for per_edge in (counts.orbit_count, counts.local_count):
+        assert all(type(c) is int for d in per_edge.values() for c in d.values())
+    assert all(type(c) is int for c in counts.global_count.values())
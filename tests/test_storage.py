@@ -0,0 +1,75 @@
+import os
+import pickle
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif.hash import HashMotif
+from hin.motif.count_dict import CountDict, ArrayCountDict
+from hin.motif.count_3_4_node_motifs import count_motifs, count_per_edge
+from helpers import dumped
+
+
+def count_all(hin, counts):
+    """ Count all edges of the graph into counts (with corrected global counts). """
+    for e in range(len(hin.edges)):
+        count_per_edge(hin, e, counts, counts.hf)
+    counts.correct_global_counts()
+    return counts
+
+
+@pytest.mark.parametrize('options', [dict(), dict(int_codes=True), dict(memory_limit=1), dict(workers=2),
+                                     dict(engine='kernel'), dict(comb=False, memory_limit=1)])
+def test_array_storage_matches_dict(options, dataset):
+    hin = load_dataset(dataset, cache=False)
+    expected = dumped(count_motifs(hin, comb=options.get('comb', True)))
+    counts = count_motifs(hin, storage='array', **options)
+    assert isinstance(counts, ArrayCountDict)
+    assert dumped(counts) == expected
+
+
+def test_array_storage_of_reordered_graph(datasets):
+    expected = dumped(count_motifs(load_dataset(datasets['hubs'], cache=False)))
+    hin = load_dataset(datasets['hubs'], cache=False, order='degree')
+    assert dumped(count_motifs(hin, storage='array', memory_limit=1)) == expected
+
+
+def test_spilled_columns(datasets, tmp_path):
+    hin = load_dataset(datasets['random'], cache=False)
+    hf = HashMotif(hin.node_types)
+    expected = count_all(hin, CountDict(hf))
+    counts = count_all(hin, ArrayCountDict(hf, memory_limit=1, spill_dir=str(tmp_path)))
+
+    # the columns exceeded the limit, so blocks were written to a temporary directory in spill_dir
+    assert all(len(counts.arrays[kind].spilled) > 0 for kind in ('orbit', 'local'))
+    assert len(os.listdir(tmp_path)) == 1
+    assert dumped(counts) == dumped(expected)
+    for e in range(len(hin.edges)):
+        assert counts.get_total_count(e) == expected.get_total_count(e)
+    assert counts.get_total_count() == expected.get_total_count()
+
+    # the spilled blocks are pickled as arrays, e.g. for the transfer from a worker
+    assert dumped(pickle.loads(pickle.dumps(counts))) == dumped(expected)
+    untyped = counts.derive_untyped_dict()
+    assert dumped(untyped) == dumped(expected.derive_untyped_dict())
+
+    # the temporary directory is removed with the counts
+    del counts, untyped
+    assert os.listdir(tmp_path) == []
+
+
+def test_merge_and_load(datasets, tmp_path):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    hf = HashMotif(hin.node_types)
+    expected = count_all(hin, CountDict(hf))
+
+    half = len(hin.edges) // 2
+    merged, second = ArrayCountDict(hf, memory_limit=1), ArrayCountDict(hf)
+    for e in range(len(hin.edges)):
+        count_per_edge(hin, e, merged if e < half else second, hf)
+    merged.merge(second)
+    merged.correct_global_counts()
+    assert dumped(merged) == dumped(expected)
+
+    merged.dump_to_json(str(tmp_path))
+    loaded = ArrayCountDict(hf)
+    loaded.load_from_json(str(tmp_path))
+    assert dumped(loaded) == dumped(expected)
@@ -0,0 +1,74 @@
+import os
+import json
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.stream import MotifStream, count_motifs_streamed
+from helpers import dumped
+
+
+def as_dumped(edges, hf):
+    """ Return the streamed per-edge counts like the first two parts of dumped (with hash strings and string edge
+    IDs, without the zero counts). """
+    decode = (lambda h: hf.to_hash_str(h)) if hf.int_codes else (lambda h: h)
+    return tuple({str(edge[0]): {decode(h): c for h, c in edge[kind].items() if c} for edge in edges}
+                 for kind in (1, 2))
+
+
+@pytest.mark.parametrize('options', [dict(), dict(comb=False), dict(int_codes=True), dict(csr=True),
+                                     dict(engine='kernel'), dict(engine='kernel', comb=False, batch_size=7)])
+def test_stream_matches_count_motifs(options, dataset):
+    hin = load_dataset(dataset, csr=options.pop('csr', False), cache=False)
+    engine, batch_size = options.pop('engine', 'python'), options.pop('batch_size', None)
+    expected = dumped(count_motifs(hin, **options))
+    stream = MotifStream(hin, batch_size=batch_size, engine=engine, **options)
+    edges = list(stream) if batch_size is None else [edge for batch in stream for edge in batch]
+
+    # every edge is yielded once, in the order of the edge IDs, and its counts are not kept
+    assert [edge[0] for edge in edges] == list(range(len(hin.edges)))
+    assert as_dumped(edges, stream.hf) == expected[:2]
+    assert stream.counts.orbit_count == {} and stream.counts.local_count == {}
+    assert dumped(stream.counts)[2] == expected[2]
+
+
+def test_stream_batches(datasets):
+    hin = load_dataset(datasets['random'], cache=False)
+    edges = list(MotifStream(hin))
+    batches = list(MotifStream(hin, batch_size=7))
+    assert [len(batch) for batch in batches] == [7] * (len(hin.edges) // 7) + [len(hin.edges) % 7]
+    assert [edge for batch in batches for edge in batch] == edges
+
+
+def test_stream_of_reordered_graph(datasets):
+    expected = dumped(count_motifs(load_dataset(datasets['hubs'], cache=False)))
+    stream = MotifStream(load_dataset(datasets['hubs'], cache=False, order='degree'))
+    edges = list(stream)
+    # the counts are yielded under the original edge IDs
+    assert sorted(edge[0] for edge in edges) == list(range(len(edges)))
+    assert as_dumped(edges, stream.hf) == expected[:2]
+    assert dumped(stream.counts)[2] == expected[2]
+
+
+@pytest.mark.parametrize('options', [dict(), dict(int_codes=True), dict(batch_size=1, queue_size=1),
+                                     dict(engine='kernel')])
+def test_count_motifs_streamed(options, dataset, tmp_path):
+    hin = load_dataset(dataset, cache=False)
+    counts = count_motifs(hin, int_codes=options.get('int_codes', False))
+    for name in ('streamed', 'dumped'):
+        (tmp_path / name).mkdir()
+    streamed = count_motifs_streamed(hin, str(tmp_path / 'streamed'), **options)
+    counts.dump_to_json(str(tmp_path / 'dumped'))
+    # the written files are identical to those of dump_to_json
+    for kind in ('orbit', 'local'):
+        with open(tmp_path / 'streamed' / f'{kind}_counts.json') as f, \
+                open(tmp_path / 'dumped' / f'{kind}_counts.json') as g:
+            assert json.load(f) == json.load(g)
+    assert streamed.global_count == counts.global_count
+
+
+def test_count_motifs_streamed_write_error(datasets, tmp_path):
+    hin = load_dataset(datasets['random'], cache=False)
+    # the writer fails, which is raised once the counting stopped (instead of waiting for the writer forever)
+    with pytest.raises(OSError):
+        count_motifs_streamed(hin, str(tmp_path / 'missing'), batch_size=1, queue_size=1)
+    assert not os.path.exists(tmp_path / 'missing')
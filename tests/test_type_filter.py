@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from hin.dataset_loader import load_dataset
+from hin.motif.hash import HashMotif, motif_id
+from hin.motif.checkpoint import Checkpoint
+from hin.motif.count_3_4_node_motifs import count_motifs
+from hin.motif.type_filter import allowed_types
+from helpers import dumped
+
+
+def restricted(counts, keep_orbit, keep_motif=None):
+    """ Return the dumped counts of the whole graph whose orbit (resp. motif) hashes are selected by keep_orbit
+    (resp. keep_motif, by default the same). """
+    keep_motif = keep_orbit if keep_motif is None else keep_motif
+    orbit, local, global_count = dumped(counts)
+    return ({e: {h: c for h, c in d.items() if keep_orbit(h)} for e, d in orbit.items()},
+            {e: {h: c for h, c in d.items() if keep_motif(h)} for e, d in local.items()},
+            {h: c for h, c in global_count.items() if keep_motif(h)})
+
+
+def without_empty(counts):
+    orbit, local, global_count = counts
+    return ({e: d for e, d in orbit.items() if d}, {e: d for e, d in local.items() if d}, global_count)
+
+
+def of_types(hf, types):
+    """ Return whether all nodes of a motif (resp. orbit) hash have one of the types. """
+    return lambda h: all(t in types for t in hf.decode(h)[1:] if t != '--')
+
+
+@pytest.mark.parametrize('options', [dict(), dict(comb=False), dict(int_codes=True), dict(workers=2),
+                                     dict(engine='kernel'), dict(sparse=True)])
+def test_types_match_restricted_counts(options, dataset):
+    hin = load_dataset(dataset, cache=False)
+    types = hin.type_names[:2]
+    full = count_motifs(hin, comb=options.get('comb', True))
+    expected = restricted(full, of_types(full.hf, types))
+    counts = dumped(count_motifs(hin, types=types, **options))
+
+    # the edges between other node types have no per-edge counts, the others may have no counts of allowed motifs
+    allowed = {str(e) for e, (i, j) in enumerate(hin.edges) if hin.types[i] in types and hin.types[j] in types}
+    assert set(counts[0]) == set(counts[1]) == allowed
+    assert without_empty(counts) == without_empty(expected)
+
+
+def test_motifs_match_restricted_counts(datasets):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    full = count_motifs(hin)
+    hf = full.hf
+    motifs = sorted(full.global_count, key=lambda h: -full.global_count[h])[:3]
+
+    def keep_orbit(h):
+        return hf.hash_motif(motif_id(h), *hf.decode(h)[1:])[0] in motifs
+
+    expected = without_empty(restricted(full, keep_orbit, lambda h: h in motifs))
+    for options in (dict(), dict(int_codes=True), dict(comb=False), dict(csr=True)):
+        graph = load_dataset(datasets['hubs'], csr=options.pop('csr', False), cache=False)
+        counts = without_empty(dumped(count_motifs(graph, motifs=motifs, **options)))
+        assert counts == expected and set(counts[2]) == set(motifs)
+
+    # the node types and the motifs restrict the counts together
+    types = sorted(set(t for h in motifs for t in hf.decode(h)[1:] if t != '--'))[:2]
+    counts = without_empty(dumped(count_motifs(hin, types=types, motifs=motifs)))
+    assert counts == without_empty(restricted(full, lambda h: keep_orbit(h) and of_types(hf, types)(h),
+                                              lambda h: h in motifs and of_types(hf, types)(h)))
+
+
+def test_types_of_reordered_graph(datasets):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    types = hin.type_names[1:3]
+    expected = dumped(count_motifs(hin, types=types))
+    assert dumped(count_motifs(load_dataset(datasets['hubs'], cache=False, order='degree'), types=types)) == expected
+
+
+def test_types_of_node_counts(datasets):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    types = hin.type_names[:3]
+    full = count_motifs(hin, node_counts=True)
+    counts = count_motifs(hin, types=types, node_counts=True)
+    keep = of_types(full.hf, types)
+    for other in (False, True):
+        matrix, orbits = counts.node_orbit_counts(other=other)
+        full_matrix, full_orbits = full.node_orbit_counts(other=other)
+        columns = [full_orbits.index(h) for h in orbits]
+        assert all(keep(h) for h in orbits) and np.array_equal(matrix, full_matrix[:, columns])
+        assert not full_matrix[:, [c for c, h in enumerate(full_orbits) if keep(h) and h not in orbits]].any()
+
+    global_count = count_motifs(hin, types=types, global_only=True).global_count
+    assert global_count == {h: c for h, c in full.global_count.items() if keep(h)}
+
+
+def test_allowed_types(datasets):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    hf = HashMotif(hin.node_types)
+    motif = hf.hash_motif(1, *hin.type_names[:3], '--')[0]
+    assert allowed_types(hin).all()
+    assert allowed_types(hin, types=hin.type_names[1:3]).tolist() == [False, True, True, False]
+    assert allowed_types(hin, motifs=[motif]).tolist() == [True, True, True, False]
+    assert allowed_types(hin, types=hin.type_names[1:], motifs=[motif]).tolist() == [False, True, True, False]
+    with pytest.raises(ValueError):
+        allowed_types(hin, types=['unknown'])
+
+
+def test_unknown_motif_hashes(datasets):
+    hin = load_dataset(datasets['hubs'], cache=False)
+    full = count_motifs(hin)
+    hf = full.hf
+    assert allowed_types(hin, motifs=list(full.global_count)).all()
+
+    missing = f"{max(hf.n_types.values()) + 1:02}"
+    motif = hf.hash_motif(1, *hin.type_names[:3], '--')[0]
+    orbit = hf.hash_motif(12, *hin.type_names[:4])[1]
+    # a node type that does not exist, a malformed hash, a non-canonical hash and an orbit hash
+    for h in (f"0200{missing}{missing}--", 'garbage', motif[:-1] + '9', orbit):
+        with pytest.raises(ValueError, match='Unknown motif hashes'):
+            count_motifs(hin, motifs=[motif, h])
+
+
+def test_types_with_incompatible_options(datasets, tmp_path):
+    hin = load_dataset(datasets['random'], cache=False)
+    with pytest.raises(ValueError):
+        count_motifs(hin, types=hin.type_names[:1], storage='array')
+    with pytest.raises(ValueError):
+        count_motifs(hin, motifs=[], checkpoint=Checkpoint(str(tmp_path), hin))